@@ -4,9 +4,10 @@ from shapely.geometry import MultiPolygon, shape
 from shapely.geometry.polygon import Polygon
 from slugify import slugify
 
+from application import reference_data
 from application.blueprints.boundary.forms import BoundaryForm, EditBoundaryForm
 from application.extensions import db
-from application.models import LocalPlan, LocalPlanBoundary, Organisation, Status
+from application.models import LocalPlan, LocalPlanBoundary, Status
 from application.utils import (
     generate_random_string,
     get_centre_and_bounds,
@@ -29,12 +30,7 @@ def add(local_plan_reference):
         abort(404)
 
     form = BoundaryForm()
-    organisations = (
-        Organisation.query.filter(Organisation.end_date.is_(None))
-        .order_by(Organisation.name)
-        .all()
-    )
-    organisation_choices = [(org.organisation, org.name) for org in organisations]
+    organisation_choices = reference_data.choices(reference_data.ORGANISATIONS)
     form.organisations.choices = [(" ", " ")] + organisation_choices
     organisation__string = ";".join([org.organisation for org in plan.organisations])
     form.organisations.data = organisation__string
@@ -84,7 +80,14 @@ def edit(local_plan_reference, reference):
     plan = LocalPlan.query.get(local_plan_reference)
     if plan is None:
         return abort(404)
-    lp_boundary = LocalPlanBoundary.query.get(reference)
+    lp_boundary = (
+        LocalPlanBoundary.query.options(
+            db.undefer(LocalPlanBoundary.geometry),
+            db.undefer(LocalPlanBoundary.geojson),
+        )
+        .filter(LocalPlanBoundary.reference == reference)
+        .one_or_none()
+    )
     if lp_boundary is None:
         return abort(404)
 
@@ -99,12 +102,7 @@ def edit(local_plan_reference, reference):
     if not form.is_submitted():
         form.organisations.data = organisation_string
 
-    organisations = (
-        Organisation.query.filter(Organisation.end_date.is_(None))
-        .order_by(Organisation.name)
-        .all()
-    )
-    organisation_choices = [(org.organisation, org.name) for org in organisations]
+    organisation_choices = reference_data.choices(reference_data.ORGANISATIONS)
     form.organisations.choices = organisation_choices
     form.status.choices = [(s.name, s.value) for s in Status if s != Status.EXPORTED]
 
@@ -167,7 +165,11 @@ def get_boundary(local_plan_reference, reference):
     plan = LocalPlan.query.get(local_plan_reference)
     if plan is None:
         abort(404)
-    boundary = LocalPlanBoundary.query.get(reference)
+    boundary = (
+        LocalPlanBoundary.query.options(db.undefer(LocalPlanBoundary.geojson))
+        .filter(LocalPlanBoundary.reference == reference)
+        .one_or_none()
+    )
     if boundary is None:
         return abort(404)
 
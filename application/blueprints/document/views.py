@@ -2,16 +2,12 @@ from datetime import datetime
 
 from flask import Blueprint, abort, redirect, render_template, url_for
 from slugify import slugify
+from sqlalchemy import select
 
+from application import reference_data
 from application.blueprints.document.forms import DocumentForm, EditDocumentForm
 from application.extensions import db
-from application.models import (
-    LocalPlan,
-    LocalPlanDocument,
-    LocalPlanDocumentType,
-    Organisation,
-    Status,
-)
+from application.models import LocalPlan, LocalPlanDocument, Status
 from application.utils import (
     generate_random_string,
     login_required,
@@ -34,24 +30,12 @@ def add(local_plan_reference):
         abort(404)
 
     form = DocumentForm()
-    organisations = (
-        Organisation.query.filter(Organisation.end_date.is_(None))
-        .order_by(Organisation.name)
-        .all()
-    )
-    organisation_choices = [(org.organisation, org.name) for org in organisations]
+    organisation_choices = reference_data.choices(reference_data.ORGANISATIONS)
     form.organisations.choices = [(" ", " ")] + organisation_choices
     organisation__string = ";".join([org.organisation for org in plan.organisations])
     form.organisations.data = organisation__string
 
-    form.document_types.choices = [
-        (dt.reference, dt.name)
-        for dt in LocalPlanDocumentType.query.filter(
-            LocalPlanDocumentType.end_date.is_(None)
-        )
-        .order_by(LocalPlanDocumentType.name)
-        .all()
-    ]
+    form.document_types.choices = reference_data.choices(reference_data.DOCUMENT_TYPES)
     if form.validate_on_submit():
         reference = make_document_reference(form.name.data, plan.reference)
         doc = LocalPlanDocument(
@@ -125,23 +109,11 @@ def edit(local_plan_reference, reference):
     if not form.is_submitted():
         form.organisations.data = organisation_string
 
-    organisations = (
-        Organisation.query.filter(Organisation.end_date.is_(None))
-        .order_by(Organisation.name)
-        .all()
-    )
-    organisation_choices = [(org.organisation, org.name) for org in organisations]
+    organisation_choices = reference_data.choices(reference_data.ORGANISATIONS)
 
     form.organisations.choices = organisation_choices
     form.status.choices = [(s.name, s.value) for s in Status if s != Status.EXPORTED]
-    form.document_types.choices = [
-        (dt.reference, dt.name)
-        for dt in LocalPlanDocumentType.query.filter(
-            LocalPlanDocumentType.end_date.is_(None)
-        )
-        .order_by(LocalPlanDocumentType.name)
-        .all()
-    ]
+    form.document_types.choices = reference_data.choices(reference_data.DOCUMENT_TYPES)
 
     if form.validate_on_submit():
         doc.organisations.clear()
@@ -186,29 +158,28 @@ def edit(local_plan_reference, reference):
     )
 
 
-def make_document_reference(name, plan_reference):
-    reference = slugify(name)
-    count = LocalPlanDocument.query.filter(
-        LocalPlanDocument.reference == reference,
-    ).count()
-
-    if count == 0:
-        return reference
-
-    reference = slugify(f"{reference}-{plan_reference}")
-    count = LocalPlanDocument.query.filter(
-        LocalPlanDocument.reference == reference,
-    ).count()
+def make_document_reference(name, plan_reference, taken=(), existing=None):
+    # taken holds references already given out but not saved yet, and
+    # existing the saved ones among the candidates, when already looked up
+    candidates = document_reference_candidates(name, plan_reference)
+    if existing is None:
+        existing = set(
+            db.session.execute(
+                select(LocalPlanDocument.reference).where(
+                    LocalPlanDocument.reference.in_(candidates)
+                )
+            ).scalars()
+        )
 
-    if count == 0:
-        return reference
+    for reference in candidates:
+        if reference not in existing and reference not in taken:
+            return reference
 
-    reference = f"{reference}-{datetime.now().strftime('%Y-%m-%d')}"
-    count = LocalPlanDocument.query.filter(
-        LocalPlanDocument.reference == reference,
-    ).count()
+    return f"{candidates[-1]}-{generate_random_string(6)}"
 
-    if count == 0:
-        return reference
 
-    return f"{reference}-{generate_random_string(6)}"
+def document_reference_candidates(name, plan_reference):
+    """References to try for a document, in order, before a random suffix"""
+    reference = slugify(name)
+    with_plan = slugify(f"{reference}-{plan_reference}")
+    return [reference, with_plan, f"{with_plan}-{datetime.now().strftime('%Y-%m-%d')}"]
@@ -1,15 +1,23 @@
 import csv
 import io
 
-from flask import Blueprint, Response
+from flask import Blueprint, Response, abort, request
 
+from application import reference_data
 from application.export import (
     LocalPlanBoundaryModel,
     LocalPlanDocumentModel,
     LocalPlanModel,
     LocalPlanTimetableModel,
 )
-from application.models import LocalPlan, LocalPlanDocument, LocalPlanTimetable, Status
+from application.extensions import db
+from application.models import (
+    LocalPlan,
+    LocalPlanBoundary,
+    LocalPlanDocument,
+    LocalPlanTimetable,
+    Status,
+)
 
 export = Blueprint("export", __name__, url_prefix="/export")
 
@@ -77,10 +85,19 @@ def export_local_plan_timetables():
 
 @export.get("/local-plan-boundary.csv")
 def export_boundaries():
-    local_plans = LocalPlan.query.filter(
-        LocalPlan.status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
-        LocalPlan.boundary_status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
-    ).all()
+    local_plans = (
+        LocalPlan.query.options(
+            db.joinedload(LocalPlan.boundary).options(
+                db.undefer(LocalPlanBoundary.geometry),
+                db.selectinload(LocalPlanBoundary.organisations),
+            )
+        )
+        .filter(
+            LocalPlan.status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
+            LocalPlan.boundary_status.in_([Status.FOR_PLATFORM, Status.EXPORTED]),
+        )
+        .all()
+    )
     data = []
     for plan in local_plans:
         model = LocalPlanBoundaryModel.model_validate(plan.boundary)
@@ -95,10 +112,27 @@ def export_boundaries():
 
 @export.get("/local-plan-document.csv")
 def export_documents():
+    """Documents for the platform, optionally only those of a type.
+
+    Each document-type parameter is a local plan document type reference.
+    Given more than once, only documents with all of the types are exported.
+    """
     data = []
-    documents = LocalPlanDocument.query.filter(
+    query = LocalPlanDocument.query.filter(
         LocalPlanDocument.status.in_([Status.FOR_PLATFORM, Status.EXPORTED])
-    ).all()
+    )
+    document_types = request.args.getlist("document-type")
+    unknown = [
+        document_type
+        for document_type in document_types
+        if reference_data.get(reference_data.DOCUMENT_TYPES, document_type) is None
+    ]
+    if unknown:
+        abort(400, description=f"Unknown document-type: {', '.join(unknown)}")
+    if document_types:
+        # uses the GIN index on document_types
+        query = query.filter(LocalPlanDocument.document_types.contains(document_types))
+    documents = query.all()
     for document in documents:
         model = LocalPlanDocumentModel.model_validate(document)
         data.append(model.model_dump(by_alias=True))
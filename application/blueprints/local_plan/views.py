@@ -5,9 +5,18 @@ import geopandas as gpd
 from flask import Blueprint, abort, redirect, render_template, request, url_for
 from slugify import slugify
 
+from application import reference_data
 from application.blueprints.local_plan.forms import LocalPlanForm
 from application.extensions import db
-from application.models import LocalPlan, LocalPlanBoundary, Organisation, Status
+from application.models import (
+    LocalPlan,
+    LocalPlanBoundary,
+    LocalPlanDocument,
+    LocalPlanEventType,
+    LocalPlanTimetable,
+    Organisation,
+    Status,
+)
 from application.utils import (
     combine_geographies,
     generate_random_string,
@@ -27,11 +36,17 @@ def index():
 
 @local_plan.route("/<string:reference>")
 def get_plan(reference):
-    plan = LocalPlan.query.get(reference)
+    plan = _load_plan(reference)
     if plan is None:
         return abort(404)
 
-    if plan.boundary and plan.boundary.geojson:
+    # the boundary is only shown for plans on the platform, its geojson is
+    # read for the map here rather than with the plan
+    if (
+        plan.status != Status.NOT_FOR_PLATFORM
+        and plan.boundary
+        and plan.boundary.geojson
+    ):
         try:
             coords, bounding_box = get_centre_and_bounds(plan.boundary.geojson)
             geography = {
@@ -50,13 +65,13 @@ def get_plan(reference):
         bounding_box = None
 
     document_counts = _get_document_counts(plan.documents)
+    document_type_names = _get_document_type_names(plan.documents)
 
     stage_urls = {}
 
-    if plan.timetable:
-        events = plan.ordered_events()
-    else:
-        events = []
+    # sorted from plan.timetable, with its event types and organisations
+    # already loaded
+    events = plan.ordered_events()
 
     breadcrumbs = {
         "items": [
@@ -75,6 +90,7 @@ def get_plan(reference):
         geography=geography,
         bounding_box=bounding_box,
         document_counts=document_counts,
+        document_type_names=document_type_names,
         stage_urls=stage_urls,
         events=events,
         breadcrumbs=breadcrumbs,
@@ -90,12 +106,7 @@ def add():
         org = Organisation.query.get_or_404(organisation)
     else:
         org = None
-    orgs = (
-        Organisation.query.filter(Organisation.end_date.is_(None))
-        .order_by(Organisation.name)
-        .all()
-    )
-    organisation_choices = [(org.organisation, org.name) for org in orgs]
+    organisation_choices = reference_data.choices(reference_data.ORGANISATIONS)
     form.organisations.choices = [(" ", " ")] + organisation_choices
     if org is not None and not form.is_submitted():
         form.organisations.data = org.organisation
@@ -132,12 +143,7 @@ def edit(reference):
     if not form.organisations.data:
         form.organisations.data = organisation__string
 
-    organisations = (
-        Organisation.query.filter(Organisation.end_date.is_(None))
-        .order_by(Organisation.name)
-        .all()
-    )
-    organisation_choices = [(org.organisation, org.name) for org in organisations]
+    organisation_choices = reference_data.choices(reference_data.ORGANISATIONS)
     form.organisations.choices = organisation_choices
 
     form.status.choices = [(s.name, s.value) for s in Status if s != Status.EXPORTED]
@@ -189,7 +195,15 @@ def archived_plans():
 @local_plan.route("/<string:reference>/geography/add", methods=["GET", "POST"])
 @login_required
 def add_geography(reference):
-    plan = LocalPlan.query.get(reference)
+    plan = (
+        LocalPlan.query.options(
+            db.selectinload(LocalPlan.organisations).options(
+                db.undefer(Organisation.geometry), db.undefer(Organisation.geojson)
+            )
+        )
+        .filter(LocalPlan.reference == reference)
+        .one_or_none()
+    )
     if plan is None:
         return abort(404)
 
@@ -265,6 +279,34 @@ def add_geography(reference):
     )
 
 
+def _load_plan(reference):
+    """A plan with everything its page shows, in a fixed number of queries.
+
+    Organisations are loaded with just their names. The boundary's
+    geometry and geojson are deferred, so are left out.
+    """
+    organisation_name = (Organisation.organisation, Organisation.name)
+    return (
+        LocalPlan.query.options(
+            db.joinedload(LocalPlan.boundary),
+            db.selectinload(LocalPlan.organisations).load_only(*organisation_name),
+            db.selectinload(LocalPlan.documents)
+            .selectinload(LocalPlanDocument.organisations)
+            .load_only(*organisation_name),
+            db.selectinload(LocalPlan.timetable).options(
+                db.joinedload(LocalPlanTimetable.event_type).load_only(
+                    LocalPlanEventType.reference, LocalPlanEventType.name
+                ),
+                db.joinedload(LocalPlanTimetable.organisation_obj).load_only(
+                    *organisation_name
+                ),
+            ),
+        )
+        .filter(LocalPlan.reference == reference)
+        .one_or_none()
+    )
+
+
 def _get_document_counts(documents):
     counts = {}
     for status in Status:
@@ -272,6 +314,26 @@ def _get_document_counts(documents):
     return counts
 
 
+def _get_document_type_names(documents):
+    """Each document's type names in name order, joined, keyed by document reference"""
+    names = {}
+    for position, document_type in enumerate(
+        reference_data.items(reference_data.DOCUMENT_TYPES)
+    ):
+        names[document_type.reference] = (position, document_type.name)
+    return {
+        doc.reference: ", ".join(
+            name
+            for _, name in sorted(
+                names[document_type]
+                for document_type in doc.document_types or []
+                if document_type in names
+            )
+        )
+        for doc in documents
+    }
+
+
 def _make_reference(form):
     reference = slugify(form.name.data)
     if LocalPlan.query.get(reference) is None:
@@ -6,6 +6,8 @@ from markupsafe import Markup
 from wtforms import Field, SelectField, TextAreaField, ValidationError
 from wtforms.validators import DataRequired, Optional
 
+from application.dates import partial_date_parts
+
 
 class DatePartsInputWidget:
     def __call__(self, field, **kwargs):
@@ -41,31 +43,11 @@ class DatePartField(Field):
     def process_data(self, value):
         """Process the Python data applied to this field.
         This will be called during form construction by the form's `kwargs` or
-        `obj` argument.
+        `obj` argument, with a (date, precision) pair as stored on a timetable
+        entry.
         """
-        if value:
-            # Handle string date from database
-            if isinstance(value, str):
-                try:
-                    parts = value.split("-")
-                    if len(parts) == 3:
-                        self.data = {
-                            "year": parts[0],
-                            "month": str(int(parts[1])),  # Remove leading zeros
-                            "day": str(int(parts[2])),  # Remove leading zeros
-                        }
-                    elif len(parts) == 2:
-                        self.data = {
-                            "year": parts[0],
-                            "month": str(int(parts[1])),
-                            "day": "",
-                        }
-                    else:
-                        self.data = {"year": parts[0], "month": "", "day": ""}
-                except (ValueError, IndexError):
-                    self.data = {"day": "", "month": "", "year": ""}
-            else:
-                self.data = {"day": "", "month": "", "year": ""}
+        if isinstance(value, tuple):
+            self.data = partial_date_parts(*value)
         else:
             self.data = {"day": "", "month": "", "year": ""}
 
@@ -184,31 +166,36 @@ class EventForm(FlaskForm):
         # First set the choices
         self.local_plan_event.choices = self._get_event_choices()
 
-        # If we have an obj (like a LocalPlanEvent), convert its event type reference
-        if obj is not None and hasattr(obj, "local_plan_event"):
-            # Set the event type value directly
-            kwargs["local_plan_event"] = obj.local_plan_event
+        # If we have an obj (a LocalPlanTimetable), take its values as kwargs,
+        # which would otherwise lose out to the obj's own attributes, so that
+        # the event date comes from its stored date and precision
+        if obj is not None:
+            kwargs.setdefault("local_plan_event", obj.local_plan_event)
+            kwargs.setdefault(
+                "event_date", (obj.normalised_event_date, obj.event_date_precision)
+            )
+            kwargs.setdefault("notes", obj.notes)
+            kwargs.setdefault("organisation", obj.organisation)
+            obj = None
 
         # Now call the parent process method
         super().process(formdata, obj, **kwargs)
 
     @staticmethod
     def _get_event_choices():
-        from application.models import LocalPlanEventType
+        from application import reference_data
 
-        return [("", "")] + [
-            (evt.reference, evt.name)
-            for evt in LocalPlanEventType.query.order_by(LocalPlanEventType.name).all()
-        ]
+        return [("", "")] + reference_data.choices(
+            reference_data.EVENT_TYPES, include_ended=True
+        )
 
     @staticmethod
     def _get_organisation_choices():
-        from application.models import Organisation
+        from application import reference_data
 
-        return [("", "")] + [
-            (org.organisation, org.name)
-            for org in Organisation.query.order_by(Organisation.name).all()
-        ]
+        return [("", "")] + reference_data.choices(
+            reference_data.ORGANISATIONS, include_ended=True
+        )
 
     def get_error_summary(self):
         """Get summary of form errors for display"""
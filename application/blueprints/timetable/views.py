@@ -2,14 +2,10 @@ from datetime import datetime
 
 from flask import Blueprint, abort, redirect, render_template, url_for
 
+from application import reference_data
 from application.blueprints.timetable.forms import EventForm
 from application.extensions import db
-from application.models import (
-    LocalPlan,
-    LocalPlanEventType,
-    LocalPlanTimetable,
-    Organisation,
-)
+from application.models import LocalPlan, LocalPlanEventType, LocalPlanTimetable
 from application.utils import login_required
 
 timetable = Blueprint(
@@ -41,16 +37,9 @@ def add(local_plan_reference):
 
     form = EventForm()
     if plan.organisations:
-        organisations = (
-            Organisation.query.with_entities(
-                Organisation.organisation, Organisation.name
-            )
-            .order_by(Organisation.name)
-            .all()
+        form.organisation.choices = reference_data.choices(
+            reference_data.ORGANISATIONS, include_ended=True
         )
-        form.organisation.choices = [
-            (org.organisation, org.name) for org in organisations
-        ]
 
     if plan.organisations and not form.is_submitted():
         if len(plan.organisations) == 1:
@@ -0,0 +1,58 @@
+"""Fuzzy matching of link texts to document types.
+
+Scores the same way as thefuzz.process.extractOne with its defaults, full
+processing of both strings then WRatio, but the document type names are
+processed once up front and every text in a batch is scored against all of
+them in a single rapidfuzz cdist call instead of one extractOne per link.
+Link texts repeat a lot across pages ("Local plan", "Policies map"), so
+each distinct processed text is only scored once.
+"""
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from thefuzz.utils import full_process
+
+DEFAULT_THRESHOLD = 85
+
+
+class DocumentTypeClassifier:
+    def __init__(self, document_types, threshold=DEFAULT_THRESHOLD, workers=1):
+        self.document_types = list(document_types)
+        self.threshold = threshold
+        self.workers = workers
+        self._choices = [_process(name) for name in self.document_types]
+
+    def classify(self, texts):
+        """Match each text to a document type.
+
+        Returns a list of (document type, confidence) tuples in the order of
+        texts. Confidence is the 0-100 match score, and the document type is
+        None when that is not above the threshold.
+        """
+        texts = list(texts)
+        if not texts or not self._choices:
+            return [(None, 0) for _ in texts]
+
+        queries = [_process(text) for text in texts]
+        distinct = list(dict.fromkeys(queries))
+        scores = process.cdist(
+            distinct,
+            self._choices,
+            scorer=fuzz.WRatio,
+            dtype=np.float64,
+            workers=self.workers,
+        )
+        best = scores.argmax(axis=1)
+        confidences = np.rint(scores[np.arange(len(distinct)), best]).astype(int)
+        matches = {
+            query: (
+                self.document_types[index] if confidence > self.threshold else None,
+                int(confidence),
+            )
+            for query, index, confidence in zip(distinct, best, confidences)
+        }
+        return [matches[query] for query in queries]
+
+
+def _process(text):
+    return full_process(text, force_ascii=True) if text else ""
@@ -1,9 +1,11 @@
 import csv
+import hashlib
+import json
 import os
-import subprocess
 import sys
+import time
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import click
@@ -11,138 +13,356 @@ import requests
 from flask import current_app
 from flask.cli import AppGroup
 from slugify import slugify
-from sqlalchemy import not_, select, text
+from sqlalchemy import bindparam, func, literal, literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.inspection import inspect
 
+from application import reference_data
+from application.crawler import NOT_MODIFIED, CachedPage, Crawler
 from application.extensions import db
+from application.http_client import get_client
+from application.link_checker import LinkChecker
 from application.models import (
+    CandidateDocument,
+    CommandCheckpoint,
+    CrawlPage,
     LocalPlan,
     LocalPlanBoundary,
     LocalPlanDocument,
     LocalPlanDocumentType,
+    LocalPlanEventType,
     Organisation,
+    ReferenceDataSync,
     Status,
-    document_organisation,
 )
+from application.pdf_metadata import PdfMetadataReader
+from application.runs import COMPLETED, CommandRun
+from application.snapshots import SnapshotError, SnapshotManager, write_checksum
+from application.staging import diff_staged, merge_staged, stage_csv
+from application.task_graph import SUCCEEDED, TaskGraph
 
 data_cli = AppGroup("data")
 
 
+ORGANISATION_DATASETS = [
+    "local-authority",
+    "development-corporation",
+    "national-park-authority",
+]
+
+UPSERT_BATCH_SIZE = 500
+
+DATASETTE_URL = "https://datasette.planning.data.gov.uk/digital-land"
+
+
 @data_cli.command("load-orgs")
-def load_orgs():
-    url = "https://datasette.planning.data.gov.uk/digital-land/organisation.json?_shape=array"
-    orgs = []
-    columns = set([column.name for column in inspect(Organisation).c])
-    while url:
-        resp = requests.get(url)
-        try:
-            url = resp.links.get("next").get("url")
-        except AttributeError:
-            url = None
-        orgs.extend(resp.json())
+@click.option("--dry-run", is_flag=True, help="Show what would change without writing")
+def load_orgs(dry_run):
+    orgs = _fetch_organisations()
+    rows, skipped = _organisation_rows(orgs)
+    if dry_run:
+        _print_diff(
+            "Organisations", _diff_rows(Organisation.__table__, "organisation", rows)
+        )
+        return
+
+    with CommandRun("load-orgs") as run:
+        run.total = len(rows)
+        inserted, updated = _upsert_organisations(rows)
+        run.advance(None, count=len(rows))
+
+    print(
+        f"Organisations: {inserted} inserted, {updated} updated, "
+        f"{len(rows) - inserted - updated} unchanged, "
+        f"{sum(skipped.values())} skipped"
+    )
+    for reason, count in skipped.items():
+        print(f"  skipped {count} {reason}")
+
+
+def _fetch_organisations():
+    return get_client().datasette_table(DATASETTE_URL, "organisation")
+
+
+def _organisation_rows(orgs):
+    """Filter datasette organisation records down to the rows we hold.
 
+    Returns a list of column dicts ready for upsert and a count of skipped
+    records keyed by reason.
+    """
+    columns = set([column.name for column in inspect(Organisation).c])
+    rows = {}
+    skipped = defaultdict(int)
     for org in orgs:
         if not org["organisation"]:
-            print("Skipping invalid org", org["name"])
+            skipped["invalid"] += 1
             continue
         if org["end_date"]:
-            print("Skipping end dated org", org["organisation"])
+            skipped["end dated"] += 1
             continue
-        if org["dataset"] not in [
-            "local-authority",
-            "development-corporation",
-            "national-park-authority",
-        ]:
-            print(
-                "Skipping org",
-                org["organisation"],
-                "as not a local authority, development corporation or national park authority",
-            )
+        if org["dataset"] not in ORGANISATION_DATASETS:
+            skipped["not a planning authority"] += 1
             continue
-        try:
-            org_obj = Organisation.query.get(org["organisation"])
-            if org_obj is None:
-                org_obj = Organisation()
-                print("Adding new org", org["organisation"])
+        row = {key: value if value else None for key, value in org.items()}
+        row = {key: value for key, value in row.items() if key in columns}
+        # hash before defaulting entry_date so the hash only changes with the source
+        row["content_hash"] = _content_hash(row)
+        if row.get("entry_date") is None:
+            row["entry_date"] = datetime.today().date()
+        # later pages win if datasette repeats an organisation
+        rows[org["organisation"]] = row
+    return list(rows.values()), skipped
+
+
+def _upsert_organisations(rows):
+    """Insert or update organisations, leaving unchanged ones alone.
+
+    Returns a tuple of (inserted, updated) counts.
+    """
+    keys = set().union(*rows) if rows else set()
+    inserted, updated = _upsert_rows(
+        Organisation.__table__,
+        "organisation",
+        rows,
+        update_columns=sorted(keys - {"organisation", "entry_date"}),
+    )
+    if inserted or updated:
+        reference_data.invalidate(reference_data.ORGANISATIONS)
+    db.session.commit()
+    return inserted, updated
+
+
+def _upsert_rows(table, key, rows, update_columns):
+    """Insert or update rows in batches with INSERT ... ON CONFLICT.
+
+    Every row carries the content_hash of its source record and existing
+    rows are only rewritten when that hash has changed, so reloading
+    unchanged data writes nothing.
+
+    Returns a tuple of (inserted, updated) counts.
+    """
+    inserted = updated = 0
+    if not rows:
+        return inserted, updated
+
+    # multi-row VALUES needs every row to share the same keys
+    keys = sorted(set().union(*rows))
+    rows = [{name: row.get(name) for name in keys} for row in rows]
+    update_columns = set(update_columns) | {"content_hash"}
+
+    for batch in _batched(rows, UPSERT_BATCH_SIZE):
+        stmt = insert(table).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={name: stmt.excluded[name] for name in sorted(update_columns)},
+            where=table.c.content_hash.is_distinct_from(stmt.excluded.content_hash),
+        ).returning(literal_column("xmax = 0").label("inserted"))
+        for row in db.session.execute(stmt):
+            if row.inserted:
+                inserted += 1
             else:
-                print("Updating org", org["organisation"])
-            for key, value in org.items():
-                if key in columns:
-                    v = value if value else None
-                    setattr(org_obj, key, v)
-            db.session.add(org_obj)
-            db.session.commit()
-        except Exception as e:
-            print(e)
-            continue
+                updated += 1
+    return inserted, updated
+
+
+def _content_hash(row):
+    return hashlib.md5(
+        json.dumps(row, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _diff_rows(table, key, rows):
+    """Compare source rows with the content hashes held in table.
+
+    Returns a tuple of (new, changed, unchanged) lists of keys.
+    """
+    held = dict(db.session.execute(select(table.c[key], table.c.content_hash)).all())
+    new, changed, unchanged = [], [], []
+    for row in rows:
+        if row[key] not in held:
+            new.append(row[key])
+        elif held[row[key]] != row["content_hash"]:
+            changed.append(row[key])
+        else:
+            unchanged.append(row[key])
+    return new, changed, unchanged
+
+
+def _print_diff(label, diff):
+    new, changed, unchanged = diff
+    print(
+        f"Dry run: {label}: {len(new)} new, {len(changed)} changed, "
+        f"{len(unchanged)} unchanged"
+    )
+    for key in new:
+        print(f"  + {key}")
+    for key in changed:
+        print(f"  ~ {key}")
+
+
+def _batched(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _rate(count, elapsed):
+    if elapsed <= 0:
+        return "n/a"
+    return f"{count / elapsed:,.0f} rows/s"
 
 
 @data_cli.command("load-plans")
-def load_plans():
+@click.option("--dry-run", is_flag=True, help="Show what would change without writing")
+def load_plans(dry_run):
     current_file_path = Path(__file__).resolve()
     data_directory = os.path.join(current_file_path.parent.parent, "data")
     file_path = os.path.join(data_directory, "local-plan.csv")
 
-    with open(file_path, mode="r") as file:
-        reader = csv.DictReader(file)
-        columns = set([column.name for column in inspect(LocalPlan).c])
-
-        for row in reader:
-            try:
-                plan = LocalPlan.query.get(row["reference"])
-                if plan is None:
-                    print("Adding new plan", row["reference"])
-                    plan = LocalPlan()
-                    for key, value in row.items():
-                        k = key.lower().replace("-", "_")
-                        if k in columns:
-                            setattr(plan, k, value if value else None)
-                else:
-                    print("Updating plan", row["reference"])
-                    for key, value in row.items():
-                        k = key.lower().replace("-", "_")
-                        if k in columns and not k.endswith("date"):
-                            setattr(plan, k, value if value else None)
-                db.session.add(plan)
-                organisations = row.get("organisations")
-                for org in organisations.split(";") if organisations else []:
-                    organisation = Organisation.query.get(org)
-                    if (
-                        organisation is not None
-                        and organisation not in plan.organisations
-                    ):
-                        plan.organisations.append(organisation)
-                db.session.commit()
-            except Exception as e:
-                print(f"Error processing row {row['reference']}: {e}")
-                db.session.rollback()
+    started = time.perf_counter()
+    plans = LocalPlan.__table__
+    try:
+        staging = stage_csv(file_path, "staging_local_plan")
+        if dry_run:
+            diff = diff_staged(staging, plans, "reference")
+            db.session.rollback()
+            _print_diff("Plans", diff)
+            return
+
+        # existing plans keep any dates that have been edited in the app
+        update_columns = [
+            c.name
+            for c in staging.c
+            if c.name in plans.c
+            and c.name != "reference"
+            and not c.name.endswith("date")
+        ]
+        inserted, updated = merge_staged(
+            staging,
+            plans,
+            "reference",
+            update_columns=update_columns,
+            defaults={
+                "entry_date": func.current_date(),
+                "status": literal(Status.FOR_REVIEW, plans.c.status.type),
+                "boundary_status": literal(
+                    Status.FOR_REVIEW, plans.c.boundary_status.type
+                ),
+            },
+            skip_unchanged=True,
+            # the CSV has an adopted-date column, but adopted_date is only
+            # ever set from the plan's timetable
+            exclude=["adopted_date"],
+        )
+        staged = db.session.execute(
+            select(func.count(func.distinct(staging.c.reference))).where(
+                func.nullif(staging.c.reference, "").isnot(None)
+            )
+        ).scalar()
+        linked = db.session.execute(
+            text(
+                """
+                INSERT INTO local_plan_organisation (local_plan, organisation)
+                SELECT DISTINCT s.reference, o.organisation
+                FROM staging_local_plan s
+                CROSS JOIN LATERAL unnest(string_to_array(s.organisations, ';'))
+                    AS org(organisation)
+                JOIN organisation o ON o.organisation = trim(org.organisation)
+                ON CONFLICT DO NOTHING
+                """
+            )
+        ).rowcount
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(f"Error loading plans from {file_path}: {e}") from e
 
+    elapsed = time.perf_counter() - started
+    print(
+        f"Plans: {inserted} inserted, {updated} updated, "
+        f"{staged - inserted - updated} unchanged, "
+        f"{linked} organisation links added in {elapsed:.2f}s"
+    )
 
-@data_cli.command("load-boundaries")
-def load_boundaries():
-    from application.extensions import db
 
+@data_cli.command("load-docs")
+def load_docs():
+    """Load data/local-plan-document.csv, skipping documents already held"""
+    current_file_path = Path(__file__).resolve()
+    data_directory = os.path.join(current_file_path.parent.parent, "data")
+    file_path = os.path.join(data_directory, "local-plan-document.csv")
+
+    started = time.perf_counter()
+    documents = LocalPlanDocument.__table__
+    try:
+        staging = stage_csv(file_path, "staging_local_plan_document")
+        staged = db.session.execute(select(func.count()).select_from(staging)).scalar()
+        inserted, _ = merge_staged(
+            staging,
+            documents,
+            "reference",
+            update_columns=[],
+            defaults={
+                "entry_date": func.current_date(),
+                "status": literal(Status.FOR_REVIEW, documents.c.status.type),
+            },
+            expressions={
+                "document_types": func.string_to_array(
+                    func.nullif(staging.c.document_types, ""), ";"
+                )
+            },
+            where=staging.c.local_plan.in_(select(LocalPlan.reference)),
+        )
+        # new documents belong to the same organisations as their plan
+        _, linked = _set_document_organisations()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(
+            f"Error loading documents from {file_path}: {e}"
+        ) from e
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Documents: {inserted} inserted, {staged - inserted} skipped as already "
+        f"loaded or plan not found, {linked} organisation links added "
+        f"in {elapsed:.2f}s"
+    )
+
+
+@data_cli.command("load-boundaries")
+@click.option("--restart", is_flag=True, help="Ignore any checkpoint and start again")
+def load_boundaries(restart):
     orgs = Organisation.query.all()
-    for org in orgs:
-        curie = f"statistical-geography:{org.statistical_geography}"
-        g = _get_geography(curie)
-        if g is not None:
-            print("Loading boundary for", org.organisation)
-            org.geometry = g["geometry"]
-            org.geojson = g["geojson"]
-            org.point = g["point"]
-            db.session.add(org)
-            db.session.commit()
-        else:
-            print("No boundary found for", org.organisation)
+    missing = []
+    with CommandRun("load-boundaries", restart=restart) as run:
+        for org in run.pending(orgs, key=lambda org: org.organisation):
+            curie = f"statistical-geography:{org.statistical_geography}"
+            g = _get_geography(curie)
+            if g is not None:
+                org.geometry = g["geometry"]
+                org.geojson = g["geojson"]
+                org.point = g["point"]
+                db.session.add(org)
+            else:
+                missing.append(org.organisation)
+            run.advance(org.organisation)
+
+    if missing:
+        print(f"No boundary found for {len(missing)} organisations:")
+        print("  " + ", ".join(missing))
 
 
 def _get_geography(reference):
+    """The geography of a statistical geography curie, or None if there is none.
+
+    Raises click.ClickException if it cannot be fetched, so that a run of
+    load-boundaries stops at its checkpoint rather than carrying on without it.
+    """
     url = "https://www.planning.data.gov.uk/entity.json"
     params = {"curie": reference}
     try:
-        resp = requests.get(url, params=params)
-        resp.raise_for_status
+        resp = get_client().get(url, params=params)
+        resp.raise_for_status()
         data = resp.json()
         if len(data["entities"]) == 0:
             print("No entities found for url", resp.url)
@@ -150,21 +370,15 @@ def _get_geography(reference):
         point = data["entities"][0].get("point")
         entity = data["entities"][0].get("entity")
         geojson_url = f"https://www.planning.data.gov.uk/entity/{entity}.geojson"
-        try:
-            resp = requests.get(geojson_url)
-            resp.raise_for_status()
-            geography = {
-                "geojson": resp.json(),
-                "geometry": data["entities"][0].get("geometry"),
-                "point": point,
-            }
-            return geography
-        except Exception as e:
-            print(e)
-            return None
-    except Exception as e:
-        print(e)
-        return None
+        resp = get_client().get(geojson_url)
+        resp.raise_for_status()
+        return {
+            "geojson": resp.json(),
+            "geometry": data["entities"][0].get("geometry"),
+            "point": point,
+        }
+    except requests.exceptions.RequestException as e:
+        raise click.ClickException(f"Error fetching {reference}: {e}") from e
 
 
 @data_cli.command("create-import-docs")
@@ -185,11 +399,13 @@ def create_importable_docs():
             fieldnames = [field.replace("-", "_") for field in fieldnames]
             writer = csv.DictWriter(out_file, fieldnames=fieldnames)
             writer.writeheader()
+            plan_references = set(
+                db.session.execute(select(LocalPlan.reference)).scalars()
+            )
             for row in reader:
                 fixed_row = {}
                 try:
-                    plan = LocalPlan.query.get(row["local-plan"])
-                    if plan is None:
+                    if row["local-plan"] not in plan_references:
                         print(
                             "Skipping document",
                             row["reference"],
@@ -216,145 +432,584 @@ def create_importable_docs():
 
 @data_cli.command("set-orgs")
 def set_orgs():
-    subquery = (
-        select(document_organisation.c.local_plan_document_reference)
-        .where(
-            document_organisation.c.local_plan_document_reference
-            == LocalPlanDocument.reference
-        )
-        .exists()
-    )
-    query = select(LocalPlanDocument).where(not_(subquery))
-    result = db.session.execute(query).scalars().all()
-
-    for doc in result:
-        doc.organisations = doc.plan.organisations
-        db.session.add(doc)
+    """Give documents without organisations the organisations of their plan"""
+    print("Setting organisations for documents that have none...")
+    try:
+        documents, links = _set_document_organisations()
         db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error setting document organisations: {e}")
+        return
+    print(f"Added {links} organisation links to {documents} documents")
 
 
-@data_cli.command("default-boundaries")
-def set_default_boundaries():
-    from application.models import Organisation
+def _set_document_organisations():
+    """Copy plan organisations onto every document that has none.
 
-    orgs = Organisation.query.filter(Organisation.geometry.isnot(None)).all()
-    for org in orgs:
-        reference = org.statistical_geography
-        boundary = LocalPlanBoundary.query.get(reference)
-        if boundary is None:
-            boundary = LocalPlanBoundary(
-                reference=reference,
-                name=org.name,
-                description="Default local plan boundary",
-                geometry=org.geometry,
-                geojson=org.geojson,
+    Returns a tuple of (documents, links) added. Does not commit.
+    """
+    rows = db.session.execute(
+        text(
+            """
+            INSERT INTO document_organisation
+                (local_plan_document_reference, organisation)
+            SELECT d.reference, lpo.organisation
+            FROM local_plan_document d
+            JOIN local_plan_organisation lpo ON lpo.local_plan = d.local_plan
+            WHERE NOT EXISTS (
+                SELECT 1 FROM document_organisation x
+                WHERE x.local_plan_document_reference = d.reference
             )
-            boundary.organisations.append(org)
+            ON CONFLICT DO NOTHING
+            RETURNING local_plan_document_reference
+            """
+        )
+    ).all()
+    return len({row.local_plan_document_reference for row in rows}), len(rows)
 
-        for plan in org.local_plans:
-            if plan.local_plan_boundary is None:
-                plan.local_plan_boundary = boundary.reference
-                plan.boundary_status = Status.FOR_REVIEW
-                boundary.local_plans.append(plan)
-                print("Boundary set for plan", plan.reference)
 
-        db.session.add(boundary)
-        db.session.commit()
+@data_cli.command("default-boundaries")
+@click.option("--restart", is_flag=True, help="Ignore any checkpoint and start again")
+def set_default_boundaries(restart):
+    orgs = (
+        Organisation.query.options(
+            db.undefer(Organisation.geometry), db.undefer(Organisation.geojson)
+        )
+        .filter(Organisation.geometry.isnot(None))
+        .all()
+    )
+    plans_updated = 0
+    with CommandRun("default-boundaries", restart=restart) as run:
+        for org in run.pending(orgs, key=lambda org: org.organisation):
+            reference = org.statistical_geography
+            boundary = LocalPlanBoundary.query.get(reference)
+            if boundary is None:
+                boundary = LocalPlanBoundary(
+                    reference=reference,
+                    name=org.name,
+                    description="Default local plan boundary",
+                    geometry=org.geometry,
+                    geojson=org.geojson,
+                )
+                boundary.organisations.append(org)
+
+            for plan in org.local_plans:
+                if plan.local_plan_boundary is None:
+                    plan.local_plan_boundary = boundary.reference
+                    plan.boundary_status = Status.FOR_REVIEW
+                    boundary.local_plans.append(plan)
+                    plans_updated += 1
 
-    print("Default boundaries set")
+            db.session.add(boundary)
+            run.advance(org.organisation)
+
+    print(f"Default boundaries set for {plans_updated} plans")
+
+
+DOCUMENT_TYPES_URL = (
+    "https://dluhc-datasets.planning-data.dev/dataset/local-plan-document-type.json"
+)
+EVENT_TYPES_URL = (
+    "https://dluhc-datasets.planning-data.dev/dataset/local-plan-event.json"
+)
 
 
 @data_cli.command("doc-types")
-def load_doc_types():
-    document_types_url = (
-        "https://dluhc-datasets.planning-data.dev/dataset/local-plan-document-type.json"
+@click.option("--dry-run", is_flag=True, help="Show what would change without writing")
+def load_doc_types(dry_run):
+    _load_types(
+        reference_data.DOCUMENT_TYPES, DOCUMENT_TYPES_URL, "document types", dry_run
     )
+
+
+@data_cli.command("event-types")
+@click.option("--dry-run", is_flag=True, help="Show what would change without writing")
+def load_event_types(dry_run):
+    _load_types(reference_data.EVENT_TYPES, EVENT_TYPES_URL, "event types", dry_run)
+
+
+def _load_types(dataset, url, label, dry_run):
     try:
-        resp = requests.get(document_types_url)
+        resp = get_client().get(url)
         resp.raise_for_status()
-        data = resp.json()
-        for doc_type in data["records"]:
-            name = doc_type["name"]
-            reference = doc_type["reference"]
-            entry_date = doc_type["entry-date"]
-            end_date = doc_type.get("end-date") if doc_type.get("end-date") else None
-            sql = text(
-                """
-                    INSERT INTO local_plan_document_type (name, reference, entry_date, end_date)
-                    VALUES (:name, :reference, :entry_date, :end_date)
-                    ON CONFLICT (reference)
-                    DO UPDATE
-                    SET end_date = EXCLUDED.end_date;
-                """
-            )
-            db.session.execute(
-                sql,
-                {
-                    "name": name,
-                    "reference": reference,
-                    "entry_date": entry_date,
-                    "end_date": end_date,
-                },
+        rows = _type_rows(resp.json()["records"])
+    except requests.exceptions.RequestException as e:
+        raise click.ClickException(f"Error fetching {label}: {e}") from e
+
+    model = REFERENCE_DATASETS[dataset][0]
+    if dry_run:
+        _print_diff(label.capitalize(), _diff_rows(model.__table__, "reference", rows))
+        return
+
+    inserted, updated = _upsert_types(model, rows)
+    if inserted or updated:
+        reference_data.invalidate(dataset)
+    db.session.commit()
+    print(
+        f"{label.capitalize()}: {inserted} inserted, {updated} updated, "
+        f"{len(rows) - inserted - updated} unchanged"
+    )
+
+
+def _type_rows(records):
+    """Build type rows from dataset records or rows of the bundled CSVs"""
+    rows = {}
+    for record in records:
+        row = {
+            "reference": record["reference"],
+            "name": record["name"],
+            "entry_date": record.get("entry-date") or None,
+            "end_date": record.get("end-date") or None,
+        }
+        row["content_hash"] = _content_hash(row)
+        if row["entry_date"] is None:
+            row["entry_date"] = datetime.today().date()
+        rows[row["reference"]] = row
+    return list(rows.values())
+
+
+def _upsert_types(model, rows):
+    # existing types only take the end date from the dataset
+    return _upsert_rows(model.__table__, "reference", rows, ["end_date"])
+
+
+REFERENCE_DATASETS = {
+    reference_data.DOCUMENT_TYPES: (
+        LocalPlanDocumentType,
+        DOCUMENT_TYPES_URL,
+        "local-plan-document-types.csv",
+    ),
+    reference_data.EVENT_TYPES: (
+        LocalPlanEventType,
+        EVENT_TYPES_URL,
+        "local-plan-event.csv",
+    ),
+}
+
+REFERENCE_DATA_TIMEOUT = 10
+
+
+@data_cli.command("sync-reference-data")
+@click.option(
+    "--max-age",
+    type=int,
+    default=None,
+    help="Seconds after a check before upstream is checked again",
+)
+@click.option("--force", is_flag=True, help="Check upstream however recently checked")
+def sync_reference_data(max_age, force):
+    """Sync document and event types, doing as little work as possible
+
+    Run on release. A dataset checked within max age is left alone,
+    otherwise upstream is asked for it with the stored ETag and nothing is
+    written if it has not changed. If upstream cannot be reached, or sends
+    something other than the records expected, the rows held are kept and
+    an empty table is seeded from the CSV bundled in data/.
+    """
+    if max_age is None:
+        max_age = current_app.config["REFERENCE_DATA_MAX_AGE"]
+    current_file_path = Path(__file__).resolve()
+    data_directory = os.path.join(current_file_path.parent.parent, "data")
+
+    for dataset, (model, url, bundled) in REFERENCE_DATASETS.items():
+        now = datetime.now()
+        sync = db.session.get(ReferenceDataSync, dataset)
+        if sync is None:
+            sync = ReferenceDataSync(dataset=dataset)
+        held = db.session.execute(select(func.count()).select_from(model)).scalar()
+
+        if (
+            not force
+            and held
+            and sync.checked_at is not None
+            and (now - sync.checked_at).total_seconds() < max_age
+        ):
+            print(f"{dataset}: checked at {sync.checked_at:%Y-%m-%d %H:%M}, skipping")
+            continue
+
+        headers = {}
+        if held and sync.source == "remote":
+            if sync.etag:
+                headers["If-None-Match"] = sync.etag
+            if sync.last_modified:
+                headers["If-Modified-Since"] = sync.last_modified
+
+        try:
+            resp = get_client().session.get(
+                url, headers=headers, timeout=REFERENCE_DATA_TIMEOUT
             )
+            resp.raise_for_status()
+            if resp.status_code != 304:
+                rows = _type_rows(resp.json()["records"])
+        except (
+            requests.exceptions.RequestException,
+            ValueError,
+            KeyError,
+            TypeError,
+        ) as e:
+            # a release must not fail because upstream is down or sent
+            # something other than the records expected
+            print(f"{dataset}: could not fetch {url}: {e!r}")
+            if held:
+                print(f"{dataset}: keeping the {held} rows held")
+                continue
+            file_path = os.path.join(data_directory, bundled)
+            with open(file_path, newline="") as file:
+                rows = _type_rows(csv.DictReader(file))
+            inserted, _ = _upsert_types(model, rows)
+            sync.source = "bundled"
+            sync.etag = sync.last_modified = None
+            sync.synced_at = now
+            db.session.add(sync)
+            reference_data.invalidate(dataset)
+            db.session.commit()
+            print(f"{dataset}: loaded {inserted} rows from {bundled}")
+            continue
+
+        sync.checked_at = now
+        if resp.status_code == 304:
+            db.session.add(sync)
+            db.session.commit()
+            print(f"{dataset}: not modified upstream")
+            continue
+
+        inserted, updated = _upsert_types(model, rows)
+        sync.source = "remote"
+        sync.etag = resp.headers.get("ETag")
+        sync.last_modified = resp.headers.get("Last-Modified")
+        sync.synced_at = now
+        db.session.add(sync)
+        if inserted or updated:
+            reference_data.invalidate(dataset)
         db.session.commit()
-    except requests.exceptions.HTTPError as e:
-        print("Error fetching document types:", e)
+        print(f"{dataset}: {inserted} inserted, {updated} updated")
 
 
-@data_cli.command("event-types")
-def load_event_types():
-    event_types_url = (
-        "https://dluhc-datasets.planning-data.dev/dataset/local-plan-event.json"
+CANDIDATE_DOCUMENT_COLUMNS = [
+    "local_plan",
+    "document_url",
+    "name",
+    "document_type",
+    "confidence",
+]
+
+
+@data_cli.command("crawl-plans")
+@click.option("--plan", "plan_reference", default=None, help="Only crawl this plan")
+@click.option("--workers", default=8, show_default=True, help="Pages to fetch at once")
+@click.option(
+    "--per-host", default=2, show_default=True, help="Pages to fetch at once per host"
+)
+@click.option("--timeout", default=10, show_default=True, help="Seconds per request")
+@click.option("--refresh", is_flag=True, help="Fetch and parse every page again")
+def crawl_plans(plan_reference, workers, per_host, timeout, refresh):
+    """Crawl plan documentation pages for links to documents to review
+
+    Pages seen before are requested conditionally and only parsed again if
+    their content has changed.
+    """
+    # plain rows rather than LocalPlan instances, as each result is committed
+    # while worker threads, outside the app context, still read the others
+    query = select(LocalPlan.reference, LocalPlan.documentation_url).where(
+        LocalPlan.documentation_url.isnot(None), LocalPlan.documentation_url != ""
+    )
+    if plan_reference:
+        query = query.where(LocalPlan.reference == plan_reference)
+    plans = db.session.execute(query.order_by(LocalPlan.reference)).all()
+    document_types = (
+        db.session.execute(select(LocalPlanDocumentType.name)).scalars().all()
     )
-    try:
-        resp = requests.get(event_types_url)
-        resp.raise_for_status()
-        data = resp.json()
-        for event_type in data["records"]:
-            name = event_type["name"]
-            reference = event_type["reference"]
-            entry_date = event_type["entry-date"]
-            end_date = (
-                event_type.get("end-date") if event_type.get("end-date") else None
-            )
 
-            sql = text(
-                """
-                    INSERT INTO local_plan_event_type (name, reference, entry_date, end_date)
-                    VALUES (:name, :reference, :entry_date, :end_date)
-                    ON CONFLICT (reference)
-                    DO UPDATE
-                    SET end_date = EXCLUDED.end_date;
-                """
+    cache = {}
+    if not refresh:
+        urls = {plan.documentation_url for plan in plans}
+        for page in CrawlPage.query.filter(CrawlPage.url.in_(urls)):
+            cache[page.url] = CachedPage(
+                etag=page.etag,
+                last_modified=page.last_modified,
+                content_hash=page.content_hash,
+                links=page.links or [],
             )
-            db.session.execute(
-                sql,
-                {
-                    "name": name,
-                    "reference": reference,
-                    "entry_date": entry_date,
-                    "end_date": end_date,
+
+    crawler = Crawler(max_workers=workers, per_host=per_host, timeout=timeout)
+    candidates = CandidateDocument.__table__
+    started = time.perf_counter()
+    crawled = failed = found = 0
+    outcomes = defaultdict(int)
+    for result in crawler.crawl(plans, document_types, cache=cache):
+        crawled += 1
+        if result.error is not None:
+            failed += 1
+            print(result.error)
+            continue
+        outcomes[result.outcome] += 1
+
+        _save_crawl_page(result)
+        rows = {}
+        for link in result.links:
+            row = {name: link[name] for name in CANDIDATE_DOCUMENT_COLUMNS}
+            row["documentation_url"] = result.url
+            rows[row["document_url"]] = row
+        if rows:
+            stmt = insert(candidates).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[candidates.c.local_plan, candidates.c.document_url],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in [
+                        "name",
+                        "document_type",
+                        "confidence",
+                        "documentation_url",
+                    ]
                 },
             )
+            db.session.execute(stmt)
         db.session.commit()
-    except requests.exceptions.HTTPError as e:
-        print("Error fetching event types:", e)
+        found += len(rows)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Crawled {crawled} plans ({failed} failed) in {elapsed:.2f}s, "
+        f"found {found} candidate documents"
+    )
+    for outcome, count in outcomes.items():
+        print(f"  {count} pages {outcome}")
+
+
+def _save_crawl_page(result):
+    now = datetime.now()
+    page = {
+        "url": result.url,
+        "etag": result.page.etag,
+        "last_modified": result.page.last_modified,
+        "content_hash": result.page.content_hash,
+        "links": result.page.links,
+        "checked_at": now,
+    }
+    if result.outcome != NOT_MODIFIED:
+        page["fetched_at"] = now
+    stmt = insert(CrawlPage.__table__).values(page)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CrawlPage.__table__.c.url],
+        set_={name: stmt.excluded[name] for name in page if name != "url"},
+    )
+    db.session.execute(stmt)
+
+
+URL_CHECK_BATCH_SIZE = 500
+
+
+@data_cli.command("check-document-urls")
+@click.option(
+    "--max-age", default=7, show_default=True, help="Days before a url is rechecked"
+)
+@click.option("--workers", default=32, show_default=True, help="Urls to check at once")
+@click.option(
+    "--per-host", default=4, show_default=True, help="Urls to check at once per host"
+)
+@click.option("--timeout", default=10, show_default=True, help="Seconds per request")
+def check_document_urls(max_age, workers, per_host, timeout):
+    """Check which document urls are live, rechecking only stale results"""
+    stale = datetime.now() - timedelta(days=max_age)
+    documents = LocalPlanDocument.__table__
+    urls = (
+        db.session.execute(
+            select(documents.c.document_url)
+            .distinct()
+            .where(
+                func.nullif(documents.c.document_url, "").isnot(None),
+                (documents.c.url_checked_at.is_(None))
+                | (documents.c.url_checked_at < stale),
+            )
+        )
+        .scalars()
+        .all()
+    )
+    print(f"Checking {len(urls)} document urls not checked in the last {max_age} days")
+
+    checker = LinkChecker(max_workers=workers, per_host=per_host, timeout=timeout)
+    started = time.perf_counter()
+    results = defaultdict(int)
+    batch = []
+    for check in checker.check_all(urls):
+        results["ok" if check.ok else str(check.status_code or "error")] += 1
+        batch.append(
+            {
+                "url": check.url,
+                "url_status_code": check.status_code,
+                "url_content_type": check.content_type,
+                "url_size": check.size,
+                "url_error": check.error,
+                "url_checked_at": datetime.now(),
+            }
+        )
+        if len(batch) >= URL_CHECK_BATCH_SIZE:
+            _save_url_checks(batch)
+            batch = []
+    _save_url_checks(batch)
+
+    elapsed = time.perf_counter() - started
+    print(f"Checked {len(urls)} urls in {elapsed:.2f}s ({_rate(len(urls), elapsed)})")
+    for result, count in sorted(results.items()):
+        print(f"  {result:<8} {count}")
+
+
+def _save_url_checks(rows):
+    if not rows:
+        return
+    # a url is checked once, for every document that links to it
+    documents = LocalPlanDocument.__table__
+    db.session.execute(
+        update(documents)
+        .where(documents.c.document_url == bindparam("url"))
+        .values(
+            url_status_code=bindparam("url_status_code"),
+            url_content_type=bindparam("url_content_type"),
+            url_size=bindparam("url_size"),
+            url_error=bindparam("url_error"),
+            url_checked_at=bindparam("url_checked_at"),
+        ),
+        rows,
+    )
+    db.session.commit()
+
+
+DOCUMENT_METADATA_BATCH_SIZE = 500
+
+
+@data_cli.command("document-metadata")
+@click.option(
+    "--refresh", is_flag=True, default=False, help="Read documents already read"
+)
+@click.option(
+    "--workers", default=8, show_default=True, help="Documents to read at once"
+)
+@click.option(
+    "--per-host",
+    default=2,
+    show_default=True,
+    help="Documents to read at once per host",
+)
+@click.option("--timeout", default=30, show_default=True, help="Seconds per request")
+def document_metadata(refresh, workers, per_host, timeout):
+    """Record page count, title and size of document PDFs using range requests"""
+    documents = LocalPlanDocument.__table__
+    query = (
+        select(documents.c.document_url)
+        .distinct()
+        .where(func.nullif(documents.c.document_url, "").isnot(None))
+    )
+    if not refresh:
+        query = query.where(documents.c.metadata_checked_at.is_(None))
+    urls = db.session.execute(query).scalars().all()
+    print(f"Reading metadata of {len(urls)} documents")
+
+    reader = PdfMetadataReader(max_workers=workers, per_host=per_host, timeout=timeout)
+    started = time.perf_counter()
+    bytes_read = 0
+    errors = 0
+    batch = []
+    for metadata in reader.read_all(urls):
+        bytes_read += metadata.bytes_read
+        if metadata.error:
+            errors += 1
+            print(f"  {metadata.url}: {metadata.error}")
+            if metadata.transient:
+                # left unchecked, and with anything read before, to try again
+                continue
+        # a PDF that can't be read is recorded with its error, and any size
+        # the server gave, so it isn't downloaded again on every run
+        batch.append(
+            {
+                "url": metadata.url,
+                "page_count": metadata.page_count,
+                "file_size": metadata.size,
+                "pdf_title": metadata.title,
+                "metadata_error": metadata.error,
+                "metadata_checked_at": datetime.now(),
+            }
+        )
+        if len(batch) >= DOCUMENT_METADATA_BATCH_SIZE:
+            _save_document_metadata(batch)
+            batch = []
+    _save_document_metadata(batch)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Read {len(urls)} documents in {elapsed:.2f}s ({_rate(len(urls), elapsed)}), "
+        f"{bytes_read / 1024 / 1024:.1f}MB downloaded, {errors} errors"
+    )
+
+
+def _save_document_metadata(rows):
+    if not rows:
+        return
+    documents = LocalPlanDocument.__table__
+    db.session.execute(
+        update(documents)
+        .where(documents.c.document_url == bindparam("url"))
+        .values(
+            page_count=bindparam("page_count"),
+            file_size=bindparam("file_size"),
+            pdf_title=bindparam("pdf_title"),
+            metadata_error=bindparam("metadata_error"),
+            metadata_checked_at=bindparam("metadata_checked_at"),
+        ),
+        rows,
+    )
+    db.session.commit()
 
 
 @data_cli.command("load-all")
-@click.pass_context
-def load_all(ctx):
-    ctx.invoke(load_orgs)
-    ctx.invoke(load_plans)
-    ctx.invoke(load_boundaries)
-    ctx.invoke(set_default_boundaries)
-    ctx.invoke(load_doc_types)
-    ctx.invoke(load_event_types)
+@click.option("--workers", default=3, show_default=True, help="Steps to run at once")
+def load_all(workers):
+    graph = TaskGraph()
+    graph.add("load-orgs", _step(load_orgs))
+    graph.add("load-plans", _step(load_plans), depends_on=["load-orgs"])
+    graph.add("load-boundaries", _step(load_boundaries), depends_on=["load-orgs"])
+    graph.add(
+        "default-boundaries",
+        _step(set_default_boundaries),
+        depends_on=["load-plans", "load-boundaries"],
+    )
+    graph.add("doc-types", _step(load_doc_types))
+    graph.add("event-types", _step(load_event_types))
+
+    started = time.perf_counter()
+    steps = graph.run(current_app._get_current_object(), max_workers=workers)
+    elapsed = time.perf_counter() - started
+
+    print("\nStep timings")
+    for step in steps:
+        print(f"  {step.name:<20} {step.status:<10} {step.elapsed:8.2f}s")
+        if step.error is not None:
+            print(f"    {step.error}")
+    print(
+        f"  {'total':<20} {'':<10} {elapsed:8.2f}s "
+        f"(sequential {sum(step.elapsed for step in steps):.2f}s)"
+    )
+
+    if any(step.status != SUCCEEDED for step in steps):
+        raise click.ClickException("Data load did not complete")
     print("Data load complete")
 
 
+def _step(command):
+    """Wrap a command so a worker thread can invoke it with its own click context"""
+
+    def run():
+        click.Context(command).invoke(command)
+
+    return run
+
+
 @data_cli.command("load-db-backup")
-def load_db_backup():
+@click.option(
+    "--jobs", type=int, default=None, help="pg_restore jobs, one per CPU by default"
+)
+def load_db_backup(jobs):
     import subprocess
     import sys
 
@@ -410,57 +1065,40 @@ def load_db_backup():
         if result.returncode != 0:
             print("Error downloading the backup")
             sys.exit(1)
+        write_checksum(local_dump)
 
-    # restore the dump to the local database
-    subprocess.run(
-        [
-            "pg_restore",
-            "--verbose",
-            "--clean",
-            "--no-acl",
-            "--no-owner",
-            "-h",
-            "localhost",
-            "-d",
-            "local_plans",
-            local_dump,
-        ]
-    )
-    print(
-        "\n\nRestored the dump to the local database using pg_restore. You can ignore warnings from pg_restore."
-    )
-
-    print("Data loaded successfully")
+    _restore_snapshot(local_dump, jobs)
 
 
 @data_cli.command("set-org-websites")
 def set_org_websites():
-    base_url = "https://datasette.planning.data.gov.uk/digital-land/organisation.json"
-    orgs = Organisation.query.all()
-    for org in orgs:
-        params = {
-            "website__notblank": 1,
-            "organisation__exact": org.organisation,
-            "_shape": "array",
-        }
+    websites = {
+        org["organisation"]: org["website"]
+        for org in _fetch_organisations()
+        if org["organisation"] and org.get("website")
+    }
+    with CommandRun("set-org-websites") as run:
+        orgs = Organisation.query.with_entities(
+            Organisation.organisation, Organisation.website
+        ).all()
+        run.total = len(orgs)
+        updates = [
+            {"org": org.organisation, "website": websites[org.organisation]}
+            for org in orgs
+            if org.organisation in websites
+            and websites[org.organisation] != org.website
+        ]
+        if updates:
+            db.session.execute(
+                update(Organisation.__table__)
+                .where(Organisation.__table__.c.organisation == bindparam("org"))
+                .values(website=bindparam("website")),
+                updates,
+            )
+        run.advance(None, count=len(orgs))
 
-        try:
-            resp = requests.get(base_url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            print(f"Fetching data for {org.organisation}")
-            if len(data) > 0:
-                website = data[0].get("website")
-                if website:
-                    org.website = website
-                    db.session.add(org)
-                    db.session.commit()
-                    print(f"Set website {website} for {org.organisation}")
-            else:
-                print(f"No website found for {org.organisation}")
-        except Exception as e:
-            print(f"Error fetching data for {org.organisation}: {e}")
-            continue
+    missing = sum(1 for org in orgs if org.organisation not in websites)
+    print(f"Set website for {len(updates)} organisations, {missing} have no website")
 
 
 def _make_reference(name, period_start_date, period_end_date, organisation):
@@ -483,34 +1121,142 @@ def _make_reference(name, period_start_date, period_end_date, organisation):
     return reference
 
 
+@data_cli.command("runs")
+def show_runs():
+    """Show the checkpoint of each data command"""
+    checkpoints = CommandCheckpoint.query.order_by(CommandCheckpoint.command).all()
+    if not checkpoints:
+        print("No command runs recorded")
+    for checkpoint in checkpoints:
+        progress = f"{checkpoint.processed}"
+        if checkpoint.total:
+            progress += f"/{checkpoint.total}"
+        print(
+            f"{checkpoint.command:<28} {checkpoint.status:<10} {progress:<12} "
+            f"updated {checkpoint.updated_at:%Y-%m-%d %H:%M:%S}"
+        )
+        if checkpoint.status != COMPLETED and checkpoint.position is not None:
+            print(f"  will resume after {checkpoint.position}")
+
+
+# legacy document type values that were renamed in the document type dataset
+DOCUMENT_TYPE_ALIASES = {
+    "financial-viability-study": "viability-assessment",
+}
+
+MIGRATE_BATCH_SIZE = 1000
+
+MIGRATE_DOC_TYPES_SQL = """
+    WITH type_map AS (
+        SELECT * FROM unnest(CAST(:sources AS text[]), CAST(:targets AS text[]))
+            AS m(source, target)
+    ),
+    mapped AS (
+        SELECT d.reference, d.document_types AS old_types,
+            array_agg(m.target ORDER BY u.position)
+                FILTER (WHERE m.target IS NOT NULL) AS new_types
+        FROM local_plan_document d
+        CROSS JOIN LATERAL unnest(d.document_types) WITH ORDINALITY
+            AS u(value, position)
+        LEFT JOIN type_map m ON m.source = u.value
+        WHERE d.reference > :after AND d.reference <= :upto
+        GROUP BY d.reference, d.document_types
+    ),
+    changed AS (
+        SELECT * FROM mapped
+        WHERE new_types IS NOT NULL AND new_types <> old_types
+    )
+"""
+
+
 @data_cli.command("migrate-doc-types")
-def migrate_doc_types():
-    documents = LocalPlanDocument.query.filter(
-        LocalPlanDocument.document_types.isnot(None)
+@click.option("--dry-run", is_flag=True, help="Show the changes without making them")
+def migrate_doc_types(dry_run):
+    """Rewrite document_types values as local plan document type references"""
+    references = set(
+        db.session.execute(select(LocalPlanDocumentType.reference)).scalars()
+    )
+    values = db.session.execute(
+        text(
+            """
+            SELECT value, COUNT(*) AS documents
+            FROM local_plan_document, unnest(document_types) AS value
+            WHERE value IS NOT NULL
+            GROUP BY value
+            ORDER BY value
+            """
+        )
     ).all()
-    for document in documents:
-        updated_document_types = []
-        for doc_type in document.document_types:
-            ref = doc_type.lower().replace("_", "-")
-            if ref == "financial-viability-study":
-                ref = "viability-assessment"
-            document_type = LocalPlanDocumentType.query.get(ref)
-            if document_type is None:
-                print(
-                    f"No matching document type found for {ref} for document {document.reference}"
-                )
-            else:
-                updated_document_types.append(document_type.reference)
-        if updated_document_types:
-            document.document_types = updated_document_types
-            db.session.add(document)
+
+    type_map = {}
+    for value, documents in values:
+        ref = value.lower().replace("_", "-")
+        ref = DOCUMENT_TYPE_ALIASES.get(ref, ref)
+        if ref in references:
+            type_map[value] = ref
+        else:
+            print(f"No matching document type found for {ref} ({documents} documents)")
+
+    params = {"sources": list(type_map), "targets": list(type_map.values())}
+    if dry_run:
+        statement = text(
+            MIGRATE_DOC_TYPES_SQL
+            + "SELECT reference, old_types, new_types FROM changed ORDER BY reference"
+        )
+    else:
+        statement = text(
+            MIGRATE_DOC_TYPES_SQL
+            + """
+            UPDATE local_plan_document d
+            SET document_types = c.new_types
+            FROM changed c
+            WHERE d.reference = c.reference
+            RETURNING d.reference
+            """
+        )
+
+    changed = 0
+    after = ""
+    while True:
+        upto = db.session.execute(
+            text(
+                """
+                SELECT MAX(reference) FROM (
+                    SELECT reference FROM local_plan_document
+                    WHERE document_types IS NOT NULL AND reference > :after
+                    ORDER BY reference
+                    LIMIT :limit
+                ) AS batch
+                """
+            ),
+            {"after": after, "limit": MIGRATE_BATCH_SIZE},
+        ).scalar()
+        if upto is None:
+            break
+
+        rows = db.session.execute(
+            statement, {**params, "after": after, "upto": upto}
+        ).all()
+        if dry_run:
+            for row in rows:
+                print(f"{row.reference}: {row.old_types} -> {row.new_types}")
+        else:
             db.session.commit()
-            print(f"Updated document types for {document.reference}")
+        changed += len(rows)
+        after = upto
+
+    if dry_run:
+        print(f"Dry run: would update document types for {changed} documents")
+    else:
+        print(f"Updated document types for {changed} documents")
 
 
 @data_cli.command("docker-db-backup")
 @click.argument("file")
-def load_backup_from_file_in_docker(file):
+@click.option(
+    "--jobs", type=int, default=None, help="pg_restore jobs, one per CPU by default"
+)
+def load_backup_from_file_in_docker(file, jobs):
     current_file_path = Path(__file__).resolve()
     base_directory = current_file_path.parent.parent
     file_path = os.path.join(base_directory, file)
@@ -526,185 +1272,277 @@ def load_backup_from_file_in_docker(file):
         sys.exit(0)
 
     print(f"Local backup from {file_path}")
-    subprocess.run(
-        [
-            "pg_restore",
-            "--verbose",
-            "--clean",
-            "--no-acl",
-            "--no-owner",
-            "-h",
-            "db",
-            "-U",
-            "postgres",
-            "-d",
-            "local_plans",
-            file_path,
-        ]
-    )
+    _restore_snapshot(file_path, jobs)
+
+
+def _restore_snapshot(dump_path, jobs):
+    """Restore dump_path into a template database and copy it over the app's database"""
+    snapshots = SnapshotManager(current_app.config["SQLALCHEMY_DATABASE_URI"])
+    started = time.perf_counter()
+    try:
+        template = snapshots.restore(dump_path, jobs=jobs)
+    except SnapshotError as e:
+        print(e)
+        sys.exit(1)
+    restored = time.perf_counter() - started
+
+    # the app's own connections would block dropping the database
+    db.session.remove()
+    db.engine.dispose()
+    snapshots.create_from_template(template)
+    # processes still running against the old database reload reference data
+    reference_data.invalidate(*reference_data.DATASETS)
+    db.session.commit()
     print(
-        "\n\nRestored the dump to the local database using pg_restore. You can ignore warnings from pg_restore."
+        f"Restored {snapshots.database} from template {template} "
+        f"({restored:.1f}s restore, {time.perf_counter() - started - restored:.1f}s copy)"
     )
-
     print("Data loaded successfully")
 
 
+@data_cli.command("reset-db")
+def reset_db():
+    """Replace the database with a fresh copy of the last restored backup"""
+    snapshots = SnapshotManager(current_app.config["SQLALCHEMY_DATABASE_URI"])
+    templates = snapshots.templates()
+    if not templates:
+        print("No restored backup found, run load-db-backup first")
+        sys.exit(1)
+    db.session.remove()
+    db.engine.dispose()
+    started = time.perf_counter()
+    snapshots.create_from_template(templates[-1])
+    reference_data.invalidate(*reference_data.DATASETS)
+    db.session.commit()
+    print(
+        f"Reset {snapshots.database} from {templates[-1]} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
 @data_cli.command("fix-duplicate-document-references")
 def fix_duplicate_document_references():
-    """Find and fix any duplicate document references"""
-    from sqlalchemy import text
+    """Find and fix any duplicate document references
+
+    Every document sharing a reference with a document in another plan is
+    renamed by the rule make_document_reference uses for new documents:
+    <reference>-<local plan>, then with the date appended, then a random
+    suffix, whichever is free first, including of the references given out
+    in this run. Documents and their organisation rows are updated by one
+    statement, so the foreign key from document_organisation is satisfied
+    when it is checked at the end of the statement.
+    """
+    print("Finding duplicate document references...")
 
-    from application.blueprints.document.views import make_document_reference
+    try:
+        renames, organisation_rows = _rename_duplicate_documents()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error fixing duplicate references: {e}")
+        return
 
-    # First make the constraint deferrable
-    db.session.execute(
-        text(
-            """
-            ALTER TABLE document_organisation
-            DROP CONSTRAINT document_organisation_local_plan_document_reference_local__fkey,
-            ADD CONSTRAINT document_organisation_local_plan_document_reference_local__fkey
-            FOREIGN KEY (local_plan_document_reference, local_plan_document_local_plan)
-            REFERENCES local_plan_document(reference, local_plan)
-            DEFERRABLE INITIALLY DEFERRED;
-            """
+    for reference, local_plan, new_reference in renames:
+        print(
+            f"Updated document reference for plan {local_plan} "
+            f"from '{reference}' to '{new_reference}'"
         )
+    references = len({reference for reference, _, _ in renames})
+    print(
+        f"\nRenamed {len(renames)} documents sharing {references} references "
+        f"and updated {organisation_rows} document organisation rows"
     )
-    db.session.commit()
 
-    # First find all duplicate references
-    duplicate_refs = db.session.execute(
+
+def _rename_duplicate_documents():
+    """Rename documents whose reference is used in more than one plan.
+
+    Returns a list of (reference, local_plan, new_reference) and the number
+    of document organisation rows written. Does not commit.
+    """
+    from application.blueprints.document.views import (
+        document_reference_candidates,
+        make_document_reference,
+    )
+
+    duplicates = db.session.execute(
         text(
             """
-            SELECT reference
+            SELECT reference, local_plan
             FROM local_plan_document
-            GROUP BY reference
-            HAVING COUNT(local_plan) > 1
+            WHERE reference IN (
+                SELECT reference
+                FROM local_plan_document
+                GROUP BY reference
+                HAVING COUNT(local_plan) > 1
+            )
+            ORDER BY reference, local_plan
             """
         )
-    ).fetchall()
+    ).all()
 
-    print(f"Found {len(duplicate_refs)} references that have duplicates")
+    # every candidate reference is looked up at once, so the round trips
+    # don't grow with the number of duplicates
+    candidates = set()
+    for reference, local_plan in duplicates:
+        candidates.update(document_reference_candidates(reference, local_plan))
+    existing = set()
+    if candidates:
+        existing = set(
+            db.session.execute(
+                select(LocalPlanDocument.reference).where(
+                    LocalPlanDocument.reference.in_(candidates)
+                )
+            ).scalars()
+        )
 
-    for ref in duplicate_refs:
-        reference = ref[0]
-        # Get all documents with this reference
-        docs = db.session.execute(
+    renames = []
+    taken = set()
+    for reference, local_plan in duplicates:
+        new_reference = make_document_reference(reference, local_plan, taken, existing)
+        taken.add(new_reference)
+        renames.append((reference, local_plan, new_reference))
+    if not renames:
+        return renames, 0
+
+    # document_organisation only holds the reference, so each renamed
+    # document keeps the organisations linked to the reference it had
+    organisation_rows = (
+        db.session.execute(
             text(
                 """
-                SELECT reference, local_plan, name
-                FROM local_plan_document
-                WHERE reference = :reference
-                ORDER BY local_plan
-                """
+            WITH renames AS (
+                SELECT *
+                FROM unnest(
+                    CAST(:references AS text[]),
+                    CAST(:local_plans AS text[]),
+                    CAST(:new_references AS text[])
+                ) AS r(reference, local_plan, new_reference)
             ),
-            {"reference": reference},
-        ).fetchall()
-
-        print(f"\nFound {len(docs)} documents with reference '{reference}'")
-
-        for doc in docs:
-            try:
-                old_ref = doc.reference
-                new_ref = make_document_reference(doc.reference, doc.local_plan)
-                print(f"Updating document for plan {doc.local_plan}")
-
-                # Do updates in a single transaction
-                db.session.execute(
-                    text(
-                        """
-                        BEGIN;
-                        UPDATE local_plan_document
-                        SET reference = :new_ref
-                        WHERE reference = :old_ref
-                        AND local_plan = :local_plan;
-
-                        UPDATE document_organisation
-                        SET local_plan_document_reference = :new_ref
-                        WHERE local_plan_document_reference = :old_ref
-                        AND local_plan_document_local_plan = :local_plan;
-
-                        COMMIT;
-                        """
-                    ),
-                    {
-                        "new_ref": new_ref,
-                        "old_ref": old_ref,
-                        "local_plan": doc.local_plan,
-                    },
-                )
-
-                print(f"Updated document reference from '{old_ref}' to '{new_ref}'")
-
-            except Exception as e:
-                db.session.execute(text("ROLLBACK;"))
-                print(f"Error updating document {old_ref}: {str(e)}")
-                continue
-
-    # Restore the constraint to its original state
-    db.session.execute(
-        text(
-            """
-            ALTER TABLE document_organisation
-            DROP CONSTRAINT document_organisation_local_plan_document_reference_local__fkey,
-            ADD CONSTRAINT document_organisation_local_plan_document_reference_local__fkey
-            FOREIGN KEY (local_plan_document_reference, local_plan_document_local_plan)
-            REFERENCES local_plan_document(reference, local_plan)
-            NOT DEFERRABLE;
+            documents AS (
+                UPDATE local_plan_document d
+                SET reference = r.new_reference
+                FROM renames r
+                WHERE d.reference = r.reference
+                AND d.local_plan = r.local_plan
+                RETURNING d.reference
+            ),
+            added AS (
+                INSERT INTO document_organisation
+                    (local_plan_document_reference, organisation)
+                SELECT r.new_reference, o.organisation
+                FROM renames r
+                JOIN document_organisation o
+                    ON o.local_plan_document_reference = r.reference
+                ON CONFLICT DO NOTHING
+                RETURNING organisation
+            ),
+            removed AS (
+                DELETE FROM document_organisation o
+                USING renames r
+                WHERE o.local_plan_document_reference = r.reference
+                RETURNING organisation
+            )
+            SELECT (SELECT COUNT(*) FROM added) + (SELECT COUNT(*) FROM removed)
+                AS organisation_rows
             """
+            ),
+            {
+                "references": [reference for reference, _, _ in renames],
+                "local_plans": [local_plan for _, local_plan, _ in renames],
+                "new_references": [new_reference for _, _, new_reference in renames],
+            },
         )
+        .one()
+        .organisation_rows
     )
-    db.session.commit()
-
-    print("\nAll duplicate references have been fixed")
+    return renames, organisation_rows
+
+
+# documents are identified by (reference, local_plan) throughout, as
+# fix-duplicate-document-references does, so a reference used in two plans is
+# never merged across them. document_organisation only holds the reference.
+DUPLICATE_DOCUMENTS_SQL = """
+    WITH document_orgs AS (
+        SELECT d.reference, d.local_plan, d.document_url,
+            COALESCE(
+                array_agg(o.organisation ORDER BY o.organisation)
+                    FILTER (WHERE o.organisation IS NOT NULL),
+                '{}'
+            ) AS organisations
+        FROM local_plan_document d
+        LEFT JOIN document_organisation o
+            ON o.local_plan_document_reference = d.reference
+        WHERE d.end_date IS NULL
+        GROUP BY d.reference, d.local_plan
+    ),
+    ranked AS (
+        SELECT reference, local_plan, document_url,
+            row_number() OVER duplicates AS position,
+            first_value(reference) OVER duplicates AS keeper
+        FROM document_orgs
+        WINDOW duplicates AS (
+            PARTITION BY local_plan, document_url, organisations
+            ORDER BY length(reference), reference
+        )
+    )
+"""
 
 
 @data_cli.command("dedupe-documents")
-def dedupe_documents():
-    """Remove duplicate LocalPlanDocuments that share the same local plan, organisations and document URL"""
+@click.option("--dry-run", is_flag=True, help="Report duplicates without changing them")
+def dedupe_documents(dry_run):
+    """End date duplicate LocalPlanDocuments that share the same local plan, organisations and document URL
+
+    Current documents are grouped in SQL and the one with the shortest
+    reference in each group is kept.
+    """
     print("Finding duplicate documents...")
 
-    # Get all documents grouped by their identifying characteristics
-    documents = LocalPlanDocument.query.all()
-    duplicates = defaultdict(list)
-
-    for doc in documents:
-        # Create tuple of identifying characteristics
-        key = (
-            doc.local_plan,
-            doc.document_url,
-            # Convert organisations list to frozen set for hashability
-            frozenset(org.organisation for org in doc.organisations),
+    if dry_run:
+        rows = db.session.execute(
+            text(
+                DUPLICATE_DOCUMENTS_SQL
+                + """
+                SELECT keeper, reference, document_url
+                FROM ranked
+                WHERE position > 1
+                ORDER BY keeper, reference
+                """
+            ).execution_options(stream_results=True, yield_per=1000)
         )
-        duplicates[key].append(doc)
-
-    end_date_count = 0
-
-    # Process each group of potential duplicates
-    for key, docs in duplicates.items():
-        if len(docs) > 1:
-            # Sort by reference length to keep shortest
-            docs.sort(key=lambda x: len(x.reference))
-            keeper = docs[0]
-
-            print(f"\nFound {len(docs)} duplicates for document URL: {key[1]}")
-            print(f"Keeping document with reference: {keeper.reference}")
-
-            # Set end date for all but the keeper
-            for doc in docs[1:]:
-                try:
-                    print(
-                        f"Setting end date for duplicate with reference: {doc.reference}"
-                    )
-                    doc.end_date = datetime.now().date()
-                    end_date_count += 1
-                except Exception as e:
-                    print(f"Error updating document {doc.reference}: {str(e)}")
-                    db.session.rollback()
-                    continue
+        keepers = duplicates = 0
+        current_keeper = None
+        for row in rows:
+            if row.keeper != current_keeper:
+                current_keeper = row.keeper
+                keepers += 1
+                print(f"\nDocument URL: {row.document_url}")
+                print(f"  keep    {row.keeper}")
+            print(f"  end     {row.reference}")
+            duplicates += 1
+        print(
+            f"\nDry run: would set end date for {duplicates} duplicates "
+            f"of {keepers} documents"
+        )
+        return
 
     try:
+        result = db.session.execute(
+            text(
+                DUPLICATE_DOCUMENTS_SQL
+                + """
+                UPDATE local_plan_document d
+                SET end_date = CURRENT_DATE
+                FROM ranked r
+                WHERE d.reference = r.reference
+                AND d.local_plan = r.local_plan
+                AND r.position > 1
+                """
+            )
+        )
         db.session.commit()
-        print(f"\nSuccessfully set end date for {end_date_count} duplicate documents")
+        print(f"Successfully set end date for {result.rowcount} duplicate documents")
     except Exception as e:
         db.session.rollback()
         print(f"Error committing changes: {str(e)}")
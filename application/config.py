@@ -31,6 +31,11 @@ class Config(object):
     SAFE_URLS = set(os.getenv("SAFE_URLS", "").split(","))
     LOCAL_PLANS_REPO_NAME = os.getenv("LOCAL_PLANS_REPO_NAME")
     LOCAL_PLANS_REPO_DATA_PATH = os.getenv("LOCAL_PLANS_REPO_DATA_PATH")
+    HTTP_CACHE_DIR = os.getenv(
+        "HTTP_CACHE_DIR", os.path.join(PROJECT_ROOT, "data", "cache", "http")
+    )
+    HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 3600))
+    REFERENCE_DATA_MAX_AGE = int(os.getenv("REFERENCE_DATA_MAX_AGE", 86400))
 
 
 class DevelopmentConfig(Config):
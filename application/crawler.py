@@ -0,0 +1,234 @@
+"""Concurrent crawler for local plan documentation pages.
+
+Pages are fetched on a thread pool through one pooled requests session,
+with at most per_host requests to any one host at a time so that a
+council's site is not hit by every worker at once. Work waiting on a busy
+host is held back rather than handed to the pool, see map_by_host. Bodies larger than
+max_bytes are abandoned rather than read into memory. Links that look like
+documents are extracted with scraping.extract_links and matched to
+document types by one classifier shared across the crawl.
+
+Given the pages seen by an earlier crawl, requests are made conditional on
+their ETag / Last-Modified. A page that is not modified, or comes back
+with the same content hash, reuses the links found last time instead of
+being parsed again.
+"""
+
+import hashlib
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from application.classifier import DocumentTypeClassifier
+from application.scraping import extract_links
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "local-plans-explorer crawler"
+
+# what happened to a page's links
+PARSED = "parsed"
+UNCHANGED = "unchanged"
+NOT_MODIFIED = "not modified"
+
+
+class CrawlError(Exception):
+    pass
+
+
+@dataclass
+class CachedPage:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    links: List[dict] = field(default_factory=list)
+
+
+@dataclass
+class CrawlResult:
+    plan: object
+    url: str
+    links: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+    page: Optional[CachedPage] = None
+    outcome: Optional[str] = None
+
+    @property
+    def changed(self):
+        return self.outcome == PARSED
+
+
+class Crawler:
+    def __init__(
+        self,
+        max_workers=8,
+        per_host=2,
+        timeout=DEFAULT_TIMEOUT,
+        max_bytes=DEFAULT_MAX_BYTES,
+        retries=2,
+        verify=False,
+    ):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        # plenty of council sites have certificate problems, as the
+        # original scraper found, so verification is off unless asked for
+        self.verify = verify
+        if not verify:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        self._host_slots_lock = threading.Lock()
+
+    def fetch(self, url, headers=None):
+        """GET url within the host's limit.
+
+        Returns the response, already closed, and the body, which is None
+        for a 304.
+        """
+        with self._slot(url):
+            try:
+                with self.session.get(
+                    url,
+                    headers=headers,
+                    timeout=self.timeout,
+                    verify=self.verify,
+                    stream=True,
+                ) as resp:
+                    if resp.status_code == 304:
+                        return resp, None
+                    resp.raise_for_status()
+                    length = resp.headers.get("Content-Length")
+                    if length and length.isdigit() and int(length) > self.max_bytes:
+                        raise CrawlError(f"{url} is {length} bytes, too large")
+                    body = bytearray()
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        body.extend(chunk)
+                        if len(body) > self.max_bytes:
+                            raise CrawlError(
+                                f"{url} is over {self.max_bytes} bytes, too large"
+                            )
+                    return resp, bytes(body)
+            except requests.exceptions.RequestException as e:
+                raise CrawlError(f"Error fetching {url}: {e}") from e
+
+    def crawl_plan(self, plan, classifier, cached=None):
+        url = plan.documentation_url
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        try:
+            resp, body = self.fetch(url, headers=headers)
+        except CrawlError as e:
+            return CrawlResult(plan, url, error=str(e))
+
+        if body is None:
+            if cached is None:
+                return CrawlResult(plan, url, error=f"{url} is not modified")
+            return self._reuse(plan, url, cached, cached, NOT_MODIFIED)
+
+        page = CachedPage(
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            content_hash=hashlib.sha256(body).hexdigest(),
+        )
+        if cached is not None and cached.content_hash == page.content_hash:
+            return self._reuse(plan, url, cached, page, UNCHANGED)
+
+        links = extract_links(body, resp.url, plan, classifier)
+        page.links = [_without_plan(link) for link in links]
+        return CrawlResult(plan, url, links=links, page=page, outcome=PARSED)
+
+    def crawl(self, plans, document_types, cache=None):
+        """Crawl the documentation url of each plan, yielding results as they finish.
+
+        plans only need reference and documentation_url attributes. Pass plain
+        values rather than ORM instances, which can be expired by a commit
+        while worker threads are still reading them.
+        cache maps urls to the CachedPage from an earlier crawl.
+        """
+        cache = cache or {}
+        classifier = DocumentTypeClassifier(document_types)
+        yield from self.map_by_host(
+            lambda plan: self.crawl_plan(
+                plan, classifier, cache.get(plan.documentation_url)
+            ),
+            plans,
+            url=lambda plan: plan.documentation_url,
+        )
+
+    def map_by_host(self, fn, items, url=None):
+        """Call fn with each item on a thread pool, yielding results as they finish.
+
+        Items are queued by the host of url(item), the item itself by
+        default, and only per_host of a host's items are handed to the pool
+        at once. Urls bunch up on a few hosts, so submitting everything
+        would leave most pool threads waiting on those hosts' slots.
+        """
+        url = url or (lambda item: item)
+        queues = defaultdict(deque)
+        for item in items:
+            queues[_host(url(item))].append(item)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+
+            def submit(host):
+                running[executor.submit(fn, queues[host].popleft())] = host
+
+            for host, queue in queues.items():
+                for _ in range(min(self.per_host, len(queue))):
+                    submit(host)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host = running.pop(future)
+                    if queues[host]:
+                        submit(host)
+                    yield future.result()
+
+    @staticmethod
+    def _reuse(plan, url, cached, page, outcome):
+        page.links = cached.links
+        links = [{**link, "local_plan": plan.reference} for link in cached.links]
+        return CrawlResult(plan, url, links=links, page=page, outcome=outcome)
+
+    def _slot(self, url):
+        with self._host_slots_lock:
+            return self._host_slots[_host(url)]
+
+
+def _host(url):
+    return urlsplit(url).netloc.lower()
+
+
+def _without_plan(link):
+    return {key: value for key, value in link.items() if key != "local_plan"}
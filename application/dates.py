@@ -0,0 +1,48 @@
+"""Partial dates, as entered for timetable events: YYYY, YYYY-MM or YYYY-MM-DD.
+
+A partial date is normalised to the first day of the period it covers,
+kept with its precision so it can be shown as entered.
+"""
+
+import datetime
+import re
+
+YEAR = "year"
+MONTH = "month"
+DAY = "day"
+
+PARTIAL_DATE = re.compile(r"(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?")
+
+
+def parse_partial_date(value):
+    """Return (date, precision) for a partial date string, or (None, None)."""
+    match = PARTIAL_DATE.fullmatch(value.strip()) if value else None
+    if match is None:
+        return None, None
+    year, month, day = match.groups()
+    try:
+        date = datetime.date(int(year), int(month or 1), int(day or 1))
+    except ValueError:
+        return None, None
+    return date, DAY if day else MONTH if month else YEAR
+
+
+def partial_date_parts(date, precision):
+    """The day, month and year of a partial date as strings, blank if not known."""
+    if date is None:
+        return {"day": "", "month": "", "year": ""}
+    return {
+        "day": str(date.day) if precision == DAY else "",
+        "month": str(date.month) if precision in (DAY, MONTH) else "",
+        "year": str(date.year),
+    }
+
+
+def format_partial_date(date, precision):
+    if date is None:
+        return ""
+    if precision == DAY:
+        return date.strftime("%-d{} %B %Y").format("st" if date.day == 1 else "th")
+    if precision == MONTH:
+        return date.strftime("%B %Y")
+    return f"{date.year:04d}"
@@ -92,12 +92,16 @@ class LocalPlanDocumentModel(LocalPlanBaseModel):
     notes: Optional[str] = None
     description: Optional[str] = None
     document_types: Optional[List[str]] = None
+    page_count: Optional[int] = None
+    file_size: Optional[int] = None
+    pdf_title: Optional[str] = None
 
     @model_validator(mode="after")
     def replace_none_with_empty_string(cls, values):
         for field in [
             "notes",
             "description",
+            "pdf_title",
         ]:
             if getattr(values, field) is None:
                 setattr(values, field, "")
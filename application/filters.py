@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from application.models import Status
+from application.dates import format_partial_date, parse_partial_date
+from application.models import LocalPlanTimetable, Status
 
 
 def get_date_part(d_str, part):
@@ -38,6 +39,14 @@ def timetable_status_colour(status: str) -> str:
 
 
 def short_date_filter(date_str):
+    if isinstance(date_str, LocalPlanTimetable):
+        # a timetable entry's date as stored, rather than parsed again
+        event = date_str
+        if event.normalised_event_date is None:
+            return event.event_date or ""
+        return format_partial_date(
+            event.normalised_event_date, event.event_date_precision
+        )
     if not date_str or date_str.strip() == "":
         return ""
 
@@ -64,20 +73,7 @@ def short_date_filter(date_str):
         except ValueError:
             return date_str
     else:
-        parts = date_str.split("-")
-        try:
-            match len(parts):
-                case 3:  # YYYY-MM-DD
-                    date = datetime.strptime(date_str, "%Y-%m-%d")
-                    return date.strftime("%-d{} %B %Y").format(
-                        "st" if date.day == 1 else "th"
-                    )
-                case 2:  # YYYY-MM
-                    date = datetime.strptime(date_str, "%Y-%m")
-                    return date.strftime("%B %Y")
-                case 1:  # YYYY
-                    return parts[0]  # Just return the year
-                case _:
-                    return date_str
-        except ValueError:
+        date, precision = parse_partial_date(date_str)
+        if date is None:
             return date_str
+        return format_partial_date(date, precision)
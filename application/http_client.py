@@ -0,0 +1,202 @@
+"""Shared HTTP client for the data commands.
+
+Wraps a pooled requests session with an on-disk response cache. Cached
+responses are revalidated with ETag / Last-Modified so repeated loads only
+transfer what has changed upstream, and responses younger than max_age are
+served without touching the network at all.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = 30
+DATASETTE_PAGE_SIZE = 1000
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class HttpClient:
+    def __init__(
+        self,
+        cache_dir=None,
+        max_age=0,
+        pool_size=10,
+        timeout=DEFAULT_TIMEOUT,
+        retries=3,
+    ):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, url, params=None):
+        """GET a url, answering from the cache where possible.
+
+        Returns a requests.Response. Responses served from the cache have
+        from_cache set to True.
+        """
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+
+        entry = self._read_cache(url)
+        if entry is not None and self._is_fresh(entry):
+            return self._cached_response(url, entry)
+
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = self.session.get(url, headers=headers, timeout=self.timeout)
+        if resp.status_code == 304 and entry is not None:
+            entry["fetched_at"] = time.time()
+            self._write_meta(url, entry)
+            return self._cached_response(url, entry)
+
+        resp.from_cache = False
+        if resp.ok:
+            self._write_cache(url, resp)
+        return resp
+
+    def get_json(self, url, params=None):
+        resp = self.get(url, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    def get_all(self, urls):
+        """Fetch urls concurrently, returning parsed JSON in the same order."""
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return list(executor.map(self.get_json, urls))
+
+    def datasette_table(self, database_url, table, page_size=DATASETTE_PAGE_SIZE):
+        """Return every row of a datasette table as a list of dicts.
+
+        Datasette's own next links can only be followed one page at a time,
+        so count the rows first and fetch fixed LIMIT/OFFSET pages
+        concurrently instead. Each page url is stable, so pages are cached
+        and revalidated individually.
+        """
+        count_sql = f"select count(*) as count from [{table}]"
+        count = self.get_json(
+            f"{database_url}.json", {"sql": count_sql, "_shape": "array"}
+        )[0]["count"]
+        urls = [
+            f"{database_url}.json?"
+            + urlencode(
+                {
+                    "sql": f"select * from [{table}] order by rowid "
+                    f"limit {page_size} offset {offset}",
+                    "_shape": "array",
+                }
+            )
+            for offset in range(0, count, page_size)
+        ]
+        rows = []
+        for page in self.get_all(urls):
+            rows.extend(page)
+        return rows
+
+    def _is_fresh(self, entry):
+        return self.max_age > 0 and time.time() - entry["fetched_at"] < self.max_age
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return (
+            os.path.join(self.cache_dir, f"{key}.json"),
+            os.path.join(self.cache_dir, f"{key}.body"),
+        )
+
+    def _read_cache(self, url):
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def _write_cache(self, url, resp):
+        if not self.cache_dir:
+            return
+        entry = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "headers": {
+                key: value
+                for key, value in resp.headers.items()
+                if key.lower() in ("content-type", "link")
+            },
+            "fetched_at": time.time(),
+        }
+        _, body_path = self._paths(url)
+        _atomic_write(body_path, resp.content)
+        self._write_meta(url, entry)
+
+    def _write_meta(self, url, entry):
+        meta_path, _ = self._paths(url)
+        meta = {key: value for key, value in entry.items() if key != "body"}
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _cached_response(self, url, entry):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = entry["body"]
+        resp.encoding = "utf-8"
+        resp.from_cache = True
+        return resp
+
+
+def get_client():
+    """Return the process wide client, configured from the current app."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from flask import current_app
+
+            _client = HttpClient(
+                cache_dir=current_app.config.get("HTTP_CACHE_DIR"),
+                max_age=current_app.config.get("HTTP_CACHE_MAX_AGE", 0),
+            )
+    return _client
+
+
+def _atomic_write(path, content):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,233 @@
+"""Streaming extraction of <a href> links from HTML pages.
+
+Building a BeautifulSoup tree of a whole documentation page just to find
+its anchors is most of the cost of scraping it. The backends here stream
+the page through a parser instead, yielding each anchor as soon as its end
+tag is seen and keeping nothing else. lxml is used when it is installed
+with libxml2 2.14 or later, then the standard library's html.parser. The
+BeautifulSoup backend is kept as the reference the others are checked
+against, see benchmarks/extract_links.py.
+
+Anchor text is the text inside the element with each piece stripped and
+joined, as BeautifulSoup's get_text(strip=True) gives, leaving out
+comments, scripts and styles. The one difference is an anchor nested in
+another, which is invalid HTML: lxml ends the outer anchor where the inner
+one starts, as browsers do, where the others run it to its end tag.
+"""
+
+import codecs
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+CHUNK_SIZE = 64 * 1024
+SKIPPED_ELEMENTS = {"script", "style"}
+DECLARED_ENCODING = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?\s*([-\w.:]+)", flags=re.IGNORECASE
+)
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+Anchor = namedtuple("Anchor", ["href", "text"])
+
+
+def iter_anchors(content, backend=None):
+    """Yield an Anchor for each <a href> in a page, in document order.
+
+    content is the page as bytes, or an iterable of byte chunks, such as
+    Response.iter_content(), to parse while it downloads. backend names one
+    of BACKENDS, the fastest available by default.
+    """
+    parse = BACKENDS[backend or DEFAULT_BACKEND]
+    return parse(_text_chunks(content))
+
+
+def _stream(parser, chunks):
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.completed()
+    parser.close()
+    yield from parser.completed()
+
+
+class _AnchorParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # anchors in start tag order, as [href, text pieces, closed]
+        self._anchors = []
+        self._open = []
+        self._data = []
+        self._skipping = None
+
+    def completed(self):
+        """Anchors closed since the last call, up to the first still open."""
+        done = 0
+        for href, pieces, closed in self._anchors:
+            if not closed:
+                break
+            done += 1
+        anchors, self._anchors = self._anchors[:done], self._anchors[done:]
+        return [
+            Anchor(href, "".join(pieces))
+            for href, pieces, _ in anchors
+            if href is not None
+        ]
+
+    def close(self):
+        super().close()
+        self._flush()
+        for anchor in self._open:
+            anchor[2] = True
+        self._open = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag == "a":
+            href = None
+            for name, value in attrs:
+                if name == "href":
+                    href = value or ""
+            anchor = [href, [], False]
+            self._anchors.append(anchor)
+            self._open.append(anchor)
+        elif tag in SKIPPED_ELEMENTS:
+            self._skipping = tag
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag == "a" and self._open:
+            self._open.pop()[2] = True
+        elif tag == self._skipping:
+            self._skipping = None
+
+    def handle_data(self, data):
+        if self._open and self._skipping is None:
+            self._data.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def _flush(self):
+        # text between two tags can arrive in pieces, it is stripped whole
+        if self._data:
+            text = "".join(self._data).strip()
+            self._data = []
+            if text:
+                for _, pieces, _ in self._open:
+                    pieces.append(text)
+
+
+class _LxmlAnchorParser:
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=("start", "end"))
+        self._open = 0
+
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+
+    def close(self):
+        self._parser.close()
+
+    def completed(self):
+        anchors = []
+        for event, element in self._parser.read_events():
+            if element.tag == "a":
+                self._open += 1 if event == "start" else -1
+                if event == "end" and element.get("href") is not None:
+                    anchors.append(Anchor(element.get("href"), _lxml_text(element)))
+            if event == "end" and self._open == 0:
+                # nothing more is needed from this element, free it and
+                # the siblings before it so the tree only holds open elements
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        return anchors
+
+
+def _lxml_text(anchor):
+    return "".join(piece.strip() for piece in _lxml_pieces(anchor))
+
+
+def _lxml_pieces(element):
+    if not isinstance(element.tag, str) or element.tag in SKIPPED_ELEMENTS:
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        yield from _lxml_pieces(child)
+        if child.tail:
+            yield child.tail
+
+
+def _soup_anchors(chunks):
+    soup = BeautifulSoup("".join(chunks), "html.parser")
+    for link in soup.find_all("a", href=True):
+        yield Anchor(link["href"], link.get_text(strip=True))
+
+
+def _text_chunks(content):
+    if isinstance(content, (bytes, bytearray)):
+        text = _decode(bytes(content))
+        for start in range(0, len(text), CHUNK_SIZE):
+            yield text[start : start + CHUNK_SIZE]
+        return
+
+    decoder = None
+    for chunk in content:
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(_sniff_encoding(chunk) or "utf-8")(
+                errors="replace"
+            )
+        yield decoder.decode(chunk)
+    if decoder is not None:
+        yield decoder.decode(b"", final=True)
+
+
+def _decode(content):
+    """Decode a whole page, from its BOM or declared encoding, then trying
+    UTF-8 and falling back to Windows-1252, much as BeautifulSoup would."""
+    encoding = _sniff_encoding(content)
+    if encoding:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("windows-1252", errors="replace")
+
+
+def _sniff_encoding(head):
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = DECLARED_ENCODING.search(head[:2048])
+    if match is None:
+        return None
+    encoding = match.group(1).decode("ascii").lower()
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return None
+    return encoding
+
+
+BACKENDS = {}
+try:
+    from lxml import etree
+
+    # before 2.14 libxml2's push parser drops the rest of a page when a
+    # chunk ends inside a script or style element
+    if etree.LIBXML_VERSION >= (2, 14):
+        BACKENDS["lxml"] = lambda chunks: _stream(_LxmlAnchorParser(), chunks)
+except ImportError:
+    pass
+BACKENDS["html.parser"] = lambda chunks: _stream(_AnchorParser(), chunks)
+BACKENDS["bs4"] = _soup_anchors
+DEFAULT_BACKEND = next(iter(BACKENDS))
@@ -1,12 +1,32 @@
 import datetime
 from enum import Enum
+from itertools import chain
 from typing import List, Optional
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Text
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Text,
+    event,
+    select,
+    text,
+    update,
+)
 from sqlalchemy.dialects.postgresql import ARRAY, ENUM, JSONB
 from sqlalchemy.ext.mutable import MutableDict
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import (
+    Mapped,
+    Session,
+    attributes,
+    mapped_column,
+    relationship,
+    validates,
+)
 
+from application.dates import parse_partial_date
 from application.extensions import db
 
 
@@ -87,18 +107,21 @@ class BaseModel(DateModel):
 class LocalPlanDocumentType(BaseModel):
     __tablename__ = "local_plan_document_type"
 
+    content_hash: Mapped[Optional[str]] = mapped_column(Text)
+
 
 class LocalPlanBoundary(BaseModel):
     __tablename__ = "local_plan_boundary"
 
-    geometry: Mapped[Optional[str]] = mapped_column(Text)
+    # often megabytes, so only loaded when used or undeferred by a query
+    geometry: Mapped[Optional[str]] = mapped_column(Text, deferred=True)
 
-    geojson: Mapped[Optional[dict]] = mapped_column(JSONB)
+    geojson: Mapped[Optional[dict]] = mapped_column(JSONB, deferred=True)
 
     organisations = db.relationship(
         "Organisation",
         secondary=boundary_organisation,
-        lazy="joined",
+        lazy="select",
         back_populates="local_plan_boundaries",
     )
 
@@ -111,6 +134,10 @@ class LocalPlan(BaseModel):
     period_start_date: Mapped[Optional[int]] = mapped_column(Integer)
     period_end_date: Mapped[Optional[int]] = mapped_column(Integer)
     documentation_url: Mapped[Optional[str]] = mapped_column(Text)
+    # event_date of the plan's current adoption event, kept up to date from
+    # the timetable by update_adopted_dates
+    adopted_date: Mapped[Optional[str]] = mapped_column(Text, index=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(Text)
 
     local_plan_boundary: Mapped[Optional[str]] = mapped_column(
         ForeignKey("local_plan_boundary.reference")
@@ -129,40 +156,24 @@ class LocalPlan(BaseModel):
     )
 
     def ordered_events(self, reverse=True):
-        from datetime import datetime
-
-        def parse_date(date_str):
-            if not date_str:
-                return None
-
-            # Try different date formats from most specific to least
-            formats = ["%Y-%m-%d", "%Y-%m", "%Y"]
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except ValueError:
-                    continue
-            return None
-
-        # Filter events with dates and parse them
-        dated_events = [
-            (event, parse_date(event.event_date))
-            for event in self.timetable
-            if event.event_date is not None and event.end_date is None
-        ]
-
-        # Sort by parsed date
-        dated_events.sort(key=lambda x: x[1], reverse=reverse)
-
-        # Return just the event objects
-        return [event for event, _ in dated_events]
-
-    @property
-    def adopted_date(self):
-        for event in self.timetable:
-            if event.event_type.reference == "plan-adopted":
-                return event.event_date
-        return ""
+        """Current events with a date, latest first unless reverse is False.
+
+        Sorts the plan's timetable as loaded, so pages that load it up front
+        run no further query. Events on the same normalised date, such as
+        2020 and 2020-01-01, stay in the order they were added, and events
+        whose date could not be normalised come last.
+        """
+        events = sorted(
+            (
+                event
+                for event in self.timetable
+                if event.event_date is not None and event.end_date is None
+            ),
+            key=lambda event: event.created_date or datetime.datetime.max,
+        )
+        dated = [event for event in events if event.normalised_event_date]
+        dated.sort(key=lambda event: event.normalised_event_date, reverse=reverse)
+        return dated + [event for event in events if not event.normalised_event_date]
 
     organisations = db.relationship(
         "Organisation",
@@ -181,6 +192,11 @@ class LocalPlan(BaseModel):
         ENUM(Status), default=Status.FOR_REVIEW
     )
 
+    __table_args__ = (
+        # the exports filter plans on status, and boundaries on both
+        db.Index("ix_local_plan_status_boundary_status", "status", "boundary_status"),
+    )
+
 
 class LocalPlanDocument(BaseModel):
     __tablename__ = "local_plan_document"
@@ -192,6 +208,23 @@ class LocalPlanDocument(BaseModel):
     document_url: Mapped[Optional[str]] = mapped_column(Text)
     document_types: Mapped[Optional[list]] = mapped_column(ARRAY(Text))
 
+    # read from the PDF by the document-metadata command
+    page_count: Mapped[Optional[int]] = mapped_column(Integer)
+    file_size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    pdf_title: Mapped[Optional[str]] = mapped_column(Text)
+    # why the PDF could not be read, when checked but without a page count
+    metadata_error: Mapped[Optional[str]] = mapped_column(Text)
+    metadata_checked_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+
+    # the response to document_url, from the check-document-urls command
+    url_status_code: Mapped[Optional[int]] = mapped_column(Integer)
+    url_content_type: Mapped[Optional[str]] = mapped_column(Text)
+    url_size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    url_error: Mapped[Optional[str]] = mapped_column(Text)
+    url_checked_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime, index=True
+    )
+
     organisations = db.relationship(
         "Organisation",
         secondary=document_organisation,
@@ -201,15 +234,25 @@ class LocalPlanDocument(BaseModel):
 
     status: Mapped[Status] = mapped_column(ENUM(Status), default=Status.FOR_REVIEW)
 
+    __table_args__ = (
+        # a plan's documents, or those with a status
+        db.Index("ix_local_plan_document_local_plan_status", "local_plan", "status"),
+        db.Index("ix_local_plan_document_status", "status"),
+        # for document_types @> ARRAY[...], as in the document export's type
+        # filter, = ANY(document_types) can't use it
+        db.Index(
+            "ix_local_plan_document_document_types",
+            "document_types",
+            postgresql_using="gin",
+        ),
+    )
+
     def get_document_types(self):
-        doc_types = (
-            LocalPlanDocumentType.query.filter(
-                LocalPlanDocumentType.reference.in_(self.document_types)
-            )
-            .order_by(LocalPlanDocumentType.name)
-            .all()
+        from application import reference_data
+
+        return reference_data.items(
+            reference_data.DOCUMENT_TYPES, self.document_types or []
         )
-        return doc_types
 
 
 class Organisation(DateModel):
@@ -219,11 +262,22 @@ class Organisation(DateModel):
     local_authority_type: Mapped[Optional[str]] = mapped_column(Text)
     name: Mapped[Optional[dict]] = mapped_column(Text, index=True)
     official_name: Mapped[Optional[dict]] = mapped_column(Text)
-    geometry: Mapped[Optional[str]] = mapped_column(Text)
-    geojson: Mapped[Optional[dict]] = mapped_column(JSONB)
+    # deferred like LocalPlanBoundary's
+    geometry: Mapped[Optional[str]] = mapped_column(Text, deferred=True)
+    geojson: Mapped[Optional[dict]] = mapped_column(JSONB, deferred=True)
     point: Mapped[Optional[str]] = mapped_column(Text)
     statistical_geography: Mapped[Optional[str]] = mapped_column(Text)
     website: Mapped[Optional[str]] = mapped_column(Text)
+    content_hash: Mapped[Optional[str]] = mapped_column(Text)
+
+    __table_args__ = (
+        # current organisations in name order
+        db.Index(
+            "ix_organisation_current_name",
+            "name",
+            postgresql_where=text("end_date IS NULL"),
+        ),
+    )
 
     local_plan_documents = db.relationship(
         "LocalPlanDocument",
@@ -247,15 +301,47 @@ class Organisation(DateModel):
     )
 
 
+class CandidateDocument(DateModel):
+    __tablename__ = "candidate_document"
+
+    local_plan: Mapped[str] = mapped_column(
+        ForeignKey("local_plan.reference"), primary_key=True
+    )
+    document_url: Mapped[str] = mapped_column(Text, primary_key=True)
+    name: Mapped[Optional[str]] = mapped_column(Text)
+    document_type: Mapped[Optional[str]] = mapped_column(Text)
+    confidence: Mapped[Optional[int]] = mapped_column(Integer)
+    documentation_url: Mapped[Optional[str]] = mapped_column(Text)
+    status: Mapped[Status] = mapped_column(ENUM(Status), default=Status.FOR_REVIEW)
+
+
+class CrawlPage(db.Model):
+    __tablename__ = "crawl_page"
+
+    url: Mapped[str] = mapped_column(Text, primary_key=True)
+    etag: Mapped[Optional[str]] = mapped_column(Text)
+    last_modified: Mapped[Optional[str]] = mapped_column(Text)
+    content_hash: Mapped[Optional[str]] = mapped_column(Text)
+    links: Mapped[Optional[list]] = mapped_column(JSONB)
+    fetched_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    checked_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+
+
 class LocalPlanEventType(BaseModel):
     __tablename__ = "local_plan_event_type"
 
+    content_hash: Mapped[Optional[str]] = mapped_column(Text)
+
 
 class LocalPlanTimetable(BaseModel):
     __tablename__ = "local_plan_timetable"
 
     event_data: Mapped[Optional[dict]] = mapped_column(MutableDict.as_mutable(JSONB))
     event_date: Mapped[Optional[str]] = mapped_column(Text)
+    # event_date as the first day of the year, month or day it gives, and
+    # which of those it is, kept in step with event_date for sorting in SQL
+    normalised_event_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
+    event_date_precision: Mapped[Optional[str]] = mapped_column(Text)
     event_type: Mapped[Optional["LocalPlanEventType"]] = relationship()
     local_plan_event: Mapped[Optional[str]] = mapped_column(
         ForeignKey("local_plan_event_type.reference")
@@ -275,11 +361,106 @@ class LocalPlanTimetable(BaseModel):
     )
     organisation_obj: Mapped["Organisation"] = relationship()
 
+    __table_args__ = (
+        db.Index(
+            "ix_local_plan_timetable_local_plan_event_date",
+            "local_plan_reference",
+            "normalised_event_date",
+        ),
+    )
+
+    @validates("event_date")
+    def normalise_event_date(self, key, event_date):
+        self.normalised_event_date, self.event_date_precision = parse_partial_date(
+            event_date
+        )
+        return event_date
+
     def get_event_type_name(self, key):
         if key not in self.event_data:
             return ""
+        from application import reference_data
+
         event_type_refererence = key.replace("_", "-")
-        event_type = LocalPlanEventType.query.get(event_type_refererence)
+        event_type = reference_data.get(
+            reference_data.EVENT_TYPES, event_type_refererence
+        )
         if event_type is None:
             return ""
         return event_type.name
+
+
+ADOPTED_EVENT = "plan-adopted"
+
+
+def adopted_date_expression():
+    """The event_date of a plan's latest adoption event that has not ended."""
+    return (
+        select(LocalPlanTimetable.event_date)
+        .where(
+            LocalPlanTimetable.local_plan_reference == LocalPlan.reference,
+            LocalPlanTimetable.local_plan_event == ADOPTED_EVENT,
+            LocalPlanTimetable.event_date.isnot(None),
+            LocalPlanTimetable.end_date.is_(None),
+        )
+        .order_by(
+            LocalPlanTimetable.normalised_event_date.desc().nulls_last(),
+            LocalPlanTimetable.created_date.desc(),
+        )
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def update_adopted_dates(session, flush_context):
+    """Recalculate adopted_date for plans whose timetable was just written."""
+    references = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, LocalPlanTimetable):
+            history = attributes.get_history(obj, "local_plan_reference")
+            references.update(history.sum())
+            references.add(obj.local_plan_reference)
+    references.discard(None)
+    if not references:
+        return
+
+    session.connection().execute(
+        update(LocalPlan.__table__)
+        .where(LocalPlan.reference.in_(references))
+        .values(adopted_date=adopted_date_expression())
+    )
+    for reference in references:
+        plan = session.identity_map.get(session.identity_key(LocalPlan, reference))
+        if plan is not None:
+            session.expire(plan, ["adopted_date"])
+
+
+class CommandCheckpoint(db.Model):
+    __tablename__ = "command_checkpoint"
+
+    command: Mapped[str] = mapped_column(Text, primary_key=True)
+    status: Mapped[str] = mapped_column(Text)
+    position: Mapped[Optional[str]] = mapped_column(Text)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    total: Mapped[Optional[int]] = mapped_column(Integer)
+    started_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    completed_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+
+
+class ReferenceDataSync(db.Model):
+    __tablename__ = "reference_data_sync"
+
+    dataset: Mapped[str] = mapped_column(Text, primary_key=True)
+    source: Mapped[Optional[str]] = mapped_column(Text)
+    etag: Mapped[Optional[str]] = mapped_column(Text)
+    last_modified: Mapped[Optional[str]] = mapped_column(Text)
+    checked_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    synced_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    # changed whenever the dataset is written, see application/reference_data.py
+    version: Mapped[Optional[str]] = mapped_column(Text)
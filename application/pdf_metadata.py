@@ -0,0 +1,650 @@
+"""Page count, title and size of PDF documents read with HTTP Range requests.
+
+Only the parts of a PDF that hold its metadata are fetched: the tail, for
+startxref, then the cross reference table or stream it points to, and the
+few objects behind the trailer's /Info and /Root. A linearised PDF gives
+its page count in the dictionary at the very start of the file, which
+saves walking to the page tree. Reads are cached per document and capped
+at max_bytes, so even a multi-hundred-megabyte plan costs a handful of
+small requests.
+
+Requests share the crawler's pooled session and per host limits.
+Servers that ignore Range are not read any further, but the size is still
+taken from their Content-Length.
+"""
+
+import re
+import zlib
+from collections import namedtuple
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+
+from application.crawler import DEFAULT_TIMEOUT, Crawler
+
+HEAD_BYTES = 1024
+TAIL_BYTES = 16 * 1024
+READ_BYTES = 16 * 1024
+OBJECT_BYTES = 4 * 1024
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+# incremental updates each add a cross reference section, more than this
+# and the file is not worth reading piecemeal
+MAX_XREF_SECTIONS = 32
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+DELIMITERS = b"()<>[]{}/%"
+ESCAPES = {
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+}
+NUMBER = re.compile(rb"[+-]?(\d+\.?\d*|\.\d+)$")
+SUBSECTION = re.compile(rb"\s*(\d+)\s+(\d+)[ \t]*\r?\n")
+XREF_ENTRY = re.compile(rb"\s*(\d{1,10})\s+(\d{1,5})\s+([nf])")
+OBJECT_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+Ref = namedtuple("Ref", ["number", "generation"])
+
+
+class PdfMetadataError(Exception):
+    pass
+
+
+class _Truncated(Exception):
+    """Raised by the parser when it runs off the end of the bytes it has."""
+
+
+@dataclass
+class PdfMetadata:
+    url: str
+    size: Optional[int] = None
+    page_count: Optional[int] = None
+    title: Optional[str] = None
+    error: Optional[str] = None
+    # the error may pass, so the document is worth reading again
+    transient: bool = False
+    bytes_read: int = 0
+
+
+class PdfMetadataReader(Crawler):
+    def __init__(
+        self,
+        max_workers=8,
+        per_host=2,
+        timeout=DEFAULT_TIMEOUT,
+        max_bytes=DEFAULT_MAX_BYTES,
+        retries=1,
+        **kwargs,
+    ):
+        super().__init__(
+            max_workers=max_workers,
+            per_host=per_host,
+            timeout=timeout,
+            max_bytes=max_bytes,
+            retries=retries,
+            **kwargs,
+        )
+
+    def read(self, url):
+        source = _RangeSource(self, url)
+        metadata = PdfMetadata(url)
+        try:
+            document = _Document(source)
+            metadata.page_count = document.page_count()
+            metadata.title = document.title()
+        except requests.exceptions.RequestException as e:
+            metadata.error = f"Error fetching {url}: {e}"
+            metadata.transient = _is_transient(e)
+        except _Truncated:
+            metadata.error = "unexpected end of data"
+            metadata.transient = True
+        except (
+            PdfMetadataError,
+            ValueError,
+            KeyError,
+            IndexError,
+            TypeError,
+            AttributeError,
+            zlib.error,
+        ) as e:
+            # a malformed PDF, such as one with a reference to a missing
+            # object, fails just that document
+            metadata.error = str(e) or f"could not read PDF ({e.__class__.__name__})"
+        metadata.size = source.size
+        metadata.bytes_read = source.bytes_read
+        return metadata
+
+    def read_all(self, urls):
+        """Read urls concurrently, yielding results as they finish."""
+        return self.map_by_host(self.read, urls)
+
+    def get_range(self, url, byte_range):
+        """GET byte_range of url, returning (start, total size, bytes)."""
+        with self._slot(url):
+            with self.session.get(
+                url,
+                headers={"Range": f"bytes={byte_range}"},
+                timeout=self.timeout,
+                verify=self.verify,
+                stream=True,
+            ) as resp:
+                if resp.status_code == 416:
+                    raise PdfMetadataError(f"{url} is empty")
+                resp.raise_for_status()
+                if resp.status_code != 206:
+                    # leave the rest of the body unread, the connection is
+                    # dropped when the response closes
+                    length = resp.headers.get("Content-Length")
+                    size = int(length) if length and length.isdigit() else None
+                    raise _RangesNotSupported(size)
+                match = CONTENT_RANGE.match(resp.headers.get("Content-Range", ""))
+                if match is None:
+                    raise PdfMetadataError(f"{url} sent no usable Content-Range")
+                start, end, size = (int(value) for value in match.groups())
+                body = b"".join(resp.iter_content(64 * 1024))
+                return start, size, body[: end - start + 1]
+
+
+def _is_transient(error):
+    """False for client errors, such as a 404, that a retry won't change"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    return not (400 <= response.status_code < 500) or response.status_code in (
+        408,
+        429,
+    )
+
+
+class _RangesNotSupported(PdfMetadataError):
+    def __init__(self, size):
+        super().__init__("server does not support range requests")
+        self.size = size
+
+
+class _RangeSource:
+    """Byte ranges of one document, cached, within the reader's max_bytes."""
+
+    def __init__(self, reader, url):
+        self.reader = reader
+        self.url = url
+        self.size = None
+        self.bytes_read = 0
+        self._segments = []
+
+    def tail(self, length):
+        try:
+            start, self.size, data = self.reader.get_range(self.url, f"-{length}")
+        except _RangesNotSupported as e:
+            self.size = e.size
+            raise
+        self._add(start, data)
+        return data
+
+    def read(self, start, length):
+        """Up to length bytes from start, fewer at the end of the file."""
+        end = min(start + length, self.size)
+        data = bytearray()
+        pos = start
+        while pos < end:
+            segment_start, segment = self._segment(pos) or self._fetch(pos, end)
+            chunk = segment[pos - segment_start : end - segment_start]
+            if not chunk:
+                raise PdfMetadataError(f"{self.url} sent less than was asked for")
+            data += chunk
+            pos += len(chunk)
+        return bytes(data)
+
+    def _segment(self, pos):
+        for segment_start, segment in self._segments:
+            if segment_start <= pos < segment_start + len(segment):
+                return segment_start, segment
+        return None
+
+    def _fetch(self, start, end):
+        end = min(max(end, start + READ_BYTES), self.size)
+        if self.bytes_read + end - start > self.reader.max_bytes:
+            raise PdfMetadataError(
+                f"{self.url} needs more than {self.reader.max_bytes} bytes read"
+            )
+        start, _, data = self.reader.get_range(self.url, f"{start}-{end - 1}")
+        self._add(start, data)
+        return start, data
+
+    def _add(self, start, data):
+        self.bytes_read += len(data)
+        self._segments.append((start, data))
+
+
+class _Document:
+    def __init__(self, source):
+        self.source = source
+        tail = source.tail(TAIL_BYTES)
+        head = source.read(0, HEAD_BYTES)
+        if b"%PDF-" not in head:
+            raise PdfMetadataError("not a PDF")
+        self.linearisation = _linearisation(head)
+
+        index = tail.rfind(b"startxref")
+        if index == -1:
+            raise PdfMetadataError("no startxref, the file may be truncated")
+        offset = _Parser(tail, index + len(b"startxref")).parse()
+
+        self.xref = {}
+        self.trailer = {}
+        self._objects = {}
+        self._object_streams = {}
+        self._read_xref(offset)
+
+    def page_count(self):
+        linearisation = self.linearisation
+        if linearisation and linearisation.get("L") == self.source.size:
+            return int(linearisation["N"])
+        root = self.resolve(self.trailer.get("Root"))
+        pages = self.resolve(root.get("Pages")) if isinstance(root, dict) else None
+        if not isinstance(pages, dict):
+            raise PdfMetadataError("no page tree")
+        return int(self.resolve(pages["Count"]))
+
+    def title(self):
+        info = self.resolve(self.trailer.get("Info"))
+        if not isinstance(info, dict):
+            return None
+        return _text(self.resolve(info.get("Title")))
+
+    def resolve(self, value):
+        if isinstance(value, Ref):
+            return self.object(value.number)
+        return value
+
+    def object(self, number):
+        if number not in self._objects:
+            entry = self.xref.get(number)
+            if entry is None or entry[0] == 0:
+                value = None
+            elif entry[0] == 1:
+                value, _ = self._object_at(entry[1])
+            else:
+                value = self._compressed_object(*entry[1:])
+            self._objects[number] = value
+        return self._objects[number]
+
+    def _read_xref(self, offset):
+        seen = set()
+        pending = [offset]
+        while pending:
+            offset = pending.pop(0)
+            if offset is None or offset in seen:
+                continue
+            if len(seen) == MAX_XREF_SECTIONS:
+                raise PdfMetadataError("too many cross reference sections")
+            seen.add(offset)
+
+            if self.source.read(offset, 16).lstrip().startswith(b"xref"):
+                entries, trailer = self._xref_table(offset)
+            else:
+                entries, trailer = self._xref_stream(offset)
+            # sections are read newest first, so earlier entries win
+            for number, entry in entries.items():
+                self.xref.setdefault(number, entry)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            # hybrid files list objects in compressed streams separately
+            pending.append(trailer.get("XRefStm"))
+            pending.append(trailer.get("Prev"))
+
+    def _xref_table(self, offset):
+        data = self.source.read(offset, READ_BYTES)
+        pos = data.index(b"xref") + len(b"xref")
+        entries = {}
+        while True:
+            data = self._ensure(offset, data, pos + 64)
+            match = SUBSECTION.match(data, pos)
+            if match is None:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            pos = match.end()
+            data = self._ensure(offset, data, pos + count * 20 + 64)
+            for number in range(first, first + count):
+                match = XREF_ENTRY.match(data, pos)
+                if match is None:
+                    raise PdfMetadataError(
+                        f"bad cross reference entry at {offset + pos}"
+                    )
+                position, generation, kind = match.groups()
+                if kind == b"n":
+                    entries[number] = (1, int(position), int(generation))
+                else:
+                    entries[number] = (0, 0, 0)
+                pos = match.end()
+
+        pos = data.index(b"trailer", pos) + len(b"trailer")
+        trailer = self._parse(offset, data, pos)
+        return entries, trailer
+
+    def _xref_stream(self, offset):
+        stream_dict, stream = self._object_at(offset)
+        if not isinstance(stream_dict, dict) or stream_dict.get("Type") != "XRef":
+            raise PdfMetadataError(f"no cross reference at {offset}")
+        data = self._decode(stream_dict, stream)
+        widths = [int(width) for width in stream_dict["W"]]
+        index = stream_dict.get("Index", [0, stream_dict["Size"]])
+        row_length = sum(widths)
+
+        entries = {}
+        pos = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for number in range(first, first + count):
+                row = data[pos : pos + row_length]
+                pos += row_length
+                fields = []
+                start = 0
+                for width in widths:
+                    fields.append(int.from_bytes(row[start : start + width], "big"))
+                    start += width
+                if widths[0] == 0:
+                    fields[0] = 1
+                entries[number] = tuple(fields)
+        return entries, stream_dict
+
+    def _object_at(self, offset):
+        """The object at offset and its stream, if it has one."""
+        data = self.source.read(offset, OBJECT_BYTES)
+        while True:
+            try:
+                match = OBJECT_HEADER.match(data)
+                if match is None:
+                    raise PdfMetadataError(f"no object at {offset}")
+                parser = _Parser(data, match.end())
+                value = parser.parse()
+                parser.skip_space()
+                if not data.startswith(b"stream", parser.pos):
+                    return value, None
+                start = parser.pos + len(b"stream")
+                start += 2 if data.startswith(b"\r\n", start) else 1
+                length = int(self.resolve(value["Length"]))
+                data = self._ensure(offset, data, start + length)
+                return value, data[start : start + length]
+            except _Truncated:
+                data = self._more(offset, data)
+
+    def _compressed_object(self, stream_number, index):
+        if stream_number not in self._object_streams:
+            entry = self.xref.get(stream_number)
+            if entry is None or entry[0] != 1:
+                raise PdfMetadataError(f"object stream {stream_number} not found")
+            stream_dict, stream = self._object_at(entry[1])
+            data = self._decode(stream_dict, stream)
+            first = int(stream_dict["First"])
+            numbers = _Parser(data[:first]).parse_all()
+            offsets = [first + int(offset) for offset in numbers[1::2]]
+            self._object_streams[stream_number] = (data, offsets)
+        data, offsets = self._object_streams[stream_number]
+        return _Parser(data, offsets[index]).parse()
+
+    def _parse(self, offset, data, pos):
+        while True:
+            try:
+                return _Parser(data, pos).parse()
+            except _Truncated:
+                data = self._more(offset, data)
+
+    def _ensure(self, offset, data, length):
+        if len(data) < length and offset + len(data) < self.source.size:
+            data = self.source.read(offset, length)
+        return data
+
+    def _more(self, offset, data):
+        if offset + len(data) >= self.source.size:
+            raise PdfMetadataError(f"object at {offset} runs past the end of the file")
+        return self.source.read(offset, len(data) * 2)
+
+    @staticmethod
+    def _decode(stream_dict, stream):
+        filters = stream_dict.get("Filter") or []
+        if not isinstance(filters, list):
+            filters = [filters]
+        params = stream_dict.get("DecodeParms") or {}
+        if isinstance(params, list):
+            params = params[0] if params else {}
+        for name in filters:
+            if name != "FlateDecode":
+                raise PdfMetadataError(f"unsupported stream filter {name}")
+            stream = zlib.decompress(stream)
+        predictor = params.get("Predictor", 1) if isinstance(params, dict) else 1
+        if predictor >= 10:
+            stream = _png_unpredict(stream, int(params.get("Columns", 1)))
+        elif predictor != 1:
+            raise PdfMetadataError(f"unsupported predictor {predictor}")
+        return stream
+
+
+class _Parser:
+    """Just enough of the PDF object syntax for trailers and dictionaries.
+
+    Names are returned as str, strings as bytes and indirect references as
+    Ref tuples.
+    """
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def parse_all(self):
+        values = []
+        while True:
+            try:
+                values.append(self.parse())
+            except _Truncated:
+                return values
+
+    def parse(self):
+        self.skip_space()
+        data = self.data
+        char = data[self.pos : self.pos + 1]
+        if data.startswith(b"<<", self.pos):
+            return self._dictionary()
+        if char == b"<":
+            return self._hex_string()
+        if char == b"[":
+            return self._array()
+        if char == b"(":
+            return self._literal_string()
+        if char == b"/":
+            return self._name()
+        token = self._token()
+        if token == b"true":
+            return True
+        if token == b"false":
+            return False
+        if token == b"null":
+            return None
+        if not NUMBER.match(token):
+            raise PdfMetadataError(f"unexpected {token[:20]!r}")
+        if b"." in token:
+            return float(token)
+        number = int(token)
+        return self._reference(number) or number
+
+    def skip_space(self):
+        data = self.data
+        while True:
+            if self.pos >= len(data):
+                raise _Truncated()
+            char = data[self.pos]
+            if char in WHITESPACE:
+                self.pos += 1
+            elif char == ord("%"):
+                while self.pos < len(data) and data[self.pos] not in b"\r\n":
+                    self.pos += 1
+            else:
+                return
+
+    def _token(self):
+        start = self.pos
+        data = self.data
+        while (
+            self.pos < len(data)
+            and data[self.pos] not in WHITESPACE
+            and data[self.pos] not in DELIMITERS
+        ):
+            self.pos += 1
+        if self.pos == start and self.pos >= len(data):
+            raise _Truncated()
+        return data[start : self.pos]
+
+    def _reference(self, number):
+        start = self.pos
+        try:
+            self.skip_space()
+            generation = self._token()
+            self.skip_space()
+            if generation.isdigit() and self._token() == b"R":
+                return Ref(number, int(generation))
+        except _Truncated:
+            # at the end of the data it can only be a number, and if the
+            # data was cut short whatever contains it will run out too
+            pass
+        self.pos = start
+        return None
+
+    def _dictionary(self):
+        self.pos += 2
+        value = {}
+        while True:
+            self.skip_space()
+            if self.data.startswith(b">>", self.pos):
+                self.pos += 2
+                return value
+            key = self.parse()
+            value[key] = self.parse()
+
+    def _array(self):
+        self.pos += 1
+        value = []
+        while True:
+            self.skip_space()
+            if self.data[self.pos] == ord("]"):
+                self.pos += 1
+                return value
+            value.append(self.parse())
+
+    def _name(self):
+        self.pos += 1
+        token = self._token()
+        return re.sub(
+            rb"#([0-9a-fA-F]{2})", lambda m: bytes.fromhex(m[1].decode()), token
+        ).decode("latin-1")
+
+    def _hex_string(self):
+        end = self.data.find(b">", self.pos)
+        if end == -1:
+            raise _Truncated()
+        digits = bytes(c for c in self.data[self.pos + 1 : end] if c not in WHITESPACE)
+        self.pos = end + 1
+        if len(digits) % 2:
+            digits += b"0"
+        return bytes.fromhex(digits.decode("ascii"))
+
+    def _literal_string(self):
+        data = self.data
+        self.pos += 1
+        depth = 1
+        value = bytearray()
+        while True:
+            if self.pos >= len(data):
+                raise _Truncated()
+            char = data[self.pos]
+            self.pos += 1
+            if char == ord("\\"):
+                if self.pos >= len(data):
+                    raise _Truncated()
+                char = data[self.pos]
+                self.pos += 1
+                if char in ESCAPES:
+                    value += ESCAPES[char]
+                elif char in b"01234567":
+                    digits = bytes([char])
+                    while len(digits) < 3 and data[self.pos] in b"01234567":
+                        digits += data[self.pos : self.pos + 1]
+                        self.pos += 1
+                    value.append(int(digits, 8) & 0xFF)
+                elif char == ord("\r"):
+                    if data[self.pos] == ord("\n"):
+                        self.pos += 1
+                elif char != ord("\n"):
+                    value.append(char)
+            elif char == ord("("):
+                depth += 1
+                value.append(char)
+            elif char == ord(")"):
+                depth -= 1
+                if depth == 0:
+                    return bytes(value)
+                value.append(char)
+            else:
+                value.append(char)
+
+
+def _linearisation(head):
+    match = OBJECT_HEADER.search(head)
+    if match is None:
+        return None
+    try:
+        value = _Parser(head, match.end()).parse()
+    except (_Truncated, PdfMetadataError, ValueError):
+        return None
+    if isinstance(value, dict) and "Linearized" in value and "N" in value:
+        return value
+    return None
+
+
+def _text(value):
+    if not isinstance(value, bytes):
+        return None
+    if value.startswith(b"\xfe\xff"):
+        text = value[2:].decode("utf-16-be", errors="replace")
+    elif value.startswith(b"\xef\xbb\xbf"):
+        text = value[3:].decode("utf-8", errors="replace")
+    else:
+        # close enough to PDFDocEncoding for titles
+        text = value.decode("latin-1")
+    return text.replace("\x00", "").strip() or None
+
+
+def _png_unpredict(data, columns):
+    row_length = columns + 1
+    previous = bytearray(columns)
+    rows = bytearray()
+    for start in range(0, len(data), row_length):
+        kind = data[start]
+        row = bytearray(data[start + 1 : start + row_length])
+        for i in range(len(row)):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                up_left = previous[i - 1] if i else 0
+                row[i] = (row[i] + _paeth(left, up, up_left)) & 0xFF
+        rows += row
+        previous = row
+    return bytes(rows)
+
+
+def _paeth(left, up, up_left):
+    estimate = left + up - up_left
+    distances = [abs(estimate - left), abs(estimate - up), abs(estimate - up_left)]
+    if distances[0] <= distances[1] and distances[0] <= distances[2]:
+        return left
+    if distances[1] <= distances[2]:
+        return up
+    return up_left
@@ -0,0 +1,118 @@
+"""Process-wide cache of reference data: organisations, document and event types.
+
+Form choices and type names are needed on most pages but only change when
+the load-orgs, doc-types, event-types or sync-reference-data commands
+write. Each dataset is held per app as a tuple of ReferenceItem, ordered
+by name, along with the version it was read at.
+
+A writer calls invalidate() in the transaction that changes the data,
+giving the dataset a new version in reference_data_sync. Versions are read
+at most once a request, so every process sees the change on its next
+request and reloads the dataset.
+"""
+
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import select
+
+from application.extensions import db
+from application.models import (
+    LocalPlanDocumentType,
+    LocalPlanEventType,
+    Organisation,
+    ReferenceDataSync,
+)
+
+ORGANISATIONS = "organisation"
+DOCUMENT_TYPES = "local-plan-document-type"
+EVENT_TYPES = "local-plan-event"
+
+DATASETS = {
+    ORGANISATIONS: (Organisation.organisation, Organisation),
+    DOCUMENT_TYPES: (LocalPlanDocumentType.reference, LocalPlanDocumentType),
+    EVENT_TYPES: (LocalPlanEventType.reference, LocalPlanEventType),
+}
+
+ReferenceItem = namedtuple("ReferenceItem", ["reference", "name", "end_date"])
+
+_Held = namedtuple("_Held", ["version", "items", "by_reference"])
+
+
+def items(dataset, references=None):
+    """All items in a dataset, or those with the given references, by name."""
+    held = _get(dataset)
+    if references is None:
+        return held.items
+    references = set(references)
+    return tuple(item for item in held.items if item.reference in references)
+
+
+def get(dataset, reference):
+    return _get(dataset).by_reference.get(reference)
+
+
+def choices(dataset, include_ended=False):
+    """(reference, name) pairs for a SelectField, leaving out end dated items."""
+    return [
+        (item.reference, item.name)
+        for item in _get(dataset).items
+        if include_ended or item.end_date is None
+    ]
+
+
+def invalidate(*datasets):
+    """Give datasets a new version so every process reloads them.
+
+    The version is written in the current transaction and takes effect
+    for other processes when the caller commits.
+    """
+    for dataset in datasets:
+        sync = db.session.get(ReferenceDataSync, dataset)
+        if sync is None:
+            sync = ReferenceDataSync(dataset=dataset)
+        sync.version = uuid.uuid4().hex
+        db.session.add(sync)
+    cache = current_app.extensions.get("reference_data", {})
+    for dataset in datasets:
+        cache.pop(dataset, None)
+    g.pop("reference_data_versions", None)
+
+
+def _get(dataset):
+    cache = current_app.extensions.setdefault("reference_data", {})
+    version = _versions().get(dataset)
+    held = cache.get(dataset)
+    if held is None or held.version != version:
+        # a dataset read twice by racing threads is only wasted work
+        held = _load(dataset, version)
+        cache[dataset] = held
+    return held
+
+
+def _versions():
+    if has_request_context() and "reference_data_versions" in g:
+        return g.reference_data_versions
+    versions = dict(
+        db.session.execute(
+            select(ReferenceDataSync.dataset, ReferenceDataSync.version)
+        ).all()
+    )
+    if has_request_context():
+        g.reference_data_versions = versions
+    return versions
+
+
+def _load(dataset, version):
+    key, model = DATASETS[dataset]
+    rows = db.session.execute(
+        select(key, model.name, model.end_date).order_by(model.name, key)
+    ).all()
+    loaded = tuple(ReferenceItem(*row) for row in rows)
+    return _Held(
+        version,
+        loaded,
+        MappingProxyType({item.reference: item for item in loaded}),
+    )
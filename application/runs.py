@@ -0,0 +1,136 @@
+"""Checkpointed runs for long running data commands.
+
+A run records how far a command has got in the command_checkpoint table.
+Items are processed in a stable key order and the checkpoint is committed
+in the same transaction as the work for each item, so if a run fails part
+way through the next run picks up after the last item that was committed.
+
+Progress is printed at most every few seconds with the rate and an
+estimate of the time remaining.
+"""
+
+import datetime
+import time
+
+from application.extensions import db
+from application.models import CommandCheckpoint
+
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+PROGRESS_INTERVAL = 5
+
+
+class CommandRun:
+    def __init__(self, command, restart=False, progress_interval=PROGRESS_INTERVAL):
+        self.command = command
+        self.restart = restart
+        self.progress_interval = progress_interval
+        self.checkpoint = None
+        self.resume_after = None
+        self.processed = 0
+        self.skipped = 0
+        self.total = None
+        self._started = None
+        self._last_report = None
+
+    def __enter__(self):
+        checkpoint = db.session.get(CommandCheckpoint, self.command)
+        if checkpoint is None:
+            checkpoint = CommandCheckpoint(command=self.command)
+        elif (
+            not self.restart
+            and checkpoint.status != COMPLETED
+            and checkpoint.position is not None
+        ):
+            self.resume_after = checkpoint.position
+            print(
+                f"{self.command}: resuming after {checkpoint.position} "
+                f"({checkpoint.processed} already processed)"
+            )
+
+        now = datetime.datetime.now()
+        if self.resume_after is None:
+            checkpoint.position = None
+            checkpoint.processed = 0
+            checkpoint.started_at = now
+        checkpoint.status = RUNNING
+        checkpoint.updated_at = now
+        checkpoint.completed_at = None
+        db.session.add(checkpoint)
+        db.session.commit()
+
+        self.checkpoint = checkpoint
+        self._started = self._last_report = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            db.session.rollback()
+        checkpoint = db.session.get(CommandCheckpoint, self.command)
+        checkpoint.updated_at = datetime.datetime.now()
+        if exc_type is None:
+            checkpoint.status = COMPLETED
+            checkpoint.completed_at = checkpoint.updated_at
+        else:
+            checkpoint.status = FAILED
+        db.session.add(checkpoint)
+        db.session.commit()
+        self.report(final=True)
+        return False
+
+    def pending(self, items, key):
+        """Yield the items still to be processed, in key order.
+
+        key is a function returning the string each item is checkpointed
+        by. Items at or before the checkpoint of a resumed run are skipped.
+        """
+        items = sorted(items, key=key)
+        self.total = len(items)
+        self.checkpoint.total = self.total
+        for item in items:
+            if self.resume_after is not None and key(item) <= self.resume_after:
+                self.skipped += 1
+                continue
+            yield item
+
+    def advance(self, position, count=1):
+        """Record items as done and commit them along with the checkpoint."""
+        self.processed += count
+        self.checkpoint.position = position
+        self.checkpoint.processed = self.skipped + self.processed
+        self.checkpoint.updated_at = datetime.datetime.now()
+        db.session.add(self.checkpoint)
+        db.session.commit()
+
+        if time.perf_counter() - self._last_report >= self.progress_interval:
+            self.report()
+
+    def report(self, final=False):
+        self._last_report = time.perf_counter()
+        elapsed = self._last_report - self._started
+        rate = self.processed / elapsed if elapsed > 0 else 0
+        done = self.skipped + self.processed
+        line = f"{self.command}: {done}"
+        if self.total:
+            line += f"/{self.total} ({done / self.total:.0%})"
+        line += f" {rate:.1f} rows/s"
+        if final:
+            line += f" in {_duration(elapsed)}"
+            if self.skipped:
+                line += f", {self.skipped} done by an earlier run"
+        elif self.total and rate > 0:
+            line += f" ETA {_duration((self.total - done) / rate)}"
+        print(line)
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
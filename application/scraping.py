@@ -2,57 +2,80 @@ import re
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
-from thefuzz import process
+
+from application.classifier import DocumentTypeClassifier
+from application.link_extraction import CHUNK_SIZE, iter_anchors
+
+DEFAULT_TIMEOUT = 30
 
 
 def extract_links_from_page(url, plan, reference_data):
     try:
-        response = requests.get(url, verify=False)
+        response = requests.get(url, verify=False, timeout=DEFAULT_TIMEOUT, stream=True)
         response.raise_for_status()
     except Exception as e:
         print(f"Error fetching {url}: {e}")
         return []
 
-    soup = BeautifulSoup(response.content, "html.parser")
-    links = soup.find_all("a", href=True)
+    # the page is parsed as it downloads
+    with response:
+        return extract_links(
+            response.iter_content(CHUNK_SIZE),
+            url,
+            plan,
+            DocumentTypeClassifier(reference_data),
+        )
+
+
+def extract_links(content, url, plan, classifier, backend=None):
+    """Find links on a fetched documentation page that look like documents
+
+    content is the page as bytes or an iterable of byte chunks, and backend
+    the link_extraction backend to parse it with. The link texts of the
+    whole page are classified in one batch.
+    """
     document_links = []
-    for link in links:
-        href = link["href"]
-        document_url = urljoin(url, href)  # ensure urls are absolute
+    for anchor in iter_anchors(content, backend):
+        href = anchor.href
         if any(x in href.lower() for x in ["pdf", "doc", "document", "file"]):
-            name = link.get_text(strip=True)
-            name = clean_text(name)
-            match = process.extractOne(name, reference_data)
-            if match[1] > 85:
-                document_type = match[0]
-            else:
-                document_type = None
-
             document_links.append(
                 {
-                    "name": name,
+                    "name": clean_text(anchor.text),
                     "local_plan": plan.reference,
-                    "document_url": document_url,
+                    "document_url": urljoin(url, href),  # ensure urls are absolute
                     "documentation_url": url,
-                    "document_type": document_type,
                 }
             )
+
+    matches = classifier.classify(link["name"] for link in document_links)
+    for link, (document_type, confidence) in zip(document_links, matches):
+        link["document_type"] = document_type
+        link["confidence"] = confidence
     return document_links
 
 
+NON_ASCII = re.compile(r"[^\x00-\x7F]+")
+PDF_TAG = re.compile(r"\[\s*pdf\s*\]", flags=re.IGNORECASE)
+FILE_SIZE = re.compile(r"\(\d+(,\d{3})?KB\)|\d+(,\d{3})?KB|\d+MB")
+
+
 def clean_text(text):
-    text = re.sub(
-        r"[^\x00-\x7F]+", "'", text
-    )  # replace all non-ASCII characters with an apostrophe
-    text = re.sub(r"\[\s*pdf\s*\]", "", text, flags=re.IGNORECASE)  # remove [pdf] tags
-    text = re.sub(r"\s+", " ", text)  # normalize any excessive spaces
-    text = re.sub(
-        r"\(\d+(,\d{3})?KB\)|\d+(,\d{3})?KB|\d+MB", "", text
-    )  # remove file sizes like (63KB), 63KB, or 12MB
-    words = text.split()
-    cleaned_words = [
-        word.rstrip("'") for word in words
-    ]  # remove apostrophe at the end of each word
-    cleaned_text = " ".join(cleaned_words)
-    return cleaned_text.strip()
+    """Normalise link text, dropping [pdf] tags and file sizes like (63KB)
+
+    Each rule runs only if its characters are present, so most link
+    texts, which are plain ASCII without tags or sizes, get no regex pass
+    at all. The rules run in their original order as removing a tag can
+    join the digits of a file size.
+    """
+    if not text.isascii():
+        # replace all non-ASCII characters with an apostrophe
+        text = NON_ASCII.sub("'", text)
+    if "[" in text:
+        text = PDF_TAG.sub("", text)
+    if "KB" in text or "MB" in text:
+        text = FILE_SIZE.sub("", text)
+    words = text.split()  # also normalises any excessive spaces
+    if "'" in text:
+        # remove apostrophe at the end of each word
+        words = [word.rstrip("'") for word in words]
+    return " ".join(words).strip()
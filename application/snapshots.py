@@ -0,0 +1,200 @@
+"""Local database snapshots kept as Postgres template databases.
+
+Restoring a dump is slow, copying a database is not. A dump is restored
+once, with parallel pg_restore jobs, into a template database named after
+the dump's checksum. Working databases are then made from the template
+with CREATE DATABASE ... TEMPLATE, which copies files rather than replaying
+SQL. Restoring a dump that has already been restored skips straight to the
+copy.
+
+The same templates are used by the tests, built with db.create_all and
+keyed on a checksum of the schema.
+"""
+
+import hashlib
+import os
+import subprocess
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+CHECKSUM_PREFIX = "sha256:"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotManager:
+    def __init__(self, database_url, maintenance_database="postgres"):
+        self.url = make_url(database_url)
+        self.database = self.url.database
+        self.engine = create_engine(
+            self.url.set(database=maintenance_database),
+            isolation_level="AUTOCOMMIT",
+        )
+
+    def template_name(self, checksum):
+        return f"{self.database}_template_{checksum[:12]}"
+
+    def restore(self, dump_path, jobs=None):
+        """Restore a pg_dump file into a template, unless already restored.
+
+        Returns the name of the template database.
+        """
+        checksum = verify_dump(dump_path)
+        return self.ensure_template(
+            checksum, lambda url: _pg_restore(url, dump_path, jobs or os.cpu_count())
+        )
+
+    def ensure_template(self, checksum, build):
+        """Return the template for checksum, building it first if needed.
+
+        build is called with the url of an empty database to fill. Templates
+        for older checksums of the same database are dropped.
+        """
+        template = self.template_name(checksum)
+        if self._checksum(template) == checksum:
+            return template
+
+        building = f"{template}_building"
+        self._drop(building)
+        self._execute(f'CREATE DATABASE "{building}"')
+        try:
+            build(self.database_url(building))
+        except Exception:
+            self._drop(building)
+            raise
+
+        self._drop(template)
+        self._execute(f'ALTER DATABASE "{building}" RENAME TO "{template}"')
+        self._execute(f'ALTER DATABASE "{template}" WITH IS_TEMPLATE true')
+        self._execute(
+            f"COMMENT ON DATABASE \"{template}\" IS '{CHECKSUM_PREFIX}{checksum}'"
+        )
+        for name in self.templates():
+            if name != template:
+                self._drop(name)
+        return template
+
+    def create_from_template(self, template, database=None):
+        """Replace database, the configured one by default, with a copy of template."""
+        database = database or self.database
+        self._drop(database)
+        self._execute(f'CREATE DATABASE "{database}" TEMPLATE "{template}"')
+        return database
+
+    def templates(self):
+        with self.engine.connect() as conn:
+            return (
+                conn.execute(
+                    text(
+                        "SELECT datname FROM pg_database "
+                        "WHERE datistemplate AND datname LIKE :pattern ORDER BY datname"
+                    ),
+                    {"pattern": f"{self.database}\\_template\\_%"},
+                )
+                .scalars()
+                .all()
+            )
+
+    def database_url(self, database):
+        """libpq connection url for database on the same server"""
+        return self.url.set(
+            drivername="postgresql", database=database
+        ).render_as_string(hide_password=False)
+
+    def _checksum(self, database):
+        with self.engine.connect() as conn:
+            comment = conn.execute(
+                text(
+                    "SELECT shobj_description(oid, 'pg_database') FROM pg_database "
+                    "WHERE datname = :database"
+                ),
+                {"database": database},
+            ).scalar()
+        if comment and comment.startswith(CHECKSUM_PREFIX):
+            return comment[len(CHECKSUM_PREFIX) :]
+        return None
+
+    def _drop(self, database):
+        with self.engine.connect() as conn:
+            is_template = conn.execute(
+                text("SELECT datistemplate FROM pg_database WHERE datname = :database"),
+                {"database": database},
+            ).scalar()
+        if is_template is None:
+            return
+        if is_template:
+            self._execute(f'ALTER DATABASE "{database}" WITH IS_TEMPLATE false')
+        self._execute(f'DROP DATABASE "{database}" WITH (FORCE)')
+
+    def _execute(self, sql):
+        with self.engine.connect() as conn:
+            conn.execute(text(sql))
+
+
+def file_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def schema_checksum(metadata):
+    """Checksum of the DDL for metadata, for keying schema only templates."""
+    dialect = postgresql.dialect()
+    sha256 = hashlib.sha256()
+    for table in metadata.sorted_tables:
+        sha256.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            sha256.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return sha256.hexdigest()
+
+
+def write_checksum(dump_path):
+    """Record the checksum of a freshly downloaded dump alongside it."""
+    checksum = file_checksum(dump_path)
+    with open(f"{dump_path}.sha256", "w") as f:
+        f.write(f"{checksum}  {os.path.basename(dump_path)}\n")
+    return checksum
+
+
+def verify_dump(dump_path):
+    """Return the dump's checksum, checking it against any recorded one."""
+    checksum = file_checksum(dump_path)
+    checksum_path = f"{dump_path}.sha256"
+    if os.path.exists(checksum_path):
+        with open(checksum_path) as f:
+            expected = f.read().split()[0]
+        if expected != checksum:
+            raise SnapshotError(
+                f"{dump_path} does not match {checksum_path}, it may be incomplete"
+            )
+    return checksum
+
+
+def _pg_restore(database_url, dump_path, jobs):
+    result = subprocess.run(
+        [
+            "pg_restore",
+            "--no-acl",
+            "--no-owner",
+            "--jobs",
+            str(jobs),
+            "--dbname",
+            database_url,
+            dump_path,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    # pg_restore also exits non zero when it carried on past errors, such as
+    # missing roles, that do not matter for a local copy
+    if result.returncode != 0:
+        print(result.stderr)
+        if "errors ignored on restore" not in result.stderr:
+            raise SnapshotError(f"pg_restore of {dump_path} failed")
@@ -0,0 +1,177 @@
+"""Bulk loading of CSV files through temporary staging tables.
+
+A CSV is streamed into a TEMP table with COPY and then merged into the
+target table with a single INSERT ... SELECT ... ON CONFLICT, so a load
+costs a handful of statements however many rows the file has.
+
+Staged rows can be hashed as a whole so that a reload only rewrites rows
+whose source has changed, and so that the changes can be listed first.
+"""
+
+import csv
+
+from sqlalchemy import (
+    Text,
+    cast,
+    column,
+    func,
+    literal_column,
+    select,
+    table,
+    text,
+    true,
+)
+from sqlalchemy.dialects.postgresql import insert
+
+from application.extensions import db
+
+
+def stage_csv(file_path, staging_table):
+    """COPY a CSV file into a new temporary table of text columns.
+
+    Column names come from the CSV header with dashes replaced by
+    underscores. The table is dropped when the transaction ends.
+
+    Returns a lightweight sqlalchemy table for the staging table.
+    """
+    with open(file_path, mode="r", newline="") as file:
+        header = next(csv.reader(file))
+    columns = []
+    for i, name in enumerate(header):
+        name = name.strip().lower().replace("-", "_")
+        columns.append(name if name else f"unused_{i}")
+
+    db.session.execute(
+        text(
+            f"CREATE TEMP TABLE {staging_table} "
+            f"({', '.join(f'{c} text' for c in columns)}) ON COMMIT DROP"
+        )
+    )
+
+    cursor = db.session.connection().connection.cursor()
+    with open(file_path, mode="rb") as file:
+        cursor.copy_expert(
+            f"COPY {staging_table} ({', '.join(columns)}) FROM STDIN "
+            "WITH (FORMAT csv, HEADER, ENCODING 'UTF8')",
+            file,
+        )
+    return table(staging_table, *[column(c, Text) for c in columns])
+
+
+def row_hash(staging):
+    """SQL expression for the md5 of a whole staged row."""
+    return func.md5(cast(func.row_to_json(literal_column(staging.name)), Text))
+
+
+def diff_staged(staging, target, key):
+    """Compare staged rows with the content hashes held in target.
+
+    Nothing is written. Returns a tuple of (new, changed, unchanged) lists
+    of keys.
+    """
+    held = target.alias("held")
+    rows = db.session.execute(
+        select(
+            staging.c[key].label("key"),
+            held.c[key].is_(None).label("new"),
+            held.c.content_hash.is_distinct_from(row_hash(staging)).label("changed"),
+        )
+        .select_from(staging.outerjoin(held, held.c[key] == staging.c[key]))
+        .where(func.nullif(staging.c[key], "").isnot(None))
+        .distinct(staging.c[key])
+        .order_by(staging.c[key], literal_column(f"{staging.name}.ctid").desc())
+    )
+    new, changed, unchanged = [], [], []
+    for row in rows:
+        if row.new:
+            new.append(row.key)
+        elif row.changed:
+            changed.append(row.key)
+        else:
+            unchanged.append(row.key)
+    return new, changed, unchanged
+
+
+def merge_staged(
+    staging,
+    target,
+    key,
+    update_columns=None,
+    defaults=None,
+    expressions=None,
+    where=None,
+    skip_unchanged=False,
+    exclude=None,
+):
+    """Upsert rows from a staging table into target in one statement.
+
+    Every staging column that also exists on target is copied across, with
+    empty strings treated as NULL and values cast to the target column
+    type. expressions overrides that conversion for individual columns.
+    Rows whose key already exists only have update_columns overwritten;
+    pass an empty list to leave existing rows alone. defaults supplies SQL
+    expressions for NOT NULL columns the CSV does not provide, and where
+    restricts which staged rows are merged. exclude names target columns
+    that are never copied from staging, such as ones derived from other
+    tables. With skip_unchanged the hash of each staged row is stored in
+    target's content_hash column and existing rows whose hash is unchanged
+    are not rewritten.
+
+    Returns a tuple of (inserted, updated) counts.
+    """
+    defaults = dict(defaults or {})
+    update_columns = list(update_columns or [])
+    if skip_unchanged:
+        defaults["content_hash"] = row_hash(staging)
+        if update_columns:
+            update_columns.append("content_hash")
+    expressions = expressions or {}
+    exclude = set(exclude or [])
+    columns = [
+        c.name for c in staging.c if c.name in target.c and c.name not in exclude
+    ]
+    values = [
+        (
+            expressions[name].label(name)
+            if name in expressions
+            else cast(func.nullif(staging.c[name], ""), target.c[name].type).label(name)
+        )
+        for name in columns
+    ]
+    for name, value in defaults.items():
+        if name not in columns:
+            columns.append(name)
+            values.append(value.label(name))
+
+    # ON CONFLICT cannot touch the same row twice, so keep the last
+    # occurrence of any key repeated in the file
+    rows = (
+        select(*values)
+        .select_from(staging)
+        .where(func.nullif(staging.c[key], "").isnot(None))
+        .where(where if where is not None else true())
+        .distinct(staging.c[key])
+        .order_by(staging.c[key], literal_column("ctid").desc())
+    )
+    stmt = insert(target).from_select(columns, rows)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[target.c[key]],
+            set_={name: stmt.excluded[name] for name in update_columns},
+            where=(
+                target.c.content_hash.is_distinct_from(stmt.excluded.content_hash)
+                if skip_unchanged
+                else None
+            ),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[target.c[key]])
+    stmt = stmt.returning(literal_column("xmax = 0").label("inserted"))
+
+    inserted = updated = 0
+    for row in db.session.execute(stmt):
+        if row.inserted:
+            inserted += 1
+        else:
+            updated += 1
+    return inserted, updated
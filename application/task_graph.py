@@ -0,0 +1,129 @@
+"""A small dependency graph runner for the data commands.
+
+Steps declare the steps they depend on. Each step runs in a worker thread
+with its own app context, and so its own database session, as soon as
+everything it depends on has finished. Steps whose dependencies failed are
+skipped.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from application.extensions import db
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable
+    depends_on: List[str] = field(default_factory=list)
+    status: str = PENDING
+    elapsed: float = 0.0
+    error: Optional[BaseException] = None
+
+
+class TaskGraph:
+    def __init__(self):
+        self.steps = {}
+
+    def add(self, name, fn, depends_on=None):
+        if name in self.steps:
+            raise ValueError(f"Step {name} already added")
+        self.steps[name] = Step(name, fn, list(depends_on or []))
+        return self
+
+    def validate(self):
+        """Raise ValueError for unknown dependencies or dependency cycles."""
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(
+                        f"{step.name} depends on unknown step {dependency}"
+                    )
+
+        visiting, visited = set(), set()
+
+        def visit(name, path):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.steps[name].depends_on:
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name, [])
+
+    def run(self, app, max_workers=4):
+        """Run every step, returning the steps in the order they finished."""
+        self.validate()
+        finished = []
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                skippable = self._skippable()
+                while skippable:
+                    for step in skippable:
+                        step.status = SKIPPED
+                        finished.append(step)
+                    skippable = self._skippable()
+                for step in self._ready():
+                    step.status = RUNNING
+                    running[executor.submit(self._run_step, app, step)] = step
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished.append(running.pop(future))
+
+        return finished
+
+    def _ready(self):
+        return [
+            step
+            for step in self.steps.values()
+            if step.status == PENDING
+            and all(
+                self.steps[dependency].status == SUCCEEDED
+                for dependency in step.depends_on
+            )
+        ]
+
+    def _skippable(self):
+        return [
+            step
+            for step in self.steps.values()
+            if step.status == PENDING
+            and any(
+                self.steps[dependency].status in (FAILED, SKIPPED)
+                for dependency in step.depends_on
+            )
+        ]
+
+    @staticmethod
+    def _run_step(app, step):
+        started = time.perf_counter()
+        with app.app_context():
+            try:
+                step.fn()
+                step.status = SUCCEEDED
+            except Exception as e:
+                db.session.rollback()
+                step.error = e
+                step.status = FAILED
+            finally:
+                db.session.remove()
+                step.elapsed = time.perf_counter() - started
+        return step
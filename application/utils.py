@@ -45,15 +45,11 @@ def combine_geographies(geographies):
 
 
 def adopted_plan_count():
-    return LocalPlan.query.filter(LocalPlan.adopted_date != "").count()
+    return LocalPlan.query.filter(LocalPlan.adopted_date.isnot(None)).count()
 
 
 def get_adopted_local_plans():
-    return (
-        LocalPlan.query.filter(LocalPlan.development_plan_type == "local-plan")
-        .filter(LocalPlan.adopted_date != "")
-        .all()
-    )
+    return LocalPlan.query.filter(LocalPlan.adopted_date.isnot(None)).all()
 
 
 def set_organisations(obj, org_str):
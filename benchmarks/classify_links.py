@@ -0,0 +1,76 @@
+"""Link texts per second for document type classification.
+
+Compares one thefuzz extractOne call per link, as the scraper used to make,
+with DocumentTypeClassifier scoring the whole corpus in one batch. The
+corpus is built from document names in data/local-plan-document.csv,
+repeated with small variations to the requested size, and matched against
+data/local-plan-document-types.csv. extractOne is timed on a sample and
+extrapolated, as the full corpus takes minutes. Run with:
+
+    python -m benchmarks.classify_links --texts 100000
+"""
+
+import csv
+import random
+import time
+from pathlib import Path
+
+import click
+from thefuzz import process
+
+from application.classifier import DocumentTypeClassifier
+from application.scraping import clean_text
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+
+SUFFIXES = ["", " (PDF, 2MB)", " [pdf]", " - consultation version", " 2024"]
+
+
+def _corpus(size):
+    with open(DATA_DIRECTORY / "local-plan-document.csv", newline="") as f:
+        names = [row["name"] for row in csv.DictReader(f) if row["name"]]
+    rng = random.Random(0)
+    return [clean_text(rng.choice(names) + rng.choice(SUFFIXES)) for _ in range(size)]
+
+
+def _document_types():
+    with open(DATA_DIRECTORY / "local-plan-document-types.csv", newline="") as f:
+        return [row["name"] for row in csv.DictReader(f)]
+
+
+def _report(label, count, elapsed, note=""):
+    print(f"{label:<28} {elapsed:8.2f}s  {count / elapsed:12,.0f} texts/s{note}")
+
+
+@click.command()
+@click.option("--texts", default=100000, show_default=True)
+@click.option("--sample", default=5000, show_default=True, help="Texts for extractOne")
+@click.option("--workers", default=-1, show_default=True, help="cdist threads")
+def main(texts, sample, workers):
+    corpus = _corpus(texts)
+    document_types = _document_types()
+    print(f"{len(corpus):,} link texts, {len(document_types)} document types\n")
+
+    started = time.perf_counter()
+    for text in corpus[:sample]:
+        process.extractOne(text, document_types)
+    elapsed = time.perf_counter() - started
+    _report(
+        "extractOne per link",
+        sample,
+        elapsed,
+        f"  (~{elapsed * len(corpus) / sample:.0f}s for all)",
+    )
+
+    for label, threads in [("batched cdist, 1 thread", 1), ("batched cdist", workers)]:
+        classifier = DocumentTypeClassifier(document_types, workers=threads)
+        started = time.perf_counter()
+        matches = classifier.classify(corpus)
+        _report(label, len(corpus), time.perf_counter() - started)
+
+    typed = sum(1 for document_type, _ in matches if document_type)
+    print(f"\n{typed:,} texts matched a document type")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Cost per string of scraping.clean_text against the original version.
+
+The link texts are the document names in data/local-plan-document.csv with
+some of them given the [pdf] tags, file sizes and curly quotes found on
+council sites. Run with:
+
+    python -m benchmarks.clean_text
+"""
+
+import csv
+import random
+import re
+import timeit
+from pathlib import Path
+
+import click
+
+from application.scraping import clean_text
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+
+DECORATIONS = ["", "", "", " [pdf]", " (63KB)", " 1,204KB", " 2MB", "’"]
+
+
+def original_clean_text(text):
+    """clean_text as it was before the rewrite"""
+    text = re.sub(r"[^\x00-\x7F]+", "'", text)
+    text = re.sub(r"\[\s*pdf\s*\]", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\(\d+(,\d{3})?KB\)|\d+(,\d{3})?KB|\d+MB", "", text)
+    words = text.split()
+    cleaned_words = [word.rstrip("'") for word in words]
+    cleaned_text = " ".join(cleaned_words)
+    return cleaned_text.strip()
+
+
+def _texts():
+    with open(DATA_DIRECTORY / "local-plan-document.csv", newline="") as f:
+        names = [row["name"] for row in csv.DictReader(f)]
+    rng = random.Random(0)
+    return [name + rng.choice(DECORATIONS) for name in names]
+
+
+@click.command()
+@click.option("--repeat", default=5, show_default=True)
+def main(repeat):
+    texts = _texts()
+    assert [clean_text(t) for t in texts] == [original_clean_text(t) for t in texts]
+
+    for label, fn in [("original", original_clean_text), ("clean_text", clean_text)]:
+        best = min(
+            timeit.repeat(lambda: [fn(t) for t in texts], number=1, repeat=repeat)
+        )
+        print(f"{label:<12} {best * 1e9 / len(texts):8.0f} ns per string")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Pages per second for link extraction, BeautifulSoup against each backend.
+
+Runs over a corpus of saved council documentation pages, one .html file
+per page in --pages. Save the documentation pages of the plans in the
+configured database there first with --fetch. Without saved pages the
+corpus is made up from data/local-plan-document.csv, a page per
+documentation url listing its documents inside typical council site
+navigation and footer. Each backend must find the same links as
+BeautifulSoup. Run with:
+
+    python -m benchmarks.extract_links --fetch
+    python -m benchmarks.extract_links
+"""
+
+import csv
+import hashlib
+import os
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import click
+
+from application.link_extraction import BACKENDS, iter_anchors
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+PAGES_DIRECTORY = DATA_DIRECTORY / "cache" / "pages"
+
+NAVIGATION = "".join(
+    f'<li class="nav__item"><a class="nav__link" href="/{slug}">{slug.title()}</a></li>'
+    for slug in [
+        "bins-and-recycling",
+        "council-tax",
+        "planning-and-building-control",
+        "housing",
+        "parking",
+        "schools",
+        "libraries",
+        "jobs",
+        "contact-us",
+        "accessibility",
+    ]
+    * 6
+)
+
+
+def _saved_pages(directory):
+    return [path.read_bytes() for path in sorted(Path(directory).glob("*.html"))]
+
+
+def _synthetic_pages():
+    documents = defaultdict(list)
+    with open(DATA_DIRECTORY / "local-plan-document.csv", newline="") as f:
+        for row in csv.DictReader(f):
+            documents[row["documentation-url"]].append(row)
+    rng = random.Random(0)
+    pages = []
+    for url, rows in documents.items():
+        items = "".join(
+            f'<li><p class="intro">{rng.choice(["Read", "Download", "See"])} the '
+            f'document below.</p><a class="download" href="{row["document-url"]}">'
+            f'{row["name"]} <span class="meta">(PDF, {rng.randint(1, 900)}KB)</span>'
+            "</a></li>"
+            for row in rows
+        )
+        pages.append(
+            (
+                '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+                f"<title>Local plan</title><script>var page = '{url}';</script>"
+                "</head><body><header><ul class=nav>"
+                f"{NAVIGATION}</ul></header><main><h1>Local plan</h1>"
+                f"<p>{'Our local plan sets out planning policies. ' * 40}</p>"
+                f"<ul>{items}</ul></main><footer><ul>{NAVIGATION}</ul></footer>"
+                "</body></html>"
+            ).encode("utf-8")
+        )
+    return pages
+
+
+def _fetch(directory):
+    from application.crawler import Crawler
+    from application.factory import create_app
+    from application.models import LocalPlan
+
+    app = create_app(
+        os.getenv("FLASK_CONFIG") or "application.config.DevelopmentConfig"
+    )
+    with app.app_context():
+        urls = {
+            plan.documentation_url
+            for plan in LocalPlan.query.filter(LocalPlan.documentation_url.isnot(None))
+        }
+    os.makedirs(directory, exist_ok=True)
+    crawler = Crawler()
+    saved = 0
+    for url in sorted(urls):
+        try:
+            _, body = crawler.fetch(url)
+        except Exception as e:
+            print(f"  {e}")
+            continue
+        name = hashlib.md5(url.encode()).hexdigest()
+        Path(directory, f"{name}.html").write_bytes(body)
+        saved += 1
+    print(f"Saved {saved} of {len(urls)} documentation pages to {directory}")
+
+
+def _time(pages, backend, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page in pages:
+            for _ in iter_anchors(page, backend):
+                pass
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@click.command()
+@click.option("--pages", "directory", default=str(PAGES_DIRECTORY), show_default=True)
+@click.option("--fetch", is_flag=True, default=False, help="Save pages first")
+@click.option("--repeat", default=3, show_default=True)
+def main(directory, fetch, repeat):
+    if fetch:
+        _fetch(directory)
+    pages = _saved_pages(directory) if os.path.isdir(directory) else []
+    if not pages:
+        print(f"No saved pages in {directory}, using synthetic pages")
+        pages = _synthetic_pages()
+    megabytes = sum(len(page) for page in pages) / 1024 / 1024
+    print(f"{len(pages)} pages, {megabytes:.1f}MB\n")
+
+    expected = [list(iter_anchors(page, "bs4")) for page in pages]
+    for backend in BACKENDS:
+        assert [list(iter_anchors(page, backend)) for page in pages] == expected
+
+    baseline = None
+    for backend in ["bs4", *[name for name in BACKENDS if name != "bs4"]]:
+        elapsed = _time(pages, backend, repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{backend:<12} {elapsed:8.2f}s  {len(pages) / elapsed:8.0f} pages/s  "
+            f"{megabytes / elapsed:6.1f}MB/s  {baseline / elapsed:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
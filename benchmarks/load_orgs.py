@@ -0,0 +1,87 @@
+"""Rows per second for loading organisations, per-row commit vs bulk upsert.
+
+The second bulk pass reloads identical rows, which the content hash skips.
+
+Writes synthetic organisations to the configured database and removes them
+afterwards. Run with:
+
+    python -m benchmarks.load_orgs --rows 2000
+"""
+
+import os
+import time
+
+import click
+
+from application.commands import _content_hash, _rate, _upsert_organisations
+from application.extensions import db
+from application.factory import create_app
+from application.models import Organisation
+
+PREFIX = "benchmark-org:"
+
+
+def _synthetic_orgs(count):
+    orgs = [
+        {
+            "organisation": f"{PREFIX}{i}",
+            "name": f"Benchmark Council {i}",
+            "official_name": f"Benchmark Borough Council {i}",
+            "local_authority_type": "NMD",
+            "statistical_geography": f"E0{i:07d}",
+            "website": f"https://www.benchmark-{i}.gov.uk",
+            "entry_date": "2024-01-01",
+        }
+        for i in range(count)
+    ]
+    for org in orgs:
+        org["content_hash"] = _content_hash(org)
+    return orgs
+
+
+def _per_row(orgs):
+    for org in orgs:
+        org_obj = Organisation.query.get(org["organisation"])
+        if org_obj is None:
+            org_obj = Organisation()
+        for key, value in org.items():
+            setattr(org_obj, key, value)
+        db.session.add(org_obj)
+        db.session.commit()
+
+
+def _clean_up():
+    Organisation.query.filter(Organisation.organisation.startswith(PREFIX)).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def _time(label, fn, orgs):
+    started = time.perf_counter()
+    fn(orgs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {elapsed:8.2f}s  {_rate(len(orgs), elapsed)}")
+
+
+@click.command()
+@click.option("--rows", default=2000, show_default=True)
+def main(rows):
+    app = create_app(
+        os.getenv("FLASK_CONFIG") or "application.config.DevelopmentConfig"
+    )
+    orgs = _synthetic_orgs(rows)
+    with app.app_context():
+        _clean_up()
+        try:
+            _time("per-row insert", _per_row, orgs)
+            _time("per-row update", _per_row, orgs)
+            _clean_up()
+            _time("bulk upsert insert", _upsert_organisations, orgs)
+            _time("bulk upsert unchanged", _upsert_organisations, orgs)
+        finally:
+            _clean_up()
+
+
+if __name__ == "__main__":
+    main()
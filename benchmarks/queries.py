@@ -0,0 +1,351 @@
+"""EXPLAIN ANALYZE of the app's queries, without and with the indexes in INDEXES.
+
+Builds a database of synthetic data at --scale times the size of the
+production data, kept as a template so later runs start straight away.
+Each page in PAGES is fetched with the test client and every distinct
+SELECT it runs is recorded with its parameters. Each statement is then
+explained with ANALYZE, first in a transaction that drops INDEXES and is
+rolled back, then with them, keeping the fastest of --repeat runs. The summary is printed and
+the plans written to --output. Run with:
+
+    python -m benchmarks.queries
+    python -m benchmarks.queries --scale 1 --repeat 5
+"""
+
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+import click
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+from application.extensions import db
+from application.factory import create_app
+from application.snapshots import SnapshotManager, schema_checksum
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+OUTPUT = DATA_DIRECTORY / "cache" / "query-plans.txt"
+
+# roughly the rows held in production
+PRODUCTION_ROWS = {
+    "organisation": 400,
+    "local_plan": 261,
+    "local_plan_document": 5322,
+    "local_plan_timetable": 2610,
+}
+
+INDEXES = [
+    "ix_local_plan_status_boundary_status",
+    "ix_local_plan_document_local_plan_status",
+    "ix_local_plan_document_status",
+    "ix_local_plan_document_document_types",
+    "ix_organisation_current_name",
+    "ix_local_plan_timetable_local_plan_event_date",
+]
+
+PAGES = [
+    "/organisation/",
+    "/organisation/?planStatusFilter=FOR_PLATFORM",
+    "/organisation/local-authority:BM00001",
+    "/local-plan/benchmark-plan-1",
+    "/stats",
+    "/export/local-plan.csv",
+    "/export/local-plan-boundary.csv",
+    "/export/local-plan-document.csv",
+    "/export/local-plan-document.csv?document-type=sustainability-appraisal",
+    "/export/local-plan-timetable.csv",
+]
+
+EXECUTION_TIME = re.compile(r"Execution Time: ([\d.]+) ms")
+INDEX_USED = re.compile(
+    r"Index(?: Only)? Scan(?: Backward)? using (\S+)|Index Scan on (\S+)"
+)
+
+
+def _polygon(points):
+    ring = [
+        (
+            round(math.cos(2 * math.pi * i / points), 6),
+            round(51 + math.sin(2 * math.pi * i / points), 6),
+        )
+        for i in range(points)
+    ]
+    ring.append(ring[0])
+    wkt = "MULTIPOLYGON (((" + ", ".join(f"{x} {y}" for x, y in ring) + ")))"
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {},
+                "geometry": {"type": "MultiPolygon", "coordinates": [[ring]]},
+            }
+        ],
+    }
+    return wkt, geojson
+
+
+def _types(filename):
+    with open(DATA_DIRECTORY / filename, newline="") as f:
+        return [(row["reference"], row["name"]) for row in csv.DictReader(f)]
+
+
+def _build(url, scale):
+    rows = {table: count * scale for table, count in PRODUCTION_ROWS.items()}
+    geometry, geojson = _polygon(500)
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table, filename in [
+            ("local_plan_document_type", "local-plan-document-types.csv"),
+            ("local_plan_event_type", "local-plan-event.csv"),
+        ]:
+            conn.execute(
+                text(
+                    f"INSERT INTO {table} (reference, name, entry_date) "
+                    "VALUES (:reference, :name, DATE '2020-01-01')"
+                ),
+                [
+                    {"reference": reference, "name": name}
+                    for reference, name in _types(filename)
+                ],
+            )
+        params = {
+            "organisations": rows["organisation"],
+            "plans": rows["local_plan"],
+            "documents": rows["local_plan_document"],
+            "events": rows["local_plan_timetable"],
+            "geometry": geometry,
+            "geojson": json.dumps(geojson),
+        }
+        for statement in SYNTHETIC_DATA:
+            conn.execute(text(statement), params)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM ANALYZE")
+    engine.dispose()
+
+
+# a tenth of organisations are end dated, most plans and documents are for
+# review, plans have a boundary each and documents one or two types
+SYNTHETIC_DATA = [
+    """
+    INSERT INTO organisation (organisation, name, entry_date, end_date,
+        statistical_geography, geometry, geojson)
+    SELECT 'local-authority:BM' || lpad(i::text, 5, '0'),
+        'Council ' || md5(i::text), DATE '2020-01-01',
+        CASE WHEN i % 10 = 0 THEN DATE '2023-04-01' END,
+        'E0' || lpad(i::text, 7, '0'), :geometry, CAST(:geojson AS jsonb)
+    FROM generate_series(1, :organisations) AS i
+    """,
+    """
+    INSERT INTO local_plan_boundary (reference, name, entry_date, geometry, geojson)
+    SELECT 'benchmark-boundary-' || i, 'Boundary ' || i, DATE '2020-01-01',
+        :geometry, CAST(:geojson AS jsonb)
+    FROM generate_series(1, :plans) AS i
+    """,
+    """
+    INSERT INTO local_plan (reference, name, entry_date, documentation_url,
+        period_start_date, period_end_date, local_plan_boundary, status,
+        boundary_status)
+    SELECT 'benchmark-plan-' || i, 'Benchmark Local Plan ' || i, DATE '2020-01-01',
+        'https://www.example.com/plans/' || i, 2020, 2040,
+        'benchmark-boundary-' || i,
+        (ARRAY['FOR_REVIEW', 'FOR_REVIEW', 'FOR_REVIEW', 'FOR_REVIEW',
+            'FOR_PLATFORM', 'EXPORTED', 'NOT_FOR_PLATFORM'])[1 + i % 7]::status,
+        (ARRAY['FOR_REVIEW', 'FOR_REVIEW', 'FOR_PLATFORM'])[1 + i % 3]::status
+    FROM generate_series(1, :plans) AS i
+    """,
+    """
+    INSERT INTO local_plan_organisation (local_plan, organisation)
+    SELECT 'benchmark-plan-' || i,
+        'local-authority:BM' || lpad((1 + i % :organisations)::text, 5, '0')
+    FROM generate_series(1, :plans) AS i
+    """,
+    """
+    INSERT INTO local_plan_document (reference, name, entry_date, local_plan,
+        documentation_url, document_url, document_types, status)
+    SELECT 'benchmark-document-' || i, 'Document ' || i, DATE '2020-01-01',
+        'benchmark-plan-' || (1 + i % :plans),
+        'https://www.example.com/plans/' || (1 + i % :plans),
+        'https://www.example.com/documents/' || i || '.pdf',
+        CASE WHEN i % 3 = 0
+            THEN ARRAY[types[1 + i % cardinality(types)]]
+            ELSE ARRAY[types[1 + i % cardinality(types)],
+                types[1 + (i / 7) % cardinality(types)]]
+        END,
+        (ARRAY['FOR_REVIEW', 'FOR_REVIEW', 'FOR_REVIEW', 'FOR_REVIEW',
+            'FOR_REVIEW', 'FOR_REVIEW', 'FOR_PLATFORM', 'EXPORTED',
+            'NOT_FOR_PLATFORM'])[1 + (i * 7) % 9]::status
+    FROM generate_series(1, :documents) AS i,
+        (SELECT array_agg(reference ORDER BY reference) AS types
+            FROM local_plan_document_type) AS t
+    """,
+    """
+    INSERT INTO document_organisation (local_plan_document_reference, organisation)
+    SELECT d.reference, lpo.organisation
+    FROM local_plan_document d
+    JOIN local_plan_organisation lpo ON lpo.local_plan = d.local_plan
+    """,
+    """
+    INSERT INTO local_plan_timetable (reference, entry_date, local_plan_reference,
+        organisation, local_plan_event, event_date, normalised_event_date,
+        event_date_precision, created_date, end_date)
+    SELECT 'benchmark-event-' || i, DATE '2020-01-01',
+        'benchmark-plan-' || (1 + i % :plans),
+        'local-authority:BM'
+            || lpad((1 + (1 + i % :plans) % :organisations)::text, 5, '0'),
+        events[1 + i % cardinality(events)],
+        (2010 + i % 20)::text, make_date(2010 + i % 20, 1, 1), 'year',
+        TIMESTAMP '2024-01-01' + i * INTERVAL '1 second',
+        CASE WHEN i % 10 = 0 THEN DATE '2024-01-01' END
+    FROM generate_series(1, :events) AS i,
+        (SELECT array_agg(reference ORDER BY reference) AS events
+            FROM local_plan_event_type) AS t
+    """,
+]
+
+
+def _database(scale):
+    source = make_url(
+        os.environ["DATABASE_URL"].replace("postgres://", "postgresql://", 1)
+    )
+    snapshots = SnapshotManager(
+        source.set(database=f"{source.database}_benchmark").render_as_string(
+            hide_password=False
+        )
+    )
+    checksum = hashlib.sha256(
+        "\n".join([schema_checksum(db.metadata), str(scale), *SYNTHETIC_DATA]).encode()
+    ).hexdigest()
+    template = snapshots.ensure_template(checksum, lambda url: _build(url, scale))
+    database = snapshots.create_from_template(template)
+    return snapshots.database_url(database)
+
+
+def _capture(url, pages):
+    """Distinct SELECTs run by each page, as {statement: [label, parameters, calls]}"""
+    from application.config import DevelopmentConfig
+
+    app = create_app(
+        type("BenchmarkConfig", (DevelopmentConfig,), {"SQLALCHEMY_DATABASE_URI": url})
+    )
+    statements = {}
+    page = None
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if many or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        if statement in statements:
+            statements[statement][2] += 1
+        else:
+            number = sum(1 for label, _, _ in statements.values() if label[0] == page)
+            statements[statement] = [(page, number + 1), parameters, 1]
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    client = app.test_client()
+    for page in pages:
+        response = client.get(page, base_url="https://localhost")
+        if response.status_code != 200:
+            raise click.ClickException(f"{page} returned {response.status_code}")
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    with app.app_context():
+        db.engine.dispose()
+    return statements
+
+
+def _explain(cursor, statement, parameters, repeat):
+    best = None
+    for _ in range(repeat):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        elapsed = float(EXECUTION_TIME.search(plan).group(1))
+        if best is None or elapsed < best[0]:
+            best = (elapsed, plan)
+    return best
+
+
+def _explain_all(url, statements, repeat):
+    engine = create_engine(url)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for name in INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        before = [
+            _explain(cursor, statement, parameters, repeat)
+            for statement, (_, parameters, _) in statements.items()
+        ]
+        connection.rollback()
+        after = [
+            _explain(cursor, statement, parameters, repeat)
+            for statement, (_, parameters, _) in statements.items()
+        ]
+        connection.rollback()
+    finally:
+        connection.close()
+        engine.dispose()
+    return before, after
+
+
+def _indexes_used(plan):
+    return sorted(
+        {
+            name
+            for match in INDEX_USED.findall(plan)
+            for name in match
+            if name in INDEXES
+        }
+    )
+
+
+@click.command()
+@click.option("--scale", default=10, show_default=True, help="Times production size")
+@click.option("--repeat", default=3, show_default=True)
+@click.option("--output", default=str(OUTPUT), show_default=True)
+def main(scale, repeat, output):
+    url = _database(scale)
+    statements = _capture(url, PAGES)
+    before, after = _explain_all(url, statements, repeat)
+
+    print(f"{'statement':<52} {'calls':>6} {'before':>9} {'after':>9} {'':>7}  indexes")
+    lines = []
+    for (
+        (statement, ((label, number), parameters, calls)),
+        (
+            before_ms,
+            before_plan,
+        ),
+        (after_ms, after_plan),
+    ) in zip(statements.items(), before, after):
+        name = f"{label} #{number}"
+        print(
+            f"{name[:52]:<52} {calls:>6} {before_ms:>7.2f}ms {after_ms:>7.2f}ms "
+            f"{before_ms / max(after_ms, 0.001):>6.1f}x  "
+            f"{', '.join(_indexes_used(after_plan))}"
+        )
+        lines.extend(
+            [
+                f"-- {name}, run {calls} times",
+                statement.strip(),
+                f"-- parameters: {parameters}",
+                "-- without indexes",
+                before_plan,
+                "-- with indexes",
+                after_plan,
+                "",
+            ]
+        )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    Path(output).write_text("\n".join(lines))
+    print(f"\nPlans written to {output}")
+
+
+if __name__ == "__main__":
+    main()
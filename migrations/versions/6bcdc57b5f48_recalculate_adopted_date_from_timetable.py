@@ -0,0 +1,47 @@
+"""recalculate adopted date from timetable
+
+Revision ID: 6bcdc57b5f48
+Revises: e4da8f998772
+Create Date: 2026-10-19 18:17:06.762513
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "6bcdc57b5f48"
+down_revision = "e4da8f998772"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # load-plans copied the CSV's adopted-date column into adopted_date, so
+    # set it again from the timetable alone, as models.adopted_date_expression
+    op.execute(
+        """
+        UPDATE local_plan
+        SET adopted_date = adopted.event_date
+        FROM local_plan AS plan
+        LEFT JOIN (
+            SELECT DISTINCT ON (local_plan_reference) local_plan_reference, event_date
+            FROM local_plan_timetable
+            WHERE local_plan_event = 'plan-adopted'
+            AND event_date IS NOT NULL
+            AND end_date IS NULL
+            ORDER BY
+                local_plan_reference,
+                normalised_event_date DESC NULLS LAST,
+                created_date DESC
+        ) AS adopted ON adopted.local_plan_reference = plan.reference
+        WHERE local_plan.reference = plan.reference
+        AND local_plan.adopted_date IS DISTINCT FROM adopted.event_date
+        """
+    )
+
+
+def downgrade():
+    # the dates copied from the CSV were wrong, so are not restored
+    pass
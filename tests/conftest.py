@@ -1,9 +1,21 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from slugify import slugify
+from sqlalchemy import create_engine, event
 
 from application.extensions import db
 from application.factory import create_app
 from application.models import LocalPlan, Organisation
+from application.snapshots import SnapshotManager, schema_checksum
+
+
+def _create_schema(database_url):
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    engine.dispose()
 
 
 @pytest.fixture(scope="session")
@@ -11,8 +23,13 @@ def app():
     application = create_app("application.config.TestConfig")
     application.config["SERVER_NAME"] = "127.0.0.1"
 
+    # copy the test database from a template that is only rebuilt when the
+    # models change, rather than creating every table each session
+    snapshots = SnapshotManager(application.config["SQLALCHEMY_DATABASE_URI"])
+    template = snapshots.ensure_template(schema_checksum(db.metadata), _create_schema)
+    snapshots.create_from_template(template)
+
     with application.app_context():
-        db.create_all()
         organisation = Organisation(
             name="Somewhere Borough Council",
             organisation=slugify("Somewhere Borough Council"),
@@ -24,7 +41,9 @@ def app():
     yield application
 
     with application.app_context():
-        db.drop_all()
+        db.session.remove()
+        db.engine.dispose()
+    snapshots.create_from_template(template)
 
 
 @pytest.fixture(scope="session")
@@ -38,6 +57,7 @@ def supporting_types(app):
         import csv
         from pathlib import Path
 
+        from application import reference_data
         from application.extensions import db
         from application.models import LocalPlanDocumentType, LocalPlanEventType
 
@@ -65,6 +85,9 @@ def supporting_types(app):
                 )
                 db.session.add(doc_type)
 
+        reference_data.invalidate(
+            reference_data.DOCUMENT_TYPES, reference_data.EVENT_TYPES
+        )
         db.session.commit()
 
 
@@ -80,3 +103,69 @@ def test_data(app, supporting_types):
         organisation.local_plans.append(local_plan)
         db.session.add(organisation)
         db.session.commit()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Count the statements run against the database inside a with block"""
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Serves canned responses, set per path and query string in routes.
+
+    A route is a (status, headers, body) tuple, or a function of the request
+    headers returning one. Unknown paths are a 404.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        self.routes = {}
+        self.requests = []
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        route = self.server.routes.get(self.path, (404, {}, b""))
+        status, headers, body = route(self.headers) if callable(route) else route
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = FixtureServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,107 @@
+import datetime
+
+from application.extensions import db
+from application.models import LocalPlan, LocalPlanTimetable
+from application.utils import adopted_plan_count, get_adopted_local_plans
+
+
+def _adopted_date():
+    db.session.expire_all()
+    return db.session.get(LocalPlan, "some-where-local-plan").adopted_date
+
+
+def test_adopted_date_follows_the_timetable(app, test_data):
+    with app.app_context():
+        plan = db.session.get(LocalPlan, "some-where-local-plan")
+        assert plan.adopted_date is None
+        assert adopted_plan_count() == 0
+
+        try:
+            plan.timetable.append(
+                LocalPlanTimetable(
+                    reference="adopted-date-1",
+                    event_date="2019-06",
+                    local_plan_event="plan-adopted",
+                )
+            )
+            plan.timetable.append(
+                LocalPlanTimetable(
+                    reference="adopted-date-published",
+                    event_date="2024",
+                    local_plan_event="submit-plan-for-examination",
+                )
+            )
+            db.session.commit()
+            assert _adopted_date() == "2019-06"
+            assert adopted_plan_count() == 1
+            assert [plan.reference for plan in get_adopted_local_plans()] == [
+                "some-where-local-plan"
+            ]
+
+            event = db.session.get(LocalPlanTimetable, "adopted-date-1")
+            event.event_date = "2019-06-14"
+            db.session.commit()
+            assert _adopted_date() == "2019-06-14"
+
+            db.session.add(
+                LocalPlanTimetable(
+                    reference="adopted-date-2",
+                    event_date="2021",
+                    local_plan_event="plan-adopted",
+                    local_plan_reference="some-where-local-plan",
+                )
+            )
+            db.session.commit()
+            assert _adopted_date() == "2021"
+
+            event = db.session.get(LocalPlanTimetable, "adopted-date-2")
+            event.end_date = datetime.date.today()
+            db.session.commit()
+            assert _adopted_date() == "2019-06-14"
+
+            db.session.delete(db.session.get(LocalPlanTimetable, "adopted-date-1"))
+            db.session.commit()
+            assert _adopted_date() is None
+            assert adopted_plan_count() == 0
+        finally:
+            LocalPlanTimetable.query.filter(
+                LocalPlanTimetable.reference.startswith("adopted-date-")
+            ).delete()
+            db.session.commit()
+
+
+def test_load_plans_leaves_adopted_date_to_the_timetable(app, test_data):
+    from application.commands import load_plans
+
+    result = app.test_cli_runner().invoke(load_plans)
+    assert "inserted" in result.output, result.output
+
+    with app.app_context():
+        loaded = LocalPlan.query.filter(
+            LocalPlan.reference != "some-where-local-plan"
+        ).all()
+        try:
+            # data/local-plan.csv has adopted dates for most plans
+            plan = db.session.get(LocalPlan, "adur-district-council-local-plan-2017")
+            assert plan is not None
+            assert all(plan.adopted_date is None for plan in loaded)
+
+            plan.timetable.append(
+                LocalPlanTimetable(
+                    reference="adopted-date-loaded",
+                    event_date="2017-12-14",
+                    local_plan_event="plan-adopted",
+                )
+            )
+            db.session.commit()
+            assert (
+                db.session.get(LocalPlan, plan.reference).adopted_date == "2017-12-14"
+            )
+        finally:
+            LocalPlanTimetable.query.filter(
+                LocalPlanTimetable.reference == "adopted-date-loaded"
+            ).delete()
+            LocalPlan.query.filter(
+                LocalPlan.reference.in_([plan.reference for plan in loaded])
+            ).delete()
+            db.session.commit()
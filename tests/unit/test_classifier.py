@@ -0,0 +1,40 @@
+from thefuzz import process
+
+from application.classifier import DocumentTypeClassifier
+
+DOCUMENT_TYPES = [
+    "Local plan",
+    "Adoption statement",
+    "Sustainability appraisal",
+    "Inspector's report",
+    "Policies map",
+]
+
+LINK_TEXTS = [
+    "Local Plan 2020 - 2035",
+    "adoption statement",
+    "Sustainability Appraisal Report (Regulation 19)",
+    "Inspectors Report",
+    "Policies Map - North",
+    "Contact us",
+    "",
+    "'",
+]
+
+
+def test_classify_matches_extract_one():
+    classifier = DocumentTypeClassifier(DOCUMENT_TYPES)
+
+    for text, (document_type, confidence) in zip(
+        LINK_TEXTS, classifier.classify(LINK_TEXTS)
+    ):
+        match = process.extractOne(text, DOCUMENT_TYPES)
+        assert confidence == match[1]
+        assert document_type == (match[0] if match[1] > 85 else None)
+
+
+def test_classify_without_document_types():
+    classifier = DocumentTypeClassifier([])
+
+    assert classifier.classify(["Local plan"]) == [(None, 0)]
+    assert classifier.classify([]) == []
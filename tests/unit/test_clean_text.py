@@ -0,0 +1,79 @@
+import re
+
+from hypothesis import example, given, settings
+from hypothesis import strategies as st
+
+from application.scraping import clean_text
+
+
+def reference_clean_text(text):
+    """clean_text as it was, one re.sub per rule"""
+    text = re.sub(r"[^\x00-\x7F]+", "'", text)
+    text = re.sub(r"\[\s*pdf\s*\]", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\(\d+(,\d{3})?KB\)|\d+(,\d{3})?KB|\d+MB", "", text)
+    words = text.split()
+    cleaned_words = [word.rstrip("'") for word in words]
+    cleaned_text = " ".join(cleaned_words)
+    return cleaned_text.strip()
+
+
+FRAGMENTS = [
+    "Local plan",
+    "Adoption statement",
+    "[pdf]",
+    "[ PDF ]",
+    "[\tPdf\n]",
+    "(63KB)",
+    "1,234KB",
+    "12MB",
+    "KB",
+    "MB",
+    "(",
+    ")",
+    "[",
+    "]",
+    ",",
+    "'",
+    "''",
+    " ",
+    "  ",
+    "\t",
+    "\n",
+    "\x1c",
+    "\xa0",
+    "’",
+    "é",
+    "—",
+    "١٢",
+]
+
+link_texts = st.lists(
+    st.one_of(
+        st.sampled_from(FRAGMENTS),
+        st.text(alphabet="0123456789,", max_size=5),
+        st.text(max_size=5),
+    ),
+    max_size=12,
+).map("".join)
+
+
+@given(link_texts)
+@settings(max_examples=1000)
+@example("1[pdf]2KB")
+@example("(1[ pdf ]0KB)")
+@example("Plan ' [pdf] (63KB)")
+@example("Inspector’s report\xa0[pdf]")
+def test_clean_text_matches_reference(text):
+    assert clean_text(text) == reference_clean_text(text)
+
+
+@given(st.text())
+def test_clean_text_matches_reference_for_any_text(text):
+    assert clean_text(text) == reference_clean_text(text)
+
+
+def test_clean_text():
+    assert clean_text("Local Plan  2020 [PDF] (1,234KB)") == "Local Plan 2020"
+    assert clean_text("Inspector’s report’") == "Inspector's report"
+    assert clean_text("Policies map 12MB") == "Policies map"
@@ -0,0 +1,305 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from application.classifier import DocumentTypeClassifier
+from application.crawler import NOT_MODIFIED, PARSED, UNCHANGED, Crawler
+
+DOCUMENTATION_PAGE = b"""
+<html>
+  <body>
+    <a href="/about">About the plan</a>
+    <a href="/files/local-plan.pdf">Local plan (2MB)</a>
+    <a href="https://elsewhere.gov.uk/document/adoption-statement.pdf">
+      Adoption statement [pdf]
+    </a>
+  </body>
+</html>
+"""
+
+CLASSIFIER = DocumentTypeClassifier(["Local plan"])
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        try:
+            if failures:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.path.startswith("/slow"):
+                time.sleep(0.2)
+                self._send(DOCUMENTATION_PAGE)
+            elif self.path.startswith("/delay/"):
+                time.sleep(int(self.path.rsplit("/", 1)[1]) / 1000)
+                self._send(DOCUMENTATION_PAGE)
+            elif self.path == "/large":
+                self._send(b"x" * 2048)
+            elif self.path == "/missing":
+                self.send_error(404)
+            elif self.path == "/etag":
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    self._send(DOCUMENTATION_PAGE, {"ETag": '"v1"'})
+            else:
+                self._send(DOCUMENTATION_PAGE)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, body, headers=None):
+        self.send_response(200)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _plan(reference, url):
+    return SimpleNamespace(reference=reference, documentation_url=url)
+
+
+def test_crawl_finds_document_links(server):
+    crawler = Crawler()
+    plan = _plan("a-local-plan", server.url("/plan"))
+
+    results = list(crawler.crawl([plan], ["Local plan", "Adoption statement"]))
+
+    assert len(results) == 1
+    result = results[0]
+    assert result.error is None
+    assert [link["document_url"] for link in result.links] == [
+        server.url("/files/local-plan.pdf"),
+        "https://elsewhere.gov.uk/document/adoption-statement.pdf",
+    ]
+    assert [link["document_type"] for link in result.links] == [
+        "Local plan",
+        "Adoption statement",
+    ]
+    assert all(link["confidence"] > 85 for link in result.links)
+    assert all(link["local_plan"] == "a-local-plan" for link in result.links)
+
+
+def test_crawl_limits_requests_per_host(server):
+    crawler = Crawler(max_workers=6, per_host=2)
+    plans = [_plan(f"plan-{i}", server.url(f"/slow/{i}")) for i in range(6)]
+
+    results = list(crawler.crawl(plans, ["Local plan"]))
+
+    assert len(results) == 6
+    assert all(result.error is None for result in results)
+    assert server.max_active == 2
+
+
+def test_work_for_a_busy_host_does_not_hold_pool_threads():
+    crawler = Crawler(max_workers=4, per_host=1)
+    urls = [f"http://busy.gov.uk/{i}.pdf" for i in range(8)] + [
+        f"http://quiet{i}.gov.uk/plan.pdf" for i in range(3)
+    ]
+    lock = threading.Lock()
+    running = {}
+    most = {}
+    started = []
+
+    def check(url):
+        host = url.split("/")[2]
+        with lock:
+            started.append(host)
+            running[host] = running.get(host, 0) + 1
+            most[host] = max(most.get(host, 0), running[host])
+        time.sleep(0.02)
+        with lock:
+            running[host] -= 1
+        return url
+
+    assert sorted(crawler.map_by_host(check, urls)) == sorted(urls)
+    assert max(most.values()) == 1
+    # the other hosts start straight away rather than after the busy one's
+    # queue, which submitting every url at once would have them wait behind
+    assert set(started[:4]) == {"busy.gov.uk"} | {f"quiet{i}.gov.uk" for i in range(3)}
+
+
+def test_crawl_retries_server_errors(server):
+    server.failures["/flaky"] = 2
+    crawler = Crawler(retries=2)
+
+    result = crawler.crawl_plan(_plan("flaky", server.url("/flaky")), CLASSIFIER)
+
+    assert result.error is None
+    assert len(result.links) == 2
+    assert server.requests.count("/flaky") == 3
+
+
+def test_crawl_abandons_large_pages(server):
+    crawler = Crawler(max_bytes=1024)
+
+    result = crawler.crawl_plan(_plan("large", server.url("/large")), CLASSIFIER)
+
+    assert result.links == []
+    assert "too large" in result.error
+
+
+def test_crawl_reports_errors(server):
+    crawler = Crawler(retries=0)
+
+    result = crawler.crawl_plan(_plan("missing", server.url("/missing")), CLASSIFIER)
+
+    assert result.links == []
+    assert "404" in result.error
+
+
+class NotCalledClassifier:
+    def classify(self, texts):
+        raise AssertionError("page should not have been parsed again")
+
+
+def test_crawl_reuses_links_when_not_modified(server):
+    crawler = Crawler()
+    first = crawler.crawl_plan(_plan("first", server.url("/etag")), CLASSIFIER)
+    assert first.outcome == PARSED
+    assert first.page.etag == '"v1"'
+
+    second = crawler.crawl_plan(
+        _plan("second", server.url("/etag")), NotCalledClassifier(), first.page
+    )
+
+    assert second.outcome == NOT_MODIFIED
+    assert not second.changed
+    assert [link["document_url"] for link in second.links] == [
+        link["document_url"] for link in first.links
+    ]
+    assert all(link["local_plan"] == "second" for link in second.links)
+
+
+def test_crawl_skips_parsing_unchanged_content(server):
+    crawler = Crawler()
+    first = crawler.crawl_plan(_plan("plan", server.url("/plan")), CLASSIFIER)
+    assert first.page.etag is None
+
+    second = crawler.crawl_plan(
+        _plan("plan", server.url("/plan")), NotCalledClassifier(), first.page
+    )
+
+    assert second.outcome == UNCHANGED
+    assert second.page.content_hash == first.page.content_hash
+    assert second.links == first.links
+
+
+def test_crawl_plans_stores_candidate_documents(app, test_data, server):
+    from application.commands import crawl_plans
+    from application.extensions import db
+    from application.models import CandidateDocument, CrawlPage, LocalPlan
+
+    with app.app_context():
+        plan = db.session.get(LocalPlan, "some-where-local-plan")
+        plan.documentation_url = server.url("/plan")
+        db.session.commit()
+
+    try:
+        runner = app.test_cli_runner()
+        result = runner.invoke(crawl_plans, ["--plan", "some-where-local-plan"])
+        assert "found 2 candidate documents" in result.output
+
+        # a second crawl updates the candidates rather than duplicating them,
+        # without parsing the unchanged page again
+        result = runner.invoke(crawl_plans, ["--plan", "some-where-local-plan"])
+        assert "1 pages unchanged" in result.output
+
+        with app.app_context():
+            candidates = CandidateDocument.query.order_by(
+                CandidateDocument.document_url
+            ).all()
+            assert [candidate.document_url for candidate in candidates] == [
+                server.url("/files/local-plan.pdf"),
+                "https://elsewhere.gov.uk/document/adoption-statement.pdf",
+            ]
+            assert candidates[0].document_type == "Local plan"
+            assert candidates[0].documentation_url == server.url("/plan")
+    finally:
+        with app.app_context():
+            CandidateDocument.query.delete()
+            CrawlPage.query.delete()
+            plan = db.session.get(LocalPlan, "some-where-local-plan")
+            plan.documentation_url = None
+            db.session.commit()
+
+
+def test_crawl_plans_commits_while_other_plans_are_crawled(app, test_data, server):
+    from application.commands import crawl_plans
+    from application.extensions import db
+    from application.models import CandidateDocument, CrawlPage, LocalPlan
+
+    # pages finish in a different order to the plans, so some results are
+    # committed while the others are still being fetched and parsed
+    delays = [300, 0, 150, 50]
+    with app.app_context():
+        for i, delay in enumerate(delays):
+            db.session.add(
+                LocalPlan(
+                    reference=f"crawled-plan-{i}",
+                    name=f"Crawled plan {i}",
+                    documentation_url=server.url(f"/delay/{delay}"),
+                )
+            )
+        db.session.commit()
+
+    try:
+        result = app.test_cli_runner().invoke(crawl_plans, ["--workers", "4"])
+
+        assert result.exception is None, result.output
+        assert "Crawled 4 plans (0 failed)" in result.output
+        with app.app_context():
+            assert sorted(
+                plan for (plan,) in db.session.query(CandidateDocument.local_plan)
+            ) == sorted(f"crawled-plan-{i}" for i in range(len(delays)) for _ in "ab")
+    finally:
+        with app.app_context():
+            CandidateDocument.query.delete()
+            CrawlPage.query.delete()
+            LocalPlan.query.filter(
+                LocalPlan.reference.startswith("crawled-plan-")
+            ).delete()
+            db.session.commit()
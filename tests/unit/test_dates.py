@@ -0,0 +1,129 @@
+import datetime
+
+import pytest
+
+from application.dates import (
+    DAY,
+    MONTH,
+    YEAR,
+    format_partial_date,
+    parse_partial_date,
+    partial_date_parts,
+)
+from application.filters import short_date_filter
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2019", (datetime.date(2019, 1, 1), YEAR)),
+        ("2019-06", (datetime.date(2019, 6, 1), MONTH)),
+        ("2019-6", (datetime.date(2019, 6, 1), MONTH)),
+        ("2019-06-14", (datetime.date(2019, 6, 14), DAY)),
+        ("2020-02-29", (datetime.date(2020, 2, 29), DAY)),
+        ("2019-02-30", (None, None)),
+        ("2019-13", (None, None)),
+        ("14/06/2019", (None, None)),
+        ("", (None, None)),
+        (None, (None, None)),
+    ],
+)
+def test_parse_partial_date(value, expected):
+    assert parse_partial_date(value) == expected
+
+
+def test_partial_date_parts():
+    assert partial_date_parts(*parse_partial_date("2019-06-04")) == {
+        "day": "4",
+        "month": "6",
+        "year": "2019",
+    }
+    assert partial_date_parts(*parse_partial_date("2019")) == {
+        "day": "",
+        "month": "",
+        "year": "2019",
+    }
+
+
+def test_format_partial_date():
+    assert format_partial_date(datetime.date(2019, 6, 14), DAY) == "14th June 2019"
+    assert format_partial_date(datetime.date(2019, 6, 1), MONTH) == "June 2019"
+    assert format_partial_date(datetime.date(2019, 1, 1), YEAR) == "2019"
+    assert short_date_filter("2019-06-01") == "1st June 2019"
+    assert short_date_filter("not a date") == "not a date"
+
+
+def test_ordered_events(app, test_data, count_queries):
+    from application.extensions import db
+    from application.models import LocalPlan, LocalPlanTimetable
+
+    dates = ["2019-06", "2021", None, "2019-06-14", "2019", "sometime"]
+    with app.app_context():
+        plan = db.session.get(LocalPlan, "some-where-local-plan")
+        for i, event_date in enumerate(dates):
+            plan.timetable.append(
+                LocalPlanTimetable(
+                    reference=f"ordered-event-{i}",
+                    event_date=event_date,
+                    local_plan_event="plan-adopted",
+                    created_date=datetime.datetime(2024, 1, 1, 0, 0, i),
+                )
+            )
+        plan.timetable.append(
+            LocalPlanTimetable(
+                reference="ordered-event-ended",
+                event_date="2030",
+                local_plan_event="plan-adopted",
+                end_date=datetime.date.today(),
+            )
+        )
+        db.session.commit()
+
+        try:
+            event = db.session.get(LocalPlanTimetable, "ordered-event-3")
+            assert event.normalised_event_date == datetime.date(2019, 6, 14)
+            assert event.event_date_precision == DAY
+
+            event.event_date = "2019-07"
+            assert event.normalised_event_date == datetime.date(2019, 7, 1)
+            assert event.event_date_precision == MONTH
+            db.session.rollback()
+
+            plan.timetable  # loaded here, as pages load it up front
+            with count_queries() as statements:
+                events = plan.ordered_events()
+            assert statements == []
+            assert [event.event_date for event in events] == [
+                "2021",
+                "2019-06-14",
+                "2019-06",
+                "2019",
+                "sometime",
+            ]
+            assert [
+                event.event_date for event in plan.ordered_events(reverse=False)
+            ] == ["2019", "2019-06", "2019-06-14", "2021", "sometime"]
+        finally:
+            LocalPlanTimetable.query.filter(
+                LocalPlanTimetable.reference.startswith("ordered-event-")
+            ).delete()
+            db.session.commit()
+
+
+def test_timetable_dates_are_shown_from_stored_values(app, supporting_types):
+    from application.blueprints.timetable.forms import EventForm
+    from application.models import LocalPlanTimetable
+
+    event = LocalPlanTimetable(event_date="2019-06", local_plan_event="plan-adopted")
+    assert short_date_filter(event) == "June 2019"
+    assert short_date_filter(LocalPlanTimetable(event_date="sometime")) == "sometime"
+    assert short_date_filter(LocalPlanTimetable()) == ""
+
+    # a stored date and precision that event_date alone would not give
+    event.normalised_event_date = datetime.date(2019, 6, 14)
+    event.event_date_precision = DAY
+    assert short_date_filter(event) == "14th June 2019"
+    with app.test_request_context():
+        form = EventForm(obj=event)
+    assert form.event_date.data == {"day": "14", "month": "6", "year": "2019"}
+    assert form.local_plan_event.data == "plan-adopted"
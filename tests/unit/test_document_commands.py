@@ -0,0 +1,241 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+from application.extensions import db
+from application.models import LocalPlan, LocalPlanDocument, Organisation
+
+DOCUMENT_URL = "https://www.somewhere.gov.uk/local-plan.pdf"
+
+
+@pytest.fixture
+def documents(app, test_data):
+    """Add documents with the given references, plans, urls and organisations"""
+    added = []
+
+    def add(reference, organisations, plan="some-where-local-plan", **kwargs):
+        kwargs.setdefault("document_url", DOCUMENT_URL)
+        document = LocalPlanDocument(
+            reference=reference, name=reference, local_plan=plan, **kwargs
+        )
+        db.session.add(document)
+        for organisation in organisations:
+            document.organisations.append(db.session.get(Organisation, organisation))
+        added.append(reference)
+        return document
+
+    with app.app_context():
+        db.session.add(
+            Organisation(organisation="another-council", name="Another Council")
+        )
+        db.session.add(LocalPlan(reference="another-local-plan", name="Another plan"))
+        db.session.commit()
+        try:
+            yield add
+        finally:
+            db.session.rollback()
+            for document in LocalPlanDocument.query.filter(
+                LocalPlanDocument.reference.in_(added)
+            ):
+                db.session.delete(document)
+            db.session.delete(db.session.get(LocalPlan, "another-local-plan"))
+            db.session.delete(db.session.get(Organisation, "another-council"))
+            db.session.commit()
+
+
+def _end_dates():
+    db.session.expire_all()
+    return {
+        document.reference: document.end_date
+        for document in LocalPlanDocument.query.order_by(LocalPlanDocument.reference)
+    }
+
+
+def test_dedupe_documents(app, documents):
+    from application.commands import dedupe_documents
+
+    both = ["somewhere-borough-council", "another-council"]
+    ended = datetime.date(2020, 1, 1)
+    with app.app_context():
+        documents("plan", ["somewhere-borough-council"])
+        documents("plan-copy", ["somewhere-borough-council"])
+        documents("plan-2", ["somewhere-borough-council"])
+        # not duplicates: other organisations, another plan or another url
+        documents("joint", both)
+        documents("joint-copy", both)
+        documents("other", ["somewhere-borough-council"], plan="another-local-plan")
+        documents("policies", [], document_url=f"{DOCUMENT_URL}?v=2")
+        # already ended, so neither kept nor ended again
+        documents("p", ["somewhere-borough-council"], end_date=ended)
+        db.session.commit()
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(dedupe_documents, ["--dry-run"])
+        assert "  keep    plan\n  end     plan-2\n  end     plan-copy" in result.output
+        assert "  keep    joint\n  end     joint-copy" in result.output
+        assert "would set end date for 3 duplicates of 2 documents" in result.output
+        assert all(
+            end_date in (None, ended) for end_date in _end_dates().values()
+        ), "a dry run changed documents"
+
+        result = runner.invoke(dedupe_documents)
+        assert "set end date for 3 duplicate documents" in result.output
+        today = datetime.date.today()
+        assert _end_dates() == {
+            "joint": None,
+            "joint-copy": today,
+            "other": None,
+            "p": ended,
+            "plan": None,
+            "plan-2": today,
+            "plan-copy": today,
+            "policies": None,
+        }
+
+
+def test_set_orgs(app, documents):
+    from application.commands import set_orgs
+
+    with app.app_context():
+        documents("no-organisations", [])
+        documents("own-organisation", ["another-council"])
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(set_orgs)
+
+        assert "Added 1 organisation links to 1 documents" in result.output
+        db.session.expire_all()
+        organisations = {
+            document.reference: [org.organisation for org in document.organisations]
+            for document in LocalPlanDocument.query
+        }
+        assert organisations == {
+            "no-organisations": ["somewhere-borough-council"],
+            "own-organisation": ["another-council"],
+        }
+
+
+def test_fix_duplicate_document_references(app, documents, count_queries):
+    from application.commands import (
+        _rename_duplicate_documents,
+        fix_duplicate_document_references,
+    )
+
+    with app.app_context():
+        documents("a-some-where-local-plan", [])
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(fix_duplicate_document_references)
+        assert "Renamed 0 documents sharing 0 references" in result.output
+
+        # the primary key on reference stops duplicates being made, so drop
+        # it for the length of a transaction that is rolled back
+        db.session.execute(
+            text(
+                """
+                ALTER TABLE local_plan_document
+                DROP CONSTRAINT local_plan_document_pkey CASCADE
+                """
+            )
+        )
+        try:
+            db.session.execute(
+                text(
+                    """
+                    INSERT INTO local_plan (reference, status, entry_date)
+                    VALUES
+                        ('b-c', 'FOR_REVIEW', CURRENT_DATE),
+                        ('c', 'FOR_REVIEW', CURRENT_DATE);
+                    INSERT INTO local_plan_document
+                        (reference, local_plan, status, entry_date)
+                    VALUES
+                        ('a', 'some-where-local-plan', 'FOR_REVIEW', CURRENT_DATE),
+                        ('a', 'b-c', 'FOR_REVIEW', CURRENT_DATE),
+                        ('a-b', 'some-where-local-plan', 'FOR_REVIEW', CURRENT_DATE),
+                        ('a-b', 'c', 'FOR_REVIEW', CURRENT_DATE);
+                    INSERT INTO document_organisation
+                        (local_plan_document_reference, organisation)
+                    VALUES ('a', 'somewhere-borough-council');
+                    """
+                )
+            )
+
+            with count_queries() as statements:
+                renames, organisation_rows = _rename_duplicate_documents()
+            # the duplicates, the references they could take and the renames,
+            # however many duplicates there are
+            assert len(statements) == 3
+
+            today = datetime.date.today().isoformat()
+            assert renames == [
+                ("a", "b-c", "a-b-c"),
+                # taken by a document, so the date is added
+                ("a", "some-where-local-plan", f"a-some-where-local-plan-{today}"),
+                # taken by the rename of a in plan b-c
+                ("a-b", "c", f"a-b-c-{today}"),
+                ("a-b", "some-where-local-plan", "a-b-some-where-local-plan"),
+            ]
+            # both documents that were a keep its organisation
+            assert organisation_rows == 3
+            linked = db.session.execute(
+                text(
+                    """
+                    SELECT local_plan_document_reference
+                    FROM document_organisation
+                    ORDER BY local_plan_document_reference
+                    """
+                )
+            ).scalars()
+            assert list(linked) == ["a-b-c", f"a-some-where-local-plan-{today}"]
+        finally:
+            db.session.rollback()
+
+
+def test_migrate_doc_types(
+    app, documents, supporting_types, count_queries, monkeypatch
+):
+    from application import commands
+
+    # chunks of two documents, so documents are changed in every chunk
+    monkeypatch.setattr(commands, "MIGRATE_BATCH_SIZE", 2)
+    types = {
+        "types-1": ["LOCAL_PLAN", "POLICIES_MAP"],
+        "types-2": ["local-plan"],
+        "types-3": ["FINANCIAL_VIABILITY_STUDY", "UNKNOWN_TYPE"],
+        "types-4": ["UNKNOWN_TYPE"],
+        "types-5": ["CORE_STRATEGY", "LOCAL_PLAN"],
+    }
+    with app.app_context():
+        for reference, document_types in types.items():
+            documents(reference, [], document_types=document_types)
+        db.session.commit()
+        runner = app.test_cli_runner()
+
+        result = runner.invoke(commands.migrate_doc_types, ["--dry-run"])
+        assert "No matching document type found for unknown-type (2 documents)" in (
+            result.output
+        )
+        assert (
+            "types-3: ['FINANCIAL_VIABILITY_STUDY', 'UNKNOWN_TYPE'] -> "
+            "['viability-assessment']" in result.output
+        )
+        assert "would update document types for 3 documents" in result.output
+
+        with count_queries() as statements:
+            result = runner.invoke(commands.migrate_doc_types)
+        assert "Updated document types for 3 documents" in result.output
+        assert len([s for s in statements if "UPDATE local_plan_document" in s]) == 3
+
+        db.session.expire_all()
+        assert {
+            document.reference: document.document_types
+            for document in LocalPlanDocument.query
+        } == {
+            "types-1": ["local-plan", "policies-map"],
+            "types-2": ["local-plan"],
+            "types-3": ["viability-assessment"],
+            # nothing it holds is a known type, so it is left as it is
+            "types-4": ["UNKNOWN_TYPE"],
+            "types-5": ["core-strategy", "local-plan"],
+        }
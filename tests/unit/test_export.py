@@ -0,0 +1,70 @@
+import csv
+import io
+
+from application.extensions import db
+from application.models import LocalPlanDocument, Status
+
+
+def test_document_export_filters_by_document_type(
+    app, client, test_data, supporting_types
+):
+    for reference, document_types in [
+        ("export-appraisal", ["sustainability-appraisal"]),
+        ("export-appraisal-and-map", ["sustainability-appraisal", "policies-map"]),
+        ("export-map", ["policies-map"]),
+    ]:
+        db.session.add(
+            LocalPlanDocument(
+                reference=reference,
+                name=reference,
+                local_plan="some-where-local-plan",
+                documentation_url="https://www.example.com/plan",
+                document_url=f"https://www.example.com/{reference}.pdf",
+                document_types=document_types,
+                status=Status.FOR_PLATFORM,
+            )
+        )
+    db.session.commit()
+
+    def exported(query_string=""):
+        response = client.get(
+            f"/export/local-plan-document.csv{query_string}",
+            base_url="https://127.0.0.1",
+        )
+        assert response.status_code == 200
+        return {
+            row["reference"]
+            for row in csv.DictReader(io.StringIO(response.text))
+            if row["reference"].startswith("export-")
+        }
+
+    try:
+        assert exported() == {
+            "export-appraisal",
+            "export-appraisal-and-map",
+            "export-map",
+        }
+        assert exported("?document-type=sustainability-appraisal") == {
+            "export-appraisal",
+            "export-appraisal-and-map",
+        }
+        assert exported(
+            "?document-type=sustainability-appraisal&document-type=policies-map"
+        ) == {"export-appraisal-and-map"}
+    finally:
+        LocalPlanDocument.query.filter(
+            LocalPlanDocument.reference.startswith("export-")
+        ).delete()
+        db.session.commit()
+
+
+def test_document_export_rejects_unknown_document_types(client, supporting_types):
+    response = client.get(
+        "/export/local-plan-document.csv?document-type=sustainability-appraisal"
+        "&document-type=not-a-type",
+        base_url="https://127.0.0.1",
+    )
+
+    assert response.status_code == 400
+    assert "not-a-type" in response.text
+    assert "sustainability-appraisal" not in response.text
@@ -0,0 +1,78 @@
+from application.extensions import db
+from application.models import LocalPlan, LocalPlanBoundary, Organisation, Status
+
+GEOMETRY = "MULTIPOLYGON (((0 51, 0 52, 1 52, 1 51, 0 51)))"
+
+
+def _selects_geography(statements):
+    return [s for s in statements if ".geometry" in s or ".geojson" in s]
+
+
+def test_geography_is_only_loaded_when_used(app, test_data, count_queries):
+    organisation = db.session.get(Organisation, "somewhere-borough-council")
+    organisation.geometry = GEOMETRY
+    organisation.geojson = {"type": "MultiPolygon", "coordinates": []}
+    boundary = LocalPlanBoundary(
+        reference="deferred-boundary",
+        geometry=GEOMETRY,
+        organisations=[organisation],
+    )
+    db.session.add(boundary)
+    db.session.commit()
+    try:
+        db.session.expire_all()
+        with count_queries() as statements:
+            boundaries = LocalPlanBoundary.query.all()
+            assert Organisation.query.all()
+        assert len(statements) == 2
+        assert not _selects_geography(statements)
+
+        with count_queries() as statements:
+            assert boundaries[0].organisations == [organisation]
+            assert organisation.geometry == GEOMETRY
+        assert len(_selects_geography(statements)) == 1
+
+        db.session.expire_all()
+        with count_queries() as statements:
+            boundary = (
+                LocalPlanBoundary.query.options(db.undefer(LocalPlanBoundary.geometry))
+                .filter(LocalPlanBoundary.reference == "deferred-boundary")
+                .one()
+            )
+            assert boundary.geometry == GEOMETRY
+        assert len(statements) == 1
+    finally:
+        organisation.geometry = organisation.geojson = None
+        boundary.organisations = []
+        db.session.delete(boundary)
+        db.session.commit()
+
+
+def test_boundary_export(app, client, test_data, count_queries):
+    plan = db.session.get(LocalPlan, "some-where-local-plan")
+    organisation = db.session.get(Organisation, "somewhere-borough-council")
+    plan.status = plan.boundary_status = Status.FOR_PLATFORM
+    plan.boundary = LocalPlanBoundary(
+        reference="exported-boundary",
+        geometry=GEOMETRY,
+        organisations=[organisation],
+    )
+    db.session.commit()
+    try:
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = client.get(
+                "/export/local-plan-boundary.csv", base_url="https://127.0.0.1"
+            )
+        assert response.status_code == 200
+        assert GEOMETRY in response.text
+        assert "somewhere-borough-council" in response.text
+        # plans with their boundaries, then the boundaries' organisations
+        assert len(statements) == 2
+    finally:
+        plan.status = plan.boundary_status = Status.FOR_REVIEW
+        boundary = plan.boundary
+        plan.boundary = None
+        boundary.organisations = []
+        db.session.delete(boundary)
+        db.session.commit()
@@ -0,0 +1,84 @@
+import json
+from urllib.parse import urlencode
+
+from application.http_client import HttpClient
+
+BODY = json.dumps({"records": [{"reference": "local-plan"}]}).encode()
+
+
+def _etag_route(headers):
+    if headers.get("If-None-Match") == '"v1"':
+        return 304, {}, b""
+    return 200, {"ETag": '"v1"', "Content-Type": "application/json"}, BODY
+
+
+def test_get_revalidates_cached_responses(http_server, tmp_path):
+    http_server.routes["/types.json"] = _etag_route
+    client = HttpClient(cache_dir=tmp_path)
+
+    first = client.get(http_server.url("/types.json"))
+    second = client.get(http_server.url("/types.json"))
+
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.json() == first.json() == json.loads(BODY)
+    assert second.headers["Content-Type"] == "application/json"
+    assert [headers.get("If-None-Match") for _, headers in http_server.requests] == [
+        None,
+        '"v1"',
+    ]
+
+
+def test_get_serves_fresh_responses_from_cache(http_server, tmp_path):
+    http_server.routes["/types.json"] = _etag_route
+
+    HttpClient(cache_dir=tmp_path).get(http_server.url("/types.json"))
+    resp = HttpClient(cache_dir=tmp_path, max_age=60).get(
+        http_server.url("/types.json")
+    )
+
+    assert resp.from_cache
+    assert resp.json() == json.loads(BODY)
+    assert len(http_server.requests) == 1
+
+
+def test_get_does_not_cache_errors(http_server, tmp_path):
+    http_server.routes["/missing.json"] = (404, {"ETag": '"v1"'}, b"")
+    client = HttpClient(cache_dir=tmp_path, retries=0)
+
+    assert client.get(http_server.url("/missing.json")).status_code == 404
+    assert client.get(http_server.url("/missing.json")).status_code == 404
+    assert [headers.get("If-None-Match") for _, headers in http_server.requests] == [
+        None,
+        None,
+    ]
+
+
+def test_datasette_table_fetches_pages(http_server):
+    rows = [{"organisation": f"org-{i}"} for i in range(5)]
+    count = {"sql": "select count(*) as count from [organisation]", "_shape": "array"}
+    http_server.routes[f"/digital-land.json?{urlencode(count)}"] = (
+        200,
+        {},
+        json.dumps([{"count": len(rows)}]).encode(),
+    )
+    for offset in range(0, len(rows), 2):
+        page = {
+            "sql": "select * from [organisation] order by rowid "
+            f"limit 2 offset {offset}",
+            "_shape": "array",
+        }
+        http_server.routes[f"/digital-land.json?{urlencode(page)}"] = (
+            200,
+            {},
+            json.dumps(rows[offset : offset + 2]).encode(),
+        )
+
+    client = HttpClient(pool_size=3)
+    result = client.datasette_table(
+        http_server.url("/digital-land"), "organisation", page_size=2
+    )
+
+    assert result == rows
+    # the count, then three pages
+    assert len(http_server.requests) == 4
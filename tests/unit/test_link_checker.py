@@ -0,0 +1,164 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from application.link_checker import LinkChecker
+
+DOCUMENT = b"%PDF-1.7 " + b"x" * 1000
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self._record("HEAD")
+        if self.path == "/no-head.pdf":
+            self._respond(405)
+        elif self.path == "/plan.pdf":
+            self._respond(200, {"Content-Length": str(len(DOCUMENT))})
+        else:
+            self._respond(404)
+
+    def do_GET(self):
+        self._record("GET")
+        if self.path in ("/no-head.pdf", "/plan.pdf"):
+            assert self.headers["Range"] == "bytes=0-0"
+            self.send_response(206)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Range", f"bytes 0-0/{len(DOCUMENT)}")
+            self.send_header("Content-Length", "1")
+            self.end_headers()
+            self.wfile.write(DOCUMENT[:1])
+        else:
+            self._respond(404)
+
+    def _record(self, method):
+        with self.server.lock:
+            self.server.requests.append((method, self.path))
+
+    def _respond(self, status, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/pdf; qs=0.9")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_check_with_head(server):
+    check = LinkChecker().check(server.url("/plan.pdf"))
+
+    assert check.ok
+    assert check.status_code == 200
+    assert check.content_type == "application/pdf"
+    assert check.size == len(DOCUMENT)
+    assert server.requests == [("HEAD", "/plan.pdf")]
+
+
+def test_check_falls_back_to_ranged_get(server):
+    check = LinkChecker().check(server.url("/no-head.pdf"))
+
+    assert check.ok
+    assert check.status_code == 206
+    assert check.size == len(DOCUMENT)
+    assert server.requests == [("HEAD", "/no-head.pdf"), ("GET", "/no-head.pdf")]
+
+
+def test_check_dead_link(server):
+    check = LinkChecker().check(server.url("/gone.pdf"))
+
+    assert not check.ok
+    assert check.status_code == 404
+    assert check.size is None
+
+
+def test_check_unreachable_host():
+    check = LinkChecker(retries=0, timeout=1).check("http://127.0.0.1:9/plan.pdf")
+
+    assert not check.ok
+    assert check.status_code is None
+    assert check.error
+
+
+def test_check_all(server):
+    urls = [server.url(path) for path in ["/plan.pdf", "/no-head.pdf", "/gone.pdf"]]
+
+    checks = {check.url: check for check in LinkChecker().check_all(urls)}
+
+    assert set(checks) == set(urls)
+    assert [checks[url].ok for url in urls] == [True, True, False]
+
+
+def test_check_document_urls_rechecks_only_stale_urls(app, test_data, server):
+    from application.commands import check_document_urls
+    from application.extensions import db
+    from application.models import LocalPlanDocument
+
+    with app.app_context():
+        for reference, path in [
+            ("live", "/plan.pdf"),
+            ("live-again", "/plan.pdf"),
+            ("dead", "/gone.pdf"),
+        ]:
+            db.session.add(
+                LocalPlanDocument(
+                    reference=f"url-check-{reference}",
+                    name=reference,
+                    local_plan="some-where-local-plan",
+                    document_url=server.url(path),
+                )
+            )
+        db.session.commit()
+
+    try:
+        runner = app.test_cli_runner()
+        result = runner.invoke(check_document_urls)
+        assert "Checking 2 document urls" in result.output
+
+        with app.app_context():
+            # a url is checked once and recorded on every document linking to it
+            for reference in ["url-check-live", "url-check-live-again"]:
+                live = db.session.get(LocalPlanDocument, reference)
+                assert live.url_status_code == 200
+                assert live.url_content_type == "application/pdf"
+                assert live.url_size == len(DOCUMENT)
+                assert live.url_checked_at is not None
+            dead = db.session.get(LocalPlanDocument, "url-check-dead")
+            assert dead.url_status_code == 404
+
+        result = runner.invoke(check_document_urls)
+        assert "Checking 0 document urls" in result.output
+
+        result = runner.invoke(check_document_urls, ["--max-age", "0"])
+        assert "Checking 2 document urls" in result.output
+    finally:
+        with app.app_context():
+            LocalPlanDocument.query.filter(
+                LocalPlanDocument.reference.startswith("url-check-")
+            ).delete()
+            db.session.commit()
@@ -0,0 +1,99 @@
+import pytest
+
+from application.link_extraction import BACKENDS, Anchor, iter_anchors
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Local plan</title>
+  <style>a { color: red; }</style>
+  <script>document.write('<a href="/script.pdf">not a link</a>');</script>
+</head>
+<body>
+  <nav><a href="/">Home</a> <a name="top">No href</a></nav>
+  <p>Read the <A HREF="/docs/local-plan.pdf">Local   Plan <b>2020&ndash;2040</b>
+    <!-- comment --> (PDF, 2MB)</a> or the
+    <a href='policies map.pdf' class="link">Policies&nbsp;map <span>[pdf]</span></a>.</p>
+  <a href>Empty</a>
+  <a href="/consultation.docx">Consultation <script>var x = 1;</script>response</a>
+  <a href="/unclosed.pdf">Unclosed
+</body>
+</html>
+"""
+
+STREAMING_BACKENDS = [name for name in BACKENDS if name != "bs4"]
+
+
+def _chunks(data, size):
+    return (data[i : i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("backend", STREAMING_BACKENDS)
+def test_backend_matches_beautifulsoup(backend):
+    content = PAGE.encode("utf-8")
+
+    assert list(iter_anchors(content, backend)) == list(iter_anchors(content, "bs4"))
+
+
+@pytest.mark.parametrize("backend", STREAMING_BACKENDS)
+def test_backend_handles_chunks_split_anywhere(backend):
+    content = PAGE.encode("utf-8")
+    expected = list(iter_anchors(content, "bs4"))
+
+    for size in [1, 7, 64]:
+        assert list(iter_anchors(_chunks(content, size), backend)) == expected
+
+
+def test_anchor_text():
+    anchors = list(iter_anchors(PAGE.encode("utf-8"), "html.parser"))
+
+    assert anchors[:4] == [
+        Anchor("/", "Home"),
+        Anchor("/docs/local-plan.pdf", "Local   Plan2020–2040(PDF, 2MB)"),
+        Anchor("policies map.pdf", "Policies\xa0map[pdf]"),
+        Anchor("", "Empty"),
+    ]
+    assert Anchor("/consultation.docx", "Consultationresponse") in anchors
+
+
+@pytest.mark.parametrize(
+    "backend, outer_text",
+    # libxml2 closes an open anchor when another starts, as browsers do
+    [("html.parser", "Outerinnertail"), ("bs4", "Outerinnertail"), ("lxml", "Outer")],
+)
+def test_nested_anchors(backend, outer_text):
+    if backend not in BACKENDS:
+        pytest.skip(f"{backend} is not installed")
+    content = b'<a href="/outer.pdf">Outer <a href="/inner.pdf">inner</a> tail</a>'
+
+    assert list(iter_anchors(content, backend)) == [
+        Anchor("/outer.pdf", outer_text),
+        Anchor("/inner.pdf", "inner"),
+    ]
+
+
+def test_anchors_are_yielded_as_the_page_streams():
+    chunks = iter([b'<a href="/one.pdf">One</a>', b'<a href="/two.pdf">Two</a>'])
+    anchors = iter_anchors(chunks, "html.parser")
+
+    assert next(anchors) == Anchor("/one.pdf", "One")
+    # the second chunk has not been read yet
+    assert next(chunks) == b'<a href="/two.pdf">Two</a>'
+
+
+@pytest.mark.parametrize(
+    "content, text",
+    [
+        ("<a href='/a.pdf'>Caf\xe9</a>".encode("utf-8"), "Caf\xe9"),
+        ("<a href='/a.pdf'>Caf\xe9</a>".encode("windows-1252"), "Caf\xe9"),
+        (
+            '<meta charset="iso-8859-1"><a href="/a.pdf">Caf\xe9</a>'.encode("latin-1"),
+            "Caf\xe9",
+        ),
+        ("\ufeff<a href='/a.pdf'>Caf\xe9</a>".encode("utf-8"), "Caf\xe9"),
+    ],
+)
+def test_encodings(content, text):
+    for backend in BACKENDS:
+        assert list(iter_anchors(content, backend)) == [Anchor("/a.pdf", text)]
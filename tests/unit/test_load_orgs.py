@@ -0,0 +1,123 @@
+import pytest
+
+from application.extensions import db
+from application.models import CommandCheckpoint, Organisation
+
+
+def _record(organisation, name, dataset="local-authority", end_date=""):
+    return {
+        "organisation": organisation,
+        "name": name,
+        "dataset": dataset,
+        "entry_date": "2020-01-01",
+        "end_date": end_date,
+        "statistical_geography": "E07000001",
+        "website": "",
+        "wikidata": "Q1",
+    }
+
+
+@pytest.fixture
+def datasette_organisations(app, monkeypatch):
+    from application import commands
+
+    records = []
+    monkeypatch.setattr(commands, "_fetch_organisations", lambda: records)
+    yield records
+    with app.app_context():
+        Organisation.query.filter(
+            Organisation.organisation.startswith("local-authority:T")
+        ).delete()
+        CommandCheckpoint.query.filter_by(command="load-orgs").delete()
+        db.session.commit()
+
+
+def test_load_orgs_upserts_planning_authorities(app, datasette_organisations):
+    from application.commands import load_orgs
+
+    datasette_organisations.extend(
+        [
+            _record("local-authority:TAA", "Council A"),
+            _record("local-authority:TBB", "Council B"),
+            _record("local-authority:TCC", "Council C", end_date="2019-04-01"),
+            _record("government-organisation:T1", "A department", "government"),
+            # a later page repeating an organisation wins
+            _record("local-authority:TAA", "Council A renamed"),
+        ]
+    )
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(load_orgs)
+    assert (
+        "Organisations: 2 inserted, 0 updated, 0 unchanged, 2 skipped" in result.output
+    )
+    assert "skipped 1 end dated" in result.output
+    assert "skipped 1 not a planning authority" in result.output
+
+    datasette_organisations[1]["name"] = "Council B renamed"
+    result = runner.invoke(load_orgs)
+    assert "Organisations: 0 inserted, 1 updated, 1 unchanged" in result.output
+
+    with app.app_context():
+        organisations = Organisation.query.filter(
+            Organisation.organisation.startswith("local-authority:T")
+        ).order_by(Organisation.organisation)
+        assert [(org.organisation, org.name) for org in organisations] == [
+            ("local-authority:TAA", "Council A renamed"),
+            ("local-authority:TBB", "Council B renamed"),
+        ]
+        assert all(org.statistical_geography == "E07000001" for org in organisations)
+
+
+def test_load_orgs_dry_run(app, datasette_organisations):
+    from application.commands import load_orgs
+
+    datasette_organisations.append(_record("local-authority:TAA", "Council A"))
+    runner = app.test_cli_runner()
+    runner.invoke(load_orgs)
+
+    datasette_organisations[0]["name"] = "Council A renamed"
+    datasette_organisations.append(_record("local-authority:TBB", "Council B"))
+    result = runner.invoke(load_orgs, ["--dry-run"])
+
+    assert "Dry run: Organisations: 1 new, 1 changed" in result.output
+    assert "  + local-authority:TBB" in result.output
+    assert "  ~ local-authority:TAA" in result.output
+    with app.app_context():
+        assert db.session.get(Organisation, "local-authority:TAA").name == "Council A"
+        assert db.session.get(Organisation, "local-authority:TBB") is None
+
+
+def test_upsert_rows_only_rewrites_changed_hashes(app, datasette_organisations):
+    from application.commands import _upsert_rows
+
+    def row(organisation, name, content_hash):
+        return {
+            "organisation": organisation,
+            "name": name,
+            "entry_date": "2020-01-01",
+            "content_hash": content_hash,
+        }
+
+    def upsert(*rows):
+        return _upsert_rows(
+            Organisation.__table__, "organisation", list(rows), update_columns=["name"]
+        )
+
+    with app.app_context():
+        a = row("local-authority:TAA", "Council A", "a1")
+        b = row("local-authority:TBB", "Council B", "b1")
+        assert upsert(a, b) == (2, 0)
+        assert upsert(a, b) == (0, 0)
+
+        # a row is rewritten when its hash changes, not when its values do
+        assert upsert(
+            row("local-authority:TAA", "Council A renamed", "a2"),
+            row("local-authority:TBB", "Council B renamed", "b1"),
+        ) == (0, 1)
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(Organisation, "local-authority:TAA").name == (
+            "Council A renamed"
+        )
+        assert db.session.get(Organisation, "local-authority:TBB").name == "Council B"
@@ -0,0 +1,124 @@
+from flask import g
+
+from application.extensions import db
+from application.models import (
+    LocalPlan,
+    LocalPlanBoundary,
+    LocalPlanDocument,
+    LocalPlanDocumentType,
+    LocalPlanTimetable,
+    Organisation,
+    Status,
+)
+
+BOUNDARY = {
+    "type": "FeatureCollection",
+    "features": [
+        {
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[0, 51], [0, 52], [1, 52], [1, 51], [0, 51]]],
+            },
+        }
+    ],
+}
+
+
+def _add_documents(plan, count, document_types):
+    organisation = db.session.get(Organisation, "somewhere-borough-council")
+    for i in range(len(plan.documents), len(plan.documents) + count):
+        document = LocalPlanDocument(
+            reference=f"plan-page-document-{i}",
+            name=f"Document {i}",
+            document_types=document_types,
+        )
+        document.organisations.append(organisation)
+        plan.documents.append(document)
+    db.session.commit()
+
+
+def _get_plan_page(client, count_queries):
+    # the test shares one session and g with the requests, start each afresh
+    db.session.expire_all()
+    g.pop("reference_data_versions", None)
+    with count_queries() as statements:
+        response = client.get(
+            "/local-plan/some-where-local-plan", base_url="https://127.0.0.1"
+        )
+    assert response.status_code == 200
+    return response, statements
+
+
+def test_plan_page_queries_do_not_grow_with_documents(
+    app, client, test_data, count_queries
+):
+    types = LocalPlanDocumentType.query.order_by(LocalPlanDocumentType.name).all()
+    names = f"{types[1].name}, {types[3].name}"
+    plan = db.session.get(LocalPlan, "some-where-local-plan")
+    try:
+        _add_documents(plan, 1, [types[3].reference, types[1].reference])
+        # read reference data into the cache first
+        _get_plan_page(client, count_queries)
+        response, one_document = _get_plan_page(client, count_queries)
+        assert response.text.count(names) == 1
+
+        _add_documents(plan, 10, [types[3].reference, types[1].reference])
+        response, many_documents = _get_plan_page(client, count_queries)
+        assert response.text.count(names) == 11
+
+        assert len(many_documents) == len(one_document)
+    finally:
+        for document in list(plan.documents):
+            db.session.delete(document)
+        db.session.commit()
+
+
+def test_plan_page_loads_everything_up_front(app, client, test_data, count_queries):
+    types = LocalPlanDocumentType.query.order_by(LocalPlanDocumentType.name).all()
+    organisation = db.session.get(Organisation, "somewhere-borough-council")
+    plan = db.session.get(LocalPlan, "some-where-local-plan")
+    plan.boundary = LocalPlanBoundary(
+        reference="plan-page-boundary",
+        geometry="POLYGON ((0 51, 0 52, 1 52, 1 51, 0 51))",
+        geojson=BOUNDARY,
+        organisations=[organisation],
+    )
+    for year in range(2019, 2024):
+        plan.timetable.append(
+            LocalPlanTimetable(
+                reference=f"plan-page-event-{year}",
+                event_date=str(year),
+                local_plan_event="plan-adopted",
+                organisation=organisation.organisation,
+            )
+        )
+    try:
+        _add_documents(plan, 5, [types[0].reference])
+        _get_plan_page(client, count_queries)
+
+        response, statements = _get_plan_page(client, count_queries)
+        assert response.text.count("Somewhere Borough Council") == 1 + 5 + 5
+        assert "plan-page-boundary" in response.text
+        # plan and boundary, organisations, documents and their organisations,
+        # timetable with event types and organisations, the boundary's geojson
+        # and reference data versions
+        assert len(statements) == 7
+        assert not [s for s in statements if "local_plan_boundary.geometry" in s]
+
+        plan.status = Status.NOT_FOR_PLATFORM
+        db.session.commit()
+        response, statements = _get_plan_page(client, count_queries)
+        assert len(statements) == 6
+        assert not [s for s in statements if "local_plan_boundary.geojson" in s]
+    finally:
+        plan.status = Status.FOR_REVIEW
+        for event in list(plan.timetable):
+            db.session.delete(event)
+        for document in list(plan.documents):
+            db.session.delete(document)
+        boundary = plan.boundary
+        plan.boundary = None
+        db.session.delete(boundary)
+        db.session.commit()
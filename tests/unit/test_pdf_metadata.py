@@ -0,0 +1,311 @@
+import re
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from application.pdf_metadata import PdfMetadataReader
+
+TITLE = b"Local Plan 2020 \\(Submission\\) to 2040"
+
+
+def _pdf(pages=3, padding=0, compressed=False, linearised=False, count=None):
+    """A small PDF, optionally with its objects in an object stream and a
+    cross reference stream, padded out with a large content stream. count
+    replaces the page tree's /Count value."""
+    kids = " ".join(f"{5 + i} 0 R" for i in range(pages)).encode()
+    count = count or b"%d" % pages
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [" + kids + b"] /Count " + count + b" >>",
+        3: b"<< /Title (" + TITLE + b") /Producer (tests) >>",
+    }
+    for i in range(pages):
+        objects[5 + i] = b"<< /Type /Page /Parent 2 0 R /Contents 4 0 R >>"
+    padding_stream = b"<< /Length %d >>\nstream\n%s\nendstream" % (
+        padding,
+        b"x" * padding,
+    )
+
+    out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    if linearised:
+        offsets[len(objects) + pages + 10] = len(out)
+        out += b"%d 0 obj\n<< /Linearized 1 /L 0000000000 /N %d >>\nendobj\n" % (
+            len(objects) + pages + 10,
+            pages,
+        )
+        # the catalog is left out to show the page count comes from /N
+        del objects[1]
+
+    if compressed:
+        header, body = b"", b""
+        for number, value in objects.items():
+            header += b"%d %d " % (number, len(body))
+            body += value + b"\n"
+        stream = zlib.compress(header + body)
+        objects = {
+            20: b"<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode "
+            b"/Length %d >>\nstream\n%s\nendstream"
+            % (len(objects), len(header), len(stream), stream)
+        }
+    objects[4] = padding_stream
+
+    compressed_numbers = (
+        [] if not compressed else [1, 2, 3] + [5 + i for i in range(pages)]
+    )
+    for number, value in objects.items():
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, value)
+
+    size = max([*offsets, *compressed_numbers, 20]) + 1
+    if compressed:
+        rows, previous = b"", bytes(7)
+        offsets[21] = len(out)
+        for number in range(size + 1):
+            if number in offsets:
+                row = b"\x01" + offsets[number].to_bytes(4, "big") + b"\x00\x00"
+            elif number in compressed_numbers:
+                index = compressed_numbers.index(number) - (1 if linearised else 0)
+                row = b"\x02" + (20).to_bytes(4, "big") + index.to_bytes(2, "big")
+            else:
+                row = bytes(7)
+            rows += b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, previous))
+            previous = row
+        stream = zlib.compress(rows)
+        xref = len(out)
+        out += (
+            b"21 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Info 3 0 R "
+            b"/Filter /FlateDecode /DecodeParms << /Columns 7 /Predictor 12 >> "
+            b"/Length %d >>\nstream\n%s\nendstream\nendobj\n"
+            % (size + 1, len(stream), stream)
+        )
+    else:
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+        for number in range(1, size):
+            if number in offsets:
+                out += b"%010d 00000 n \n" % offsets[number]
+            else:
+                out += b"0000000000 65535 f \n"
+        out += b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\n" % size
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+
+    if linearised:
+        out = out.replace(b"/L 0000000000", b"/L %010d" % len(out))
+    return bytes(out)
+
+
+DOCUMENTS = {
+    "/plan.pdf": _pdf(pages=12, padding=2 * 1024 * 1024),
+    "/compressed.pdf": _pdf(pages=40, padding=2 * 1024 * 1024, compressed=True),
+    "/linearised.pdf": _pdf(pages=7, linearised=True),
+    "/no-ranges.pdf": _pdf(pages=2),
+    "/page.html": b"<html><body>Not a PDF</body></html>",
+    # /Count refers to an object that is not in the file
+    "/dangling.pdf": _pdf(pages=2, count=b"99 0 R"),
+}
+
+
+# paths that answer with an error status instead of their document
+STATUSES = {"/unavailable.pdf": 503}
+
+
+class RangeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        content = DOCUMENTS.get(self.path)
+        if content is None or self.path in STATUSES:
+            self.send_response(STATUSES.get(self.path, 404))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        match = re.match(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match is None or self.path == "/no-ranges.pdf":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self._write(content)
+            return
+
+        first, last = match.groups()
+        if not first:
+            start, end = max(len(content) - int(last), 0), len(content) - 1
+        else:
+            start = int(first)
+            end = min(int(last), len(content) - 1) if last else len(content) - 1
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self._write(content[start : end + 1])
+
+    def _write(self, data):
+        try:
+            self.wfile.write(data)
+        except ConnectionError:
+            return
+        with self.server.lock:
+            self.server.bytes_sent += len(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = RangeServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_reads_metadata_from_xref_table(server):
+    metadata = PdfMetadataReader().read(server.url("/plan.pdf"))
+
+    assert metadata.error is None
+    assert metadata.page_count == 12
+    assert metadata.title == "Local Plan 2020 (Submission) to 2040"
+    assert metadata.size == len(DOCUMENTS["/plan.pdf"])
+    assert server.bytes_sent < 64 * 1024
+
+
+def test_reads_metadata_from_xref_and_object_streams(server):
+    metadata = PdfMetadataReader().read(server.url("/compressed.pdf"))
+
+    assert metadata.error is None
+    assert metadata.page_count == 40
+    assert metadata.title == "Local Plan 2020 (Submission) to 2040"
+    assert metadata.size == len(DOCUMENTS["/compressed.pdf"])
+    assert metadata.bytes_read == server.bytes_sent < 64 * 1024
+
+
+def test_page_count_from_linearisation_dictionary(server):
+    metadata = PdfMetadataReader().read(server.url("/linearised.pdf"))
+
+    assert metadata.error is None
+    assert metadata.page_count == 7
+    assert metadata.title == "Local Plan 2020 (Submission) to 2040"
+
+
+def test_server_without_range_support(server):
+    metadata = PdfMetadataReader().read(server.url("/no-ranges.pdf"))
+
+    assert metadata.error == "server does not support range requests"
+    assert metadata.page_count is None
+    assert metadata.size == len(DOCUMENTS["/no-ranges.pdf"])
+
+
+def test_not_a_pdf(server):
+    urls = [server.url("/page.html"), server.url("/missing.pdf")]
+
+    results = {
+        metadata.url: metadata for metadata in PdfMetadataReader().read_all(urls)
+    }
+
+    assert results[urls[0]].error == "not a PDF"
+    assert "404" in results[urls[1]].error
+
+
+def test_malformed_pdf_fails_only_that_document(server):
+    urls = [server.url("/dangling.pdf"), server.url("/plan.pdf")]
+
+    results = {
+        metadata.url: metadata for metadata in PdfMetadataReader().read_all(urls)
+    }
+
+    assert results[urls[0]].error
+    assert results[urls[0]].page_count is None
+    assert results[urls[0]].size == len(DOCUMENTS["/dangling.pdf"])
+    assert results[urls[1]].page_count == 12
+
+
+def test_document_metadata_command(app, test_data, server, monkeypatch):
+    from application.commands import document_metadata
+    from application.extensions import db
+    from application.models import LocalPlanDocument
+
+    paths = {
+        "pdf-metadata": "/compressed.pdf",
+        "pdf-metadata-missing": "/missing.pdf",
+        "pdf-metadata-no-ranges": "/no-ranges.pdf",
+        "pdf-metadata-dangling": "/dangling.pdf",
+        "pdf-metadata-unavailable": "/unavailable.pdf",
+    }
+    with app.app_context():
+        for reference, path in paths.items():
+            db.session.add(
+                LocalPlanDocument(
+                    reference=reference,
+                    name="Plan",
+                    local_plan="some-where-local-plan",
+                    document_url=server.url(path),
+                )
+            )
+        db.session.commit()
+
+    try:
+        runner = app.test_cli_runner()
+        result = runner.invoke(document_metadata)
+        assert "Reading metadata of 5 documents" in result.output
+        assert "4 errors" in result.output
+
+        with app.app_context():
+            document = db.session.get(LocalPlanDocument, "pdf-metadata")
+            assert document.page_count == 40
+            assert document.file_size == len(DOCUMENTS["/compressed.pdf"])
+            assert document.pdf_title == "Local Plan 2020 (Submission) to 2040"
+            assert document.metadata_error is None
+            assert document.metadata_checked_at is not None
+
+            # failures a retry won't change are recorded with their error
+            missing = db.session.get(LocalPlanDocument, "pdf-metadata-missing")
+            assert "404" in missing.metadata_error
+            assert missing.metadata_checked_at is not None
+            dangling = db.session.get(LocalPlanDocument, "pdf-metadata-dangling")
+            assert dangling.page_count is None
+            assert dangling.metadata_error
+            assert dangling.metadata_checked_at is not None
+            # with the size when the server gave it
+            no_ranges = db.session.get(LocalPlanDocument, "pdf-metadata-no-ranges")
+            assert no_ranges.page_count is None
+            assert no_ranges.file_size == len(DOCUMENTS["/no-ranges.pdf"])
+            assert no_ranges.metadata_error == "server does not support range requests"
+
+            # and those that may pass are left to read again
+            unavailable = db.session.get(LocalPlanDocument, "pdf-metadata-unavailable")
+            assert unavailable.metadata_error is None
+            assert unavailable.metadata_checked_at is None
+
+        result = runner.invoke(document_metadata)
+        assert "Reading metadata of 1 documents" in result.output
+
+        # a document read before keeps its metadata if a refresh can't reach it
+        monkeypatch.setitem(STATUSES, "/compressed.pdf", 503)
+        result = runner.invoke(document_metadata, ["--refresh"])
+        assert "5 errors" in result.output
+        with app.app_context():
+            document = db.session.get(LocalPlanDocument, "pdf-metadata")
+            assert document.page_count == 40
+            assert document.metadata_error is None
+    finally:
+        with app.app_context():
+            LocalPlanDocument.query.filter(
+                LocalPlanDocument.reference.startswith("pdf-metadata")
+            ).delete()
+            db.session.commit()
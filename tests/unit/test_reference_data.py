@@ -0,0 +1,204 @@
+import json
+
+import pytest
+from flask import g
+from sqlalchemy import update
+
+from application import reference_data
+from application.extensions import db
+from application.models import (
+    LocalPlanDocument,
+    LocalPlanDocumentType,
+    LocalPlanEventType,
+    ReferenceDataSync,
+)
+
+
+def _next_request():
+    # pytest-flask keeps one request context for the whole test
+    g.pop("reference_data_versions", None)
+
+
+def test_reference_data_is_read_once_a_request(app, supporting_types, count_queries):
+    _next_request()
+    choices = reference_data.choices(reference_data.DOCUMENT_TYPES)
+    assert len(choices) == LocalPlanDocumentType.query.count()
+    assert choices == sorted(choices, key=lambda choice: choice[1])
+
+    with count_queries() as statements:
+        assert reference_data.choices(reference_data.DOCUMENT_TYPES) == choices
+        adopted = reference_data.get(reference_data.EVENT_TYPES, "plan-adopted")
+        assert reference_data.get(reference_data.EVENT_TYPES, "plan-adopted") == (
+            adopted
+        )
+    # only the event types, read the first time they are used
+    assert len(statements) <= 1
+
+    _next_request()
+    with count_queries() as statements:
+        assert reference_data.choices(reference_data.DOCUMENT_TYPES) == choices
+    # only the versions
+    assert len(statements) == 1
+
+
+def test_a_new_version_is_reloaded(app, supporting_types):
+    _next_request()
+    event_type = db.session.get(LocalPlanEventType, "plan-adopted")
+    name = event_type.name
+    try:
+        assert reference_data.get(reference_data.EVENT_TYPES, "plan-adopted").name == (
+            name
+        )
+        event_type.name = "Adopted"
+        db.session.commit()
+        _next_request()
+        assert reference_data.get(reference_data.EVENT_TYPES, "plan-adopted").name == (
+            name
+        )
+
+        reference_data.invalidate(reference_data.EVENT_TYPES)
+        db.session.commit()
+        assert (
+            reference_data.get(reference_data.EVENT_TYPES, "plan-adopted").name
+            == "Adopted"
+        )
+
+        # a command in another process writes a new version
+        event_type.name = name
+        db.session.execute(
+            update(ReferenceDataSync)
+            .where(ReferenceDataSync.dataset == reference_data.EVENT_TYPES)
+            .values(version="another")
+        )
+        db.session.commit()
+        assert (
+            reference_data.get(reference_data.EVENT_TYPES, "plan-adopted").name
+            == "Adopted"
+        )
+        _next_request()
+        assert reference_data.get(reference_data.EVENT_TYPES, "plan-adopted").name == (
+            name
+        )
+    finally:
+        event_type.name = name
+        reference_data.invalidate(reference_data.EVENT_TYPES)
+        db.session.commit()
+
+
+def test_document_type_names(app, supporting_types):
+    types = LocalPlanDocumentType.query.order_by(LocalPlanDocumentType.name).all()
+    document = LocalPlanDocument(
+        document_types=[types[2].reference, types[0].reference, "unknown"]
+    )
+
+    assert [document_type.name for document_type in document.get_document_types()] == [
+        types[0].name,
+        types[2].name,
+    ]
+    assert LocalPlanDocument().get_document_types() == ()
+
+
+def test_sync_reference_data_skips_unchanged_data(
+    app, supporting_types, http_server, monkeypatch
+):
+    from application import commands
+
+    datasets = list(commands.REFERENCE_DATASETS)
+    for dataset in datasets:
+        model, _, bundled = commands.REFERENCE_DATASETS[dataset]
+        records = [
+            {"reference": row.reference, "name": row.name}
+            for row in model.query.order_by(model.reference)
+        ]
+        body = json.dumps({"records": records}).encode()
+
+        def respond(headers, body=body):
+            if headers.get("If-None-Match") == '"v1"':
+                return 304, {"ETag": '"v1"'}, b""
+            return 200, {"ETag": '"v1"', "Content-Type": "application/json"}, body
+
+        http_server.routes[f"/{dataset}.json"] = respond
+        monkeypatch.setitem(
+            commands.REFERENCE_DATASETS,
+            dataset,
+            (model, http_server.url(f"/{dataset}.json"), bundled),
+        )
+
+    def versions():
+        db.session.expire_all()
+        return {
+            dataset: db.session.get(ReferenceDataSync, dataset).version
+            for dataset in datasets
+        }
+
+    runner = app.test_cli_runner()
+    try:
+        result = runner.invoke(commands.sync_reference_data, ["--force"])
+        assert result.exit_code == 0, result.output
+        synced = versions()
+
+        # checked within max age, upstream is not asked
+        result = runner.invoke(commands.sync_reference_data)
+        assert "skipping" in result.output
+        assert len(http_server.requests) == 2
+
+        # asked with the stored ETag and not modified, nothing is written
+        result = runner.invoke(commands.sync_reference_data, ["--max-age", "0"])
+        assert result.output.count("not modified upstream") == 2
+        assert [headers.get("If-None-Match") for _, headers in http_server.requests][
+            2:
+        ] == ['"v1"', '"v1"']
+        assert versions() == synced
+
+        # fetched again but unchanged, the version is kept so nothing reloads
+        http_server.routes = {
+            path: (200, {"Content-Type": "application/json"}, route({})[2])
+            for path, route in http_server.routes.items()
+        }
+        result = runner.invoke(commands.sync_reference_data, ["--max-age", "0"])
+        assert result.output.count("0 inserted, 0 updated") == 2
+        assert versions() == synced
+    finally:
+        for dataset in datasets:
+            sync = db.session.get(ReferenceDataSync, dataset)
+            sync.source = sync.etag = sync.last_modified = None
+            sync.checked_at = sync.synced_at = None
+        db.session.commit()
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"<html>Service unavailable</html>", b'{"rows": []}', b'{"records": ["a"]}'],
+)
+def test_sync_reference_data_keeps_data_when_upstream_sends_junk(
+    app, supporting_types, http_server, monkeypatch, body
+):
+    from application import commands
+
+    datasets = list(commands.REFERENCE_DATASETS)
+    held = {}
+    for dataset in datasets:
+        model, _, bundled = commands.REFERENCE_DATASETS[dataset]
+        held[dataset] = model.query.count()
+        http_server.routes[f"/{dataset}.json"] = (
+            200,
+            {"Content-Type": "application/json"},
+            body,
+        )
+        monkeypatch.setitem(
+            commands.REFERENCE_DATASETS,
+            dataset,
+            (model, http_server.url(f"/{dataset}.json"), bundled),
+        )
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(commands.sync_reference_data, ["--force"])
+
+    assert result.exit_code == 0, result.output
+    assert result.output.count("could not fetch") == 2
+    for dataset in datasets:
+        model = commands.REFERENCE_DATASETS[dataset][0]
+        assert f"{dataset}: keeping the {held[dataset]} rows held" in result.output
+        assert model.query.count() == held[dataset]
+        sync = db.session.get(ReferenceDataSync, dataset)
+        assert sync.checked_at is None
@@ -0,0 +1,75 @@
+import pytest
+
+from application.extensions import db
+from application.models import CommandCheckpoint, Organisation
+from application.runs import COMPLETED, FAILED, CommandRun
+
+ITEMS = ["run-d", "run-b", "run-a", "run-c"]
+
+
+@pytest.fixture
+def run_organisations(app):
+    with app.app_context():
+        yield
+        db.session.rollback()
+        Organisation.query.filter(Organisation.organisation.startswith("run-")).delete()
+        CommandCheckpoint.query.filter_by(command="test-run").delete()
+        db.session.commit()
+
+
+def _run(fail_at=None, restart=False):
+    """Add an organisation per item, failing before fail_at is committed"""
+    processed = []
+    with CommandRun("test-run", restart=restart) as run:
+        for item in run.pending(ITEMS, key=lambda item: item):
+            db.session.add(Organisation(organisation=item, name=item))
+            if item == fail_at:
+                raise RuntimeError(f"failed at {item}")
+            processed.append(item)
+            run.advance(item)
+    return processed
+
+
+def _held():
+    return [
+        org.organisation
+        for org in Organisation.query.filter(
+            Organisation.organisation.startswith("run-")
+        ).order_by(Organisation.organisation)
+    ]
+
+
+def test_command_run_resumes_after_checkpoint(run_organisations, capsys):
+    with pytest.raises(RuntimeError):
+        _run(fail_at="run-c")
+
+    checkpoint = db.session.get(CommandCheckpoint, "test-run")
+    assert (checkpoint.status, checkpoint.position) == (FAILED, "run-b")
+    assert (checkpoint.processed, checkpoint.total) == (2, 4)
+    # the work for the failed item was rolled back with it
+    assert _held() == ["run-a", "run-b"]
+
+    assert _run() == ["run-c", "run-d"]
+    assert "test-run: resuming after run-b (2 already processed)" in (
+        capsys.readouterr().out
+    )
+    checkpoint = db.session.get(CommandCheckpoint, "test-run")
+    assert (checkpoint.status, checkpoint.position) == (COMPLETED, "run-d")
+    assert checkpoint.processed == 4
+    assert checkpoint.completed_at is not None
+    assert _held() == ["run-a", "run-b", "run-c", "run-d"]
+
+    # a completed run starts again from the beginning
+    Organisation.query.filter(Organisation.organisation.startswith("run-")).delete()
+    db.session.commit()
+    assert _run() == ["run-a", "run-b", "run-c", "run-d"]
+
+
+def test_command_run_restart_ignores_checkpoint(run_organisations):
+    with pytest.raises(RuntimeError):
+        _run(fail_at="run-c")
+    Organisation.query.filter(Organisation.organisation.startswith("run-")).delete()
+    db.session.commit()
+
+    assert _run(restart=True) == ["run-a", "run-b", "run-c", "run-d"]
+    assert db.session.get(CommandCheckpoint, "test-run").processed == 4
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from application.snapshots import (
+    SnapshotError,
+    SnapshotManager,
+    verify_dump,
+    write_checksum,
+)
+
+
+@pytest.fixture
+def snapshots(app):
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    manager = SnapshotManager(url.set(database="local_plans_snapshot_test"))
+    yield manager
+    for name in manager.templates() + [manager.database]:
+        manager._drop(name)
+    manager.engine.dispose()
+
+
+def _build(rows):
+    built = []
+
+    def build(database_url):
+        engine = create_engine(database_url)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE plan (reference text)"))
+            for row in rows:
+                conn.execute(text("INSERT INTO plan VALUES (:row)"), {"row": row})
+        engine.dispose()
+        built.append(database_url)
+
+    return build, built
+
+
+def _references(manager):
+    engine = create_engine(manager.database_url(manager.database))
+    with engine.connect() as conn:
+        references = conn.execute(text("SELECT reference FROM plan")).scalars().all()
+    engine.dispose()
+    return references
+
+
+def test_database_is_restored_from_template(snapshots):
+    build, built = _build(["a-plan"])
+    template = snapshots.ensure_template("1" * 64, build)
+    assert len(built) == 1
+    assert snapshots.templates() == [template]
+
+    snapshots.create_from_template(template)
+    assert _references(snapshots) == ["a-plan"]
+
+    # a working copy changed and restored again comes back as the template
+    engine = create_engine(snapshots.database_url(snapshots.database))
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM plan"))
+    engine.dispose()
+    assert snapshots.ensure_template("1" * 64, build) == template
+    assert len(built) == 1
+    snapshots.create_from_template(template)
+    assert _references(snapshots) == ["a-plan"]
+
+
+def test_template_is_rebuilt_when_the_checksum_changes(snapshots):
+    build, _ = _build(["a-plan"])
+    old = snapshots.ensure_template("1" * 64, build)
+
+    build, built = _build(["another-plan"])
+    template = snapshots.ensure_template("2" * 64, build)
+    assert len(built) == 1
+    assert template != old
+    assert snapshots.templates() == [template]
+
+    snapshots.create_from_template(template)
+    assert _references(snapshots) == ["another-plan"]
+
+
+def test_failed_build_leaves_no_template(snapshots):
+    def build(database_url):
+        raise SnapshotError("pg_restore failed")
+
+    with pytest.raises(SnapshotError):
+        snapshots.ensure_template("1" * 64, build)
+    assert snapshots.templates() == []
+    with snapshots.engine.connect() as conn:
+        databases = conn.execute(text("SELECT datname FROM pg_database")).scalars()
+        assert not [name for name in databases if "snapshot_test" in name]
+
+
+def test_dump_not_matching_its_checksum_is_not_restored(snapshots, tmp_path):
+    dump_path = tmp_path / "latest.dump"
+    dump_path.write_bytes(b"a complete dump")
+    checksum = write_checksum(dump_path)
+    assert verify_dump(dump_path) == checksum
+
+    # a download that stopped part way
+    dump_path.write_bytes(b"a comp")
+    with pytest.raises(SnapshotError, match="may be incomplete"):
+        snapshots.restore(dump_path)
+    assert snapshots.templates() == []
@@ -0,0 +1,148 @@
+import pytest
+from sqlalchemy import func, literal, select
+
+from application.extensions import db
+from application.models import LocalPlan, Status
+from application.staging import diff_staged, merge_staged, stage_csv
+
+PLANS_CSV = """reference,name,description,period-start-date,adopted-date,
+staging-plan-1,Plan one,,2020,14/12/2017,x
+staging-plan-2,Plan two,First,2021,,
+staging-plan-2,Plan two,Second,2022,,
+,No reference,,,,
+staging-plan-3,Plan three,,2023,,
+"""
+
+PLANS = LocalPlan.__table__
+
+
+@pytest.fixture
+def staged_plans(app, tmp_path):
+    """data/local-plan.csv style rows staged in a transaction that is rolled back"""
+    path = tmp_path / "local-plan.csv"
+    path.write_text(PLANS_CSV)
+    with app.app_context():
+        db.session.add(
+            LocalPlan(
+                reference="staging-plan-1",
+                name="Held plan",
+                description="Held description",
+                period_start_date=2019,
+            )
+        )
+        db.session.flush()
+        try:
+            yield stage_csv(path, "staging_local_plan")
+        finally:
+            db.session.rollback()
+
+
+def _defaults():
+    return {
+        "entry_date": func.current_date(),
+        "status": literal(Status.FOR_REVIEW, PLANS.c.status.type),
+        "boundary_status": literal(Status.FOR_REVIEW, PLANS.c.boundary_status.type),
+    }
+
+
+def _plans():
+    return db.session.execute(
+        select(
+            PLANS.c.reference,
+            PLANS.c.name,
+            PLANS.c.description,
+            PLANS.c.period_start_date,
+        )
+        .where(PLANS.c.reference.startswith("staging-plan-"))
+        .order_by(PLANS.c.reference)
+    ).all()
+
+
+def test_stage_csv(staged_plans):
+    assert [column.name for column in staged_plans.c] == [
+        "reference",
+        "name",
+        "description",
+        "period_start_date",
+        "adopted_date",
+        "unused_5",
+    ]
+    assert (
+        db.session.execute(select(func.count()).select_from(staged_plans)).scalar() == 5
+    )
+
+
+def test_merge_staged(staged_plans):
+    inserted, updated = merge_staged(
+        staged_plans,
+        PLANS,
+        "reference",
+        update_columns=["name"],
+        defaults=_defaults(),
+        expressions={"description": func.upper(staged_plans.c.description)},
+        where=staged_plans.c.reference != "staging-plan-3",
+        exclude=["adopted_date"],
+    )
+
+    assert (inserted, updated) == (1, 1)
+    assert _plans() == [
+        # only update_columns are written to a plan already held
+        ("staging-plan-1", "Plan one", "Held description", 2019),
+        # the last row for a repeated reference wins, cast to the column type
+        ("staging-plan-2", "Plan two", "SECOND", 2022),
+    ]
+    assert db.session.get(LocalPlan, "staging-plan-2").adopted_date is None
+
+
+def test_merge_staged_leaves_existing_rows_alone(staged_plans):
+    inserted, updated = merge_staged(
+        staged_plans, PLANS, "reference", update_columns=[], defaults=_defaults()
+    )
+
+    assert (inserted, updated) == (2, 0)
+    assert [(plan.reference, plan.name, plan.description) for plan in _plans()] == [
+        ("staging-plan-1", "Held plan", "Held description"),
+        # empty strings are NULL
+        ("staging-plan-2", "Plan two", "Second"),
+        ("staging-plan-3", "Plan three", None),
+    ]
+
+
+def test_merge_staged_skips_unchanged_rows(staged_plans):
+    def merge():
+        return merge_staged(
+            staged_plans,
+            PLANS,
+            "reference",
+            update_columns=["name", "description"],
+            defaults=_defaults(),
+            skip_unchanged=True,
+            exclude=["adopted_date"],
+        )
+
+    # staging-plan-1 was not loaded from this row, so has no hash yet
+    assert diff_staged(staged_plans, PLANS, "reference") == (
+        ["staging-plan-2", "staging-plan-3"],
+        ["staging-plan-1"],
+        [],
+    )
+    assert merge() == (2, 1)
+    assert diff_staged(staged_plans, PLANS, "reference") == (
+        [],
+        [],
+        ["staging-plan-1", "staging-plan-2", "staging-plan-3"],
+    )
+    assert merge() == (0, 0)
+
+    db.session.execute(
+        staged_plans.update()
+        .where(staged_plans.c.reference == "staging-plan-3")
+        .values(name="Plan three renamed")
+    )
+    assert diff_staged(staged_plans, PLANS, "reference") == (
+        [],
+        ["staging-plan-3"],
+        ["staging-plan-1", "staging-plan-2"],
+    )
+    assert merge() == (0, 1)
+    assert db.session.get(LocalPlan, "staging-plan-3").name == "Plan three renamed"
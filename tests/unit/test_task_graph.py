@@ -0,0 +1,43 @@
+from application.task_graph import FAILED, SKIPPED, SUCCEEDED, TaskGraph
+
+
+def test_failed_step_skips_its_dependents(app):
+    ran = []
+
+    def fail():
+        raise ValueError("no data")
+
+    graph = TaskGraph()
+    graph.add("load", fail)
+    graph.add("link", lambda: ran.append("link"), depends_on=["load"])
+    graph.add("report", lambda: ran.append("report"), depends_on=["link"])
+    graph.add("other", lambda: ran.append("other"))
+
+    steps = {step.name: step for step in graph.run(app)}
+
+    assert steps["load"].status == FAILED
+    assert str(steps["load"].error) == "no data"
+    assert steps["link"].status == SKIPPED
+    assert steps["report"].status == SKIPPED
+    assert steps["other"].status == SUCCEEDED
+    assert ran == ["other"]
+
+
+def test_command_that_cannot_load_fails_its_step(app, http_server, monkeypatch):
+    from application import commands
+
+    # the url is a 404, which load_doc_types used to print and carry on from
+    monkeypatch.setattr(
+        commands, "DOCUMENT_TYPES_URL", http_server.url("/local-plan-document-type")
+    )
+    ran = []
+    graph = TaskGraph()
+    graph.add("doc-types", commands._step(commands.load_doc_types))
+    graph.add("uses-doc-types", lambda: ran.append(True), depends_on=["doc-types"])
+
+    steps = {step.name: step for step in graph.run(app)}
+
+    assert steps["doc-types"].status == FAILED
+    assert "Error fetching document types" in str(steps["doc-types"].error)
+    assert steps["uses-doc-types"].status == SKIPPED
+    assert ran == []